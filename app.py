@@ -1,18 +1,36 @@
+import time
+
+_import_start = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from fastapi.responses import PlainTextResponse
 from slowapi.errors import RateLimitExceeded
 from src.api.v1.routes import router as api_router
+from src.api.v1.job_routes import router as job_router
 from src.config import settings
-from src.middleware.rate_limit_middleware import rate_limit_handler
-
-# Initialize rate limiter
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=[settings.RATE_LIMIT_GLOBAL],
-    storage_uri="memory://",
-    headers_enabled=True,
-)
+from src.middleware.metrics_middleware import MetricsMiddleware
+from src.middleware.rate_limit_middleware import limiter, rate_limit_handler
+from src.services import cache_service, cpu_pool, startup, vision_client
+from src.services.metrics import render_metrics
+from src.services.job_service import job_manager
+
+startup.record_phase("import", time.perf_counter() - _import_start)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_manager.fail_interrupted()
+    await startup.start()
+    yield
+    await startup.stop()
+    await job_manager.shutdown()
+    # After the job workers, which may still be preprocessing or calling Vision
+    cpu_pool.shutdown()
+    vision_client.shutdown()
+    await cache_service.flush_pending_writes()
+    cache_service.save_snapshot()
+
 
 # Disable Swagger / ReDoc / OpenAPI docs for production
 app = FastAPI(
@@ -21,6 +39,7 @@ app = FastAPI(
     docs_url=None,
     redoc_url=None,
     openapi_url=None,
+    lifespan=lifespan,
 )
 
 app.state.limiter = limiter
@@ -28,10 +47,22 @@ app.state.limiter = limiter
 # Use custom rate limit handler
 app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
 
+app.add_middleware(MetricsMiddleware)
+
 # Include API router
 app.include_router(api_router, prefix="/v1")
+app.include_router(job_router, prefix="/v1")
 
 
 @app.get("/")
 async def root():
     return {"status": "ok", "service": "OCR Cloud Run API"}
+
+
+if settings.METRICS_ENABLED:
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    @limiter.exempt  # Scrapes must never be throttled
+    async def metrics():
+        """Prometheus text exposition of per-stage latency, cache and Vision metrics."""
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
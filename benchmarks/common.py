@@ -0,0 +1,67 @@
+import glob
+import json
+import math
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "images")
+MIMETYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".gif": "image/gif"}
+
+
+def load_images(directory: str = IMAGES_DIR) -> List[dict]:
+    """[{"name", "path", "mimetype", "contents"}] for every supported image in directory."""
+    images = []
+    for path in sorted(glob.glob(os.path.join(directory, "*"))):
+        mimetype = MIMETYPES.get(os.path.splitext(path)[1].lower())
+        if mimetype:
+            with open(path, "rb") as f:
+                images.append({"name": os.path.basename(path), "path": path, "mimetype": mimetype, "contents": f.read()})
+    return images
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_ms(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds from samples in seconds."""
+    values = sorted(sample * 1000 for sample in samples)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 3),
+        "min": round(values[0], 3),
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def time_calls(function: Callable[[], object], iterations: int, warmup: int = 2) -> List[float]:
+    """Run function warmup + iterations times; returns the timed durations in seconds."""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def write_report(report: dict, output: Optional[str]) -> None:
+    """Write the JSON report to output (a path), or stdout when output is None or "-"."""
+    text = json.dumps(report, indent=2)
+    if output and output != "-":
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
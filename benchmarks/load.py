@@ -0,0 +1,158 @@
+"""
+End-to-end load harness for /v1/extract-text and /v1/batch-extract.
+
+In-process (default): drives the ASGI app directly with the fake Vision backend, so no credentials
+or network are needed and rate limiting and load shedding are switched off:
+
+    python -m benchmarks.load --requests 200 --concurrency 16 --latency-ms 150 --output load.json
+
+Against a running server (rate limits apply; start it with VISION_BACKEND=fake to avoid Vision costs):
+
+    python -m benchmarks.load --url http://localhost:8080 --requests 200 --concurrency 16
+
+Reports throughput and p50/p95/p99 latency per endpoint as JSON.
+"""
+import argparse
+import asyncio
+import itertools
+import platform
+import time
+import uuid
+from collections import Counter
+from typing import List, Optional
+import httpx
+from benchmarks.common import load_images, summarize_ms, write_report
+
+ENDPOINTS = ("extract-text", "batch-extract")
+
+
+def _usable_images(images: List[dict]) -> List[dict]:
+    # The animated GIF is accepted, but with MULTIPAGE_ENABLED each of its distinct frames is OCR'd as a page
+    # with its own Vision call; keep it out so every request in the throughput numbers costs one image's work
+    return [image for image in images if "animated" not in image["name"]]
+
+
+def _contents(image: dict, cache_mode: str) -> bytes:
+    # Trailing bytes after the image's end marker change the content hash but not the decoded image
+    if cache_mode == "miss":
+        return image["contents"] + uuid.uuid4().bytes
+    return image["contents"]
+
+
+async def _run_endpoint(
+    client: httpx.AsyncClient,
+    endpoint: str,
+    images: List[dict],
+    requests: int,
+    concurrency: int,
+    batch_size: int,
+    cache_mode: str,
+) -> dict:
+    image_cycle = itertools.cycle(images)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors: Counter = Counter()
+    next_request = iter(range(requests))
+
+    async def worker():
+        for _ in next_request:
+            if endpoint == "extract-text":
+                image = next(image_cycle)
+                files = {"image": (image["name"], _contents(image, cache_mode), image["mimetype"])}
+            else:
+                batch = [next(image_cycle) for _ in range(batch_size)]
+                files = [("images", (image["name"], _contents(image, cache_mode), image["mimetype"])) for image in batch]
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"/v1/{endpoint}", files=files)
+                statuses[str(response.status_code)] += 1
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    images_per_request = 1 if endpoint == "extract-text" else batch_size
+    completed = len(latencies)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "images_per_request": images_per_request,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(completed / duration, 2) if duration else 0.0,
+        "images_per_s": round(completed * images_per_request / duration, 2) if duration else 0.0,
+        "status_codes": dict(statuses),
+        "transport_errors": dict(errors),
+        "latency_ms": summarize_ms(latencies),
+    }
+
+
+def _in_process_client(args) -> httpx.AsyncClient:
+    from app import app
+    from src.middleware.rate_limit_middleware import limiter
+    from src.services import vision_client
+    from src.services.admission import admission
+    from src.services.work_limiter import work_limiter
+    from src.services.fake_vision import FakeVisionAsyncClient, FakeVisionClient
+
+    options = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate, "seed": 0}
+    vision_client.set_backend(FakeVisionClient(**options), FakeVisionAsyncClient(**options))
+    # Measure the pipeline, not the protections in front of it
+    limiter.enabled = False
+    work_limiter.enabled = False
+    admission.vision_pending_limit = 0
+    admission.queued_bytes_limit = float("inf")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark", timeout=None)
+
+
+async def _run(args) -> dict:
+    images = _usable_images(load_images())
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        client = _in_process_client(args)
+
+    results = {}
+    async with client:
+        for endpoint in args.endpoints:
+            results[endpoint] = await _run_endpoint(
+                client, endpoint, images, args.requests, args.concurrency, args.batch_size, args.cache_mode
+            )
+    return {
+        "benchmark": "load",
+        "python": platform.python_version(),
+        "target": args.url or "in-process (fake Vision backend)",
+        "cache_mode": args.cache_mode,
+        "fake_backend": None if args.url else {
+            "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "error_rate": args.error_rate
+        },
+        "endpoints": results,
+    }
+
+
+def main(argv: Optional[list] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=None, help="base URL of a running server; omit to run in-process")
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=4, help="images per /batch-extract request")
+    parser.add_argument("--cache-mode", choices=("miss", "hit"), default="miss",
+                        help="miss: make every upload unique; hit: resend identical bytes")
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="fake Vision latency per RPC")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake Vision RPCs that fail")
+    parser.add_argument("--timeout", type=float, default=60.0, help="HTTP timeout when using --url")
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_run(args))
+    write_report(report, args.output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
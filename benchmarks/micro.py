@@ -0,0 +1,159 @@
+"""
+Micro-benchmarks for the CPU-bound building blocks, using the images in tests/images.
+
+    python -m benchmarks.micro --iterations 20 --output micro.json
+
+Reports per-operation latency (ms) as JSON so runs can be diffed before and after a change.
+"""
+import argparse
+import platform
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from src.models.response_models import BatchOCRResponse, OCRResult
+from src.services.cache_store import ByteBudgetCache, compress_result, decompress_result
+from src.services.confidence import compute_confidence
+from src.services.extractor import extract_annotation
+from src.services.fake_vision import synthetic_response
+from src.services.ocr_service import _ocr_result_dict
+from src.services.preprocess import preprocess_image, request_jpeg_draft
+from src.services.response_encoding import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    _optional_module,
+    compress_body,
+    serialize_body,
+)
+from src.utils.file_utils import _validate_image_bytes
+from benchmarks.common import load_images, summarize_ms, time_calls, write_report
+
+
+def bench_images(images, iterations: int) -> dict:
+    results = {}
+    for image in images:
+        contents, mimetype = image["contents"], image["mimetype"]
+
+        def decode():
+            return _validate_image_bytes(contents, mimetype, draft=request_jpeg_draft)
+
+        try:
+            decode().release()
+        except HTTPException as he:
+            results[image["name"]] = {"skipped": str(he.detail)}
+            continue
+
+        # preprocess_image consumes its context, so decode one per call up front and time preprocessing alone
+        contexts = [decode() for _ in range(iterations + 2)]
+        results[image["name"]] = {
+            "bytes": len(contents),
+            "validate_image_bytes": summarize_ms(time_calls(lambda: decode().release(), iterations)),
+            "preprocess_image": summarize_ms(time_calls(lambda: preprocess_image(contexts.pop()), iterations)),
+        }
+    return results
+
+
+def bench_annotation(iterations: int, words: int) -> dict:
+    full_text = synthetic_response(words=words).full_text_annotation
+    return {
+        "words": words,
+        "compute_confidence": summarize_ms(time_calls(lambda: compute_confidence(full_text), iterations)),
+        "extract_annotation_layout": summarize_ms(time_calls(lambda: extract_annotation(full_text), iterations)),
+    }
+
+
+def bench_cache(iterations: int, words: int) -> dict:
+    response = synthetic_response(words=words)
+    result = {
+        "success": True,
+        "text": response.text_annotations[0].description,
+        "confidence": 0.9,
+        "metadata": {"width": 1000, "height": 1000, "format": "JPEG", "mimetype": "image/jpeg"},
+        "layout": extract_annotation(response.full_text_annotation)["layout"],
+        "processing_time_ms": 100,
+        "error": None,
+    }
+    payload = compress_result(result)
+    cache = ByteBudgetCache(max_bytes=64 * 1024 * 1024, ttl=3600)
+    keys = [f"{index:064x}" for index in range(iterations + 2)]
+    pending = list(keys)
+    for key in keys:
+        cache[key] = result
+
+    return {
+        "payload_bytes": len(payload),
+        "compress_result": summarize_ms(time_calls(lambda: compress_result(result), iterations)),
+        "decompress_result": summarize_ms(time_calls(lambda: decompress_result(payload), iterations)),
+        "set": summarize_ms(time_calls(lambda: cache.__setitem__(pending.pop(), result), iterations)),
+        "get_hit": summarize_ms(time_calls(lambda: cache.get(keys[0]), iterations)),
+        "get_miss": summarize_ms(time_calls(lambda: cache.get("missing"), iterations)),
+    }
+
+
+def bench_responses(iterations: int, words: int, batch_size: int) -> dict:
+    """
+    Serialize a batch response of batch_size dense results: through the response models (validated again
+    against response_model, as FastAPI does) against each negotiated media type and content coding.
+    """
+    text = synthetic_response(words=words).text_annotations[0].description
+    result = {
+        "success": True,
+        "text": text,
+        "confidence": 0.9,
+        "metadata": {"width": 1000, "height": 1000, "format": "JPEG", "mimetype": "image/jpeg"},
+        "processing_time_ms": 100,
+        "error": None,
+    }
+    content = {
+        "success": True,
+        "total_images": batch_size,
+        "total_processing_time_ms": 1000,
+        "results": [_ocr_result_dict(f"page-{index}.jpg", result) for index in range(batch_size)],
+    }
+    adapter = TypeAdapter(BatchOCRResponse)
+
+    def model_path() -> bytes:
+        response = BatchOCRResponse(**{**content, "results": [OCRResult(**item) for item in content["results"]]})
+        return JSONResponse(adapter.dump_python(adapter.validate_python(response.model_dump()), mode="json")).body
+
+    report = {
+        "batch_size": batch_size,
+        "words": words,
+        "model_json": {"bytes": len(model_path()), "ms": summarize_ms(time_calls(model_path, iterations))},
+    }
+    media_types = [JSON_MEDIA_TYPE] + ([MSGPACK_MEDIA_TYPE] if _optional_module("msgpack") else [])
+    codings = [None, "gzip"] + (["br"] if _optional_module("brotli") else [])
+    for media_type in media_types:
+        for coding in codings:
+            def encode(media_type=media_type, coding=coding) -> bytes:
+                body = serialize_body(content, media_type)
+                return compress_body(body, coding) if coding else body
+
+            name = media_type.split("/")[1] + (f"+{coding}" if coding else "")
+            report[name] = {"bytes": len(encode()), "ms": summarize_ms(time_calls(encode, iterations))}
+    return report
+
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--words", type=int, default=500, help="words in the synthetic Vision annotation")
+    parser.add_argument("--batch-size", type=int, default=10, help="results in the benchmarked batch response")
+    parser.add_argument("--output", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    images = load_images()
+    report = {
+        "benchmark": "micro",
+        "python": platform.python_version(),
+        "iterations": args.iterations,
+        "images": bench_images(images, args.iterations),
+        "annotation": bench_annotation(args.iterations, args.words),
+        "cache": bench_cache(args.iterations, args.words),
+        "responses": bench_responses(args.iterations, args.words, args.batch_size),
+    }
+    write_report(report, args.output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
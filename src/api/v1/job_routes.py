@@ -0,0 +1,68 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from typing import List
+from slowapi.util import get_remote_address
+from src.middleware.rate_limit_middleware import limiter
+from src.config import settings
+from src.models.response_models import JobStatusResponse
+from src.services.job_service import job_manager
+from src.services.response_encoding import encoded_response
+from src.services.work_limiter import charge_uploads
+from src.utils.ingest import UploadLimitExceeded, read_batch_uploads
+
+router = APIRouter()
+
+
+async def _get_job_or_404(job_id: str) -> dict:
+    job = await job_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
+
+@router.post("/jobs", response_model=JobStatusResponse, status_code=202)
+@limiter.limit(settings.RATE_LIMIT_JOBS)
+async def submit_job(request: Request, images: List[UploadFile] = File(...)):
+    """
+    Queue many images for asynchronous OCR and return the job id immediately.
+    Poll GET /v1/jobs/{job_id} for progress and results.
+    """
+    if len(images) > settings.JOB_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files uploaded. Maximum allowed is {settings.JOB_MAX_FILES}.",
+        )
+
+    # Stop reading as soon as the job can't fit in the queue, rather than buffering all of it first
+    try:
+        uploads = await read_batch_uploads(images, max_total_bytes=job_manager.queue_room())
+    except UploadLimitExceeded:
+        raise job_manager.queue_full_error()
+    await charge_uploads(get_remote_address(request), uploads)
+    return await job_manager.submit(uploads)
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(
+    request: Request,
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(settings.JOB_RESULTS_PAGE_SIZE, ge=0, le=1000),
+):
+    """
+    Job progress plus a page of the results completed so far (ordered by input index).
+    The body is negotiated like /extract-text (JSON or MessagePack, optionally compressed).
+    """
+    job = await _get_job_or_404(job_id)
+    results = await job_manager.get_results(job_id, offset, limit)
+    return encoded_response(request, {**job, "offset": offset, "results": results})
+
+
+@router.get("/jobs/{job_id}/results", response_model=JobStatusResponse)
+async def get_job_results(
+    request: Request,
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(settings.JOB_RESULTS_PAGE_SIZE, ge=1, le=1000),
+):
+    """Page through a job's completed results."""
+    return await get_job(request, job_id, offset, limit)
@@ -1,41 +1,95 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Response, Request
-from typing import List
-from slowapi import Limiter
+import json
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import Callable, List, Optional
 from slowapi.util import get_remote_address
-from src.services.ocr_service import process_single_image, process_batch_images
+from src.middleware.rate_limit_middleware import limiter
+from src.services.ocr_service import process_single_image, process_batch_images, stream_batch_images
 from src.models.response_models import SingleOCRResponse, BatchOCRResponse
-from src.services.cache_service import get_cache
+from src.services.cache_service import get_cache_async, result_key
+from src.services.extractor import LAYOUT_FIELDS, parse_fields
+from src.services import startup, vision_policy
+from src.services.admission import admission, expected_vision_calls
+from src.services.memory_budget import reserve_uploads
+from src.services.response_encoding import encoded_response
+from src.services.work_limiter import charge_uploads
 from src.config import settings
+from src.utils.ingest import read_batch_uploads, read_upload
 
 router = APIRouter()
 
-# Initialize limiter
-limiter = Limiter(key_func=get_remote_address)
+
+class _BatchStreamResponse(StreamingResponse):
+    """
+    StreamingResponse that closes its record generator and calls on_close once the response has ended,
+    however it ended: finished, client gone mid-stream, or failed before the first record was sent.
+    """
+
+    def __init__(self, content, on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+            self._on_close()
+
+
+def _parse_fields_or_400(fields: Optional[str]) -> frozenset:
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/extract-text", response_model=SingleOCRResponse)
 @limiter.limit(settings.RATE_LIMIT_SINGLE)
 async def extract_text(
-    request: Request, response: Response, image: UploadFile = File(...)
+    request: Request,
+    image: UploadFile = File(...),
+    fields: Optional[str] = Query(None),
 ):
     """
     Process a single image and return OCR result.
-    Adds cache headers if available.
-    Rate limited to 100 requests per minute per IP.
+    fields: comma-separated extras to include, e.g. "blocks,words" for confidences and bounding boxes.
+    Adds cache headers if available. The body is JSON or MessagePack, gzip/brotli-compressed as negotiated
+    (see response_encoding).
+    Rate limited to 100 requests per minute per IP, and charged in work units (see RATE_LIMIT_WORK_UNITS).
+    Returns 503 with Retry-After when the instance is at capacity or memory budget (MEMORY_BUDGET_BYTES)
+    isn't available within MEMORY_ACQUIRE_TIMEOUT.
     """
+    selected_fields = _parse_fields_or_400(fields)
     try:
-        contents = await image.read()
-        cached = get_cache(contents)
+        upload = await read_upload(image)
+        await charge_uploads(get_remote_address(request), [upload])
+        with admission.admitted(len(upload.contents), upload.pages):
+            # The only L1/L2 lookup for this request; its outcome is handed to process_single_image
+            key = result_key(upload.digest, selected_fields & LAYOUT_FIELDS)
+            cached = await get_cache_async(upload.contents, key=key)
 
-        if cached:
-            response.headers["X-Cache-Status"] = "cached"
-            response.headers["X-Cache-Timestamp"] = cached.get("_cached_at", "")
-        else:
-            response.headers["X-Cache-Status"] = "not-cached"
+            if cached:
+                headers = {"X-Cache-Status": "cached", "X-Cache-Timestamp": cached.get("_cached_at", "")}
+            else:
+                headers = {"X-Cache-Status": "not-cached"}
 
-        return await process_single_image(
-            image, preloaded_bytes=contents, preloaded_mimetype=image.content_type
-        )
+            # Cache hits decode nothing, so only misses wait for memory budget
+            uploads_to_decode = [] if cached else [upload]
+            async with reserve_uploads(uploads_to_decode, timeout=settings.MEMORY_ACQUIRE_TIMEOUT) as reservation:
+                result = await process_single_image(
+                    image,
+                    preloaded_bytes=upload.contents,
+                    preloaded_mimetype=upload.content_type,
+                    preloaded_digest=upload.digest,
+                    fields=selected_fields,
+                    reservation=reservation,
+                    cache_checked=True,
+                    cached=cached,
+                )
+        if result["near_duplicate"]:
+            headers["X-Cache-Status"] = "near-duplicate"
+        return encoded_response(request, result, headers=headers)
     except HTTPException:
         raise
     except Exception as e:
@@ -45,49 +99,135 @@ async def extract_text(
 @router.post("/batch-extract", response_model=BatchOCRResponse)
 @limiter.limit(settings.RATE_LIMIT_BATCH)
 async def batch_extract(
-    request: Request, response: Response, images: List[UploadFile] = File(...)
+    request: Request,
+    images: List[UploadFile] = File(...),
+    fields: Optional[str] = Query(None),
 ):
     """
     Process multiple images in batch.
+    fields: comma-separated extras to include per result (see /extract-text).
     Returns 207 Multi-Status if some images fail.
-    Adds consolidated cache headers.
-    Rate limited to 20 requests per minute per IP.
+    Adds consolidated cache headers. The body is negotiated like /extract-text.
+    Rate limited to 20 requests per minute per IP and charged in work units per image.
+    Returns 503 with Retry-After when the instance is at capacity.
     """
     if len(images) > settings.MAX_BATCH_FILES:
         raise HTTPException(
             status_code=413,
             detail=f"Too many files uploaded. Maximum allowed is {settings.MAX_BATCH_FILES}.",
         )
+    selected_fields = _parse_fields_or_400(fields)
 
     try:
-        timestamps = []
-        for img in images:
-            contents = await img.read()
-            cached = get_cache(contents)
-            if cached:
-                timestamps.append(cached.get("_cached_at", ""))
-            await img.seek(0)  # rewind file for processing
+        # Each file is read and hashed once here; failures become per-item errors
+        uploads = await read_batch_uploads(images)
+        await charge_uploads(get_remote_address(request), uploads)
+        with admission.admitted(sum(len(upload.contents) for upload in uploads), expected_vision_calls(uploads)):
+            timestamps = []
+            for upload in uploads:
+                if upload.error:
+                    continue
+                key = result_key(upload.digest, selected_fields & LAYOUT_FIELDS)
+                cached = await get_cache_async(upload.contents, key=key, record_metrics=False)
+                if cached:
+                    timestamps.append(cached.get("_cached_at", ""))
 
-        if timestamps and len(timestamps) == len(images):
-            response.headers["X-Cache-Status"] = "all-cached"
-        elif timestamps:
-            response.headers["X-Cache-Status"] = "mixed"
-        else:
-            response.headers["X-Cache-Status"] = "not-cached"
+            if timestamps and len(timestamps) == len(images):
+                headers = {"X-Cache-Status": "all-cached"}
+            elif timestamps:
+                headers = {"X-Cache-Status": "mixed"}
+            else:
+                headers = {"X-Cache-Status": "not-cached"}
 
-        response.headers["X-Cache-Timestamps"] = ",".join(timestamps)
+            headers["X-Cache-Timestamps"] = ",".join(timestamps)
 
-        batch_response, status_code = await process_batch_images(images)
-        response.status_code = status_code
-        return batch_response
+            async with reserve_uploads(
+                uploads, settings.BATCH_CONCURRENCY, timeout=settings.MEMORY_ACQUIRE_TIMEOUT
+            ) as reservation:
+                batch_response, status_code = await process_batch_images(uploads, selected_fields, reservation)
+        return encoded_response(request, batch_response, status_code, headers)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/batch-extract/stream")
+@limiter.limit(settings.RATE_LIMIT_BATCH)
+async def batch_extract_stream(
+    request: Request,
+    images: List[UploadFile] = File(...),
+    fields: Optional[str] = Query(None),
+):
+    """
+    Process multiple images, streaming one record per image as soon as it finishes.
+    Sends Server-Sent Events when the client accepts text/event-stream, NDJSON otherwise.
+    The last record is a summary with totals and an overall success flag.
+    Rate limited, charged and shed like /batch-extract.
+    """
+    if len(images) > settings.MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files uploaded. Maximum allowed is {settings.MAX_BATCH_FILES}.",
+        )
+    selected_fields = _parse_fields_or_400(fields)
+
+    # Read uploads before streaming starts; the request's files are closed once the endpoint returns
+    uploads = await read_batch_uploads(images)
+    await charge_uploads(get_remote_address(request), uploads)
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
+    batch_bytes = sum(len(upload.contents) for upload in uploads)
+    admission.acquire(batch_bytes, expected_vision_calls(uploads))
+    reservation = reserve_uploads(uploads, settings.BATCH_CONCURRENCY, timeout=settings.MEMORY_ACQUIRE_TIMEOUT)
+    try:
+        await reservation.acquire()
+    except BaseException:
+        admission.release(batch_bytes)
+        raise
+
+    async def body():
+        async for record in stream_batch_images(uploads, selected_fields, reservation):
+            payload = json.dumps(record, separators=(",", ":"))
+            if use_sse:
+                yield f"event: {record['type']}\ndata: {payload}\n\n"
+            else:
+                yield payload + "\n"
+
+    def release() -> None:
+        reservation.release()
+        admission.release(batch_bytes)
+
+    # Both are held for the life of the response, also one that never starts streaming
+    return _BatchStreamResponse(
+        body(),
+        on_close=release,
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/health")
 @limiter.exempt  # Exempt health checks from rate limiting
 async def health_check():
-    """Health check endpoint - not rate limited"""
-    return {"status": "healthy", "service": "ocr-api"}
+    """Health check endpoint - not rate limited. Reports "degraded" while the Vision circuit is open."""
+    circuit = vision_policy.breaker.snapshot()
+    status = "healthy" if circuit["state"] == "closed" else "degraded"
+    return {"status": status, "service": "ocr-api", "ready": startup.is_ready(), "vision_circuit": circuit}
+
+
+@router.get("/ready")
+@limiter.exempt
+async def readiness_check():
+    """Readiness probe: 503 until startup warm-up has finished (use it as the Cloud Run startup probe)."""
+    if not startup.is_ready():
+        raise HTTPException(status_code=503, detail="Warming up.", headers={"Retry-After": "1"})
+    return {"status": "ready"}
+
+
+if settings.STARTUP_DEBUG_ENDPOINT:
+
+    @router.get("/debug/startup")
+    @limiter.exempt
+    async def startup_report():
+        """Import and startup phase timings, process age at readiness and warm-up details."""
+        return startup.report()
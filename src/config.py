@@ -1,3 +1,4 @@
+from typing import Dict
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict
 
@@ -7,18 +8,134 @@ class Settings(BaseSettings):
     MAX_GIF_SIZE: int = 10 * 1024 * 1024
     MAX_GIF_FRAMES: int = 50
     MAX_BATCH_FILES: int = 10
+    UPLOAD_CHUNK_SIZE: int = 256 * 1024
+
+    # Batch Processing Settings
+    BATCH_CONCURRENCY: int = 4
+    VISION_BATCH_SIZE: int = 16
+
+    # Asynchronous Job Settings
+    JOB_MAX_FILES: int = 1000
+    JOB_WORKERS: int = 4
+    JOB_MAX_QUEUED_BYTES: int = 256 * 1024 * 1024
+    JOB_STORE_URL: str = "memory://"  # or "sqlite:///jobs/ocr_jobs.sqlite3"
+    JOB_RESULT_TTL: int = 86400
+    JOB_RESULTS_PAGE_SIZE: int = 50
+
+    # Vision Transport Settings
+    VISION_TRANSPORT: str = "grpc"  # "grpc" (pooled sync channels on a dedicated executor) or "async"
+    VISION_CHANNEL_POOL_SIZE: int = 1
+    VISION_EXECUTOR_WORKERS: int = 32
+    VISION_MAX_IN_FLIGHT: int = 32
+    VISION_CALL_TIMEOUT: float = 30.0  # deadline per attempt
+
+    # Vision Call Policy (retries, hedging, circuit breaker)
+    VISION_REQUEST_DEADLINE: float = 60.0  # total budget for one logical call, retries and hedges included
+    VISION_RETRY_ATTEMPTS: int = 3  # attempts per call on transient errors (1 disables retries)
+    VISION_RETRY_BASE_DELAY: float = 0.2  # backoff is random in [0, min(max, base * 2^n)]
+    VISION_RETRY_MAX_DELAY: float = 2.0
+    VISION_HEDGE_ENABLED: bool = False  # send a duplicate request when the first one is slow
+    VISION_HEDGE_PERCENTILE: float = 95.0  # hedge once an attempt outlasts this percentile of recent latencies
+    VISION_HEDGE_MIN_DELAY: float = 0.5  # never hedge earlier than this (also used until enough samples exist)
+    VISION_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive transient failures that open the circuit
+    VISION_BREAKER_RESET_TIMEOUT: float = 30.0  # seconds open before a trial call is let through
+    VISION_BACKEND: str = "google"  # "google", or "fake" for a local stand-in (benchmarks, load tests)
+    VISION_FAKE_LATENCY_MS: float = 150.0
+    VISION_FAKE_JITTER_MS: float = 50.0
+    VISION_FAKE_ERROR_RATE: float = 0.0
+    VISION_FAKE_RESPONSE_PATH: str = ""  # JSON AnnotateImageResponse to return; "" for a synthetic document
 
     CACHE_TTL: int = 7200
-    CACHE_MAXSIZE: int = 500
+    CACHE_MAXSIZE: int = 500  # entry cap; 0 leaves only the byte budget
+    CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CACHE_COMPRESSION_LEVEL: int = 6
+    CACHE_PHASH_ENABLED: bool = False  # near-duplicate lookup by perceptual hash after an exact-hash miss
+    CACHE_PHASH_MAX_DISTANCE: int = 16  # max differing bits out of 256; keep low, similar forms hash close
+    CACHE_PHASH_INDEX_SIZE: int = 2000
+    CACHE_SNAPSHOT_PATH: str = ""  # e.g. "cache/ocr_cache.snapshot"; "" disables snapshot/restore
+    CACHE_L2_URL: str = ""  # "" disables L2; "memory://" for an in-process stand-in, or "redis://host:6379/0"
+    CACHE_L2_TIMEOUT: float = 0.25
+
+    LOG_FILE: str = "logs/ocr_service.log"  # "" disables the file log
+    LOG_STDOUT: bool = False  # structured JSON on stdout for Cloud Logging
+    LOG_QUEUE_SIZE: int = 10000  # records beyond this are dropped rather than blocking
+    LOG_SAMPLE_RATES: Dict[str, float] = {}  # e.g. {"cache_hit": 0.1, "response_ready": 0.05}
+    LOG_MAX_FIELD_CHARS: int = 256  # longer strings (OCR text) are logged as preview + length + hash
+    LOG_TRUNCATE_PREVIEW_CHARS: int = 64
+    LOG_MAX_LIST_ITEMS: int = 20  # longer lists (layout columns) are logged as their length
+
+    # Startup Settings (cold start on scale-from-zero)
+    STARTUP_WARMUP_ENABLED: bool = True  # load Vision, connect its channels and warm image codecs before ready
+    STARTUP_WARMUP_BACKGROUND: bool = False  # accept connections at once; /v1/ready returns 503 until warm
+    STARTUP_WARMUP_TIMEOUT: float = 10.0  # seconds allowed for Vision channels to connect
+    STARTUP_WARMUP_VISION_CALL: bool = False  # also send one tiny OCR request (billed) to warm credentials end to end
+    STARTUP_DEBUG_ENDPOINT: bool = True  # GET /v1/debug/startup with import and startup phase timings
+
+    # Response Encoding Settings (negotiated from Accept / Accept-Encoding on the OCR and job routes)
+    RESPONSE_COMPRESSION_ENABLED: bool = True  # gzip, or brotli when the brotli package is installed
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024  # smaller bodies are sent uncompressed
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 5  # 0-11; higher levels cost far more CPU for little gain on OCR text
+    RESPONSE_MSGPACK_ENABLED: bool = True  # application/msgpack bodies when Accept asks for them (needs msgpack)
 
-    LOG_FILE: str = "logs/ocr_service.log"
+    METRICS_ENABLED: bool = True  # Prometheus text format on GET /metrics (not rate limited)
+    SERVER_TIMING_ENABLED: bool = False  # per-stage Server-Timing response headers
     CONTRAST_ENHANCE_FACTOR: float = 1.2
     JPEG_QUALITY: int = 90
 
+    # Adaptive Encoding Settings
+    PREPROCESS_MAX_EDGE: int = 4096  # 0 disables
+    PREPROCESS_MAX_MEGAPIXELS: float = 16.0  # 0 disables
+    PREPROCESS_GRAYSCALE: bool = True
+    PREPROCESS_GRAYSCALE_MAX_SATURATION: float = 0.08
+    PREPROCESS_PNG_FOR_BILEVEL: bool = True
+    PREPROCESS_BILEVEL_RATIO: float = 0.9
+
+    # Page Analysis Settings (pixel statistics on a small grayscale copy, before encoding)
+    PREPROCESS_ANALYSIS_EDGE: int = 1024  # longest edge of the analysis copy
+    PREPROCESS_INK_DELTA: int = 48  # grey levels away from the background colour that count as ink
+    PREPROCESS_BLANK_MAX_INK_RATIO: float = 0.00005  # less ink than this is "No text detected" without Vision; 0 disables
+    PREPROCESS_CROP_ENABLED: bool = True  # crop uniform margins around the ink
+    PREPROCESS_CROP_PADDING: float = 0.02  # margin kept around the ink, as a fraction of the longer edge
+    PREPROCESS_CROP_MIN_SAVING: float = 0.1  # crop only when it removes at least this share of the area
+
+    # Tiled OCR Settings (large scans are split into overlapping tiles OCR'd in parallel instead of downscaled)
+    TILING_ENABLED: bool = False
+    TILING_MIN_MEGAPIXELS: float = 16.0  # images larger than this are tiled
+    TILE_SIZE: int = 2048  # tile edge in pixels
+    TILE_OVERLAP: int = 256  # pixels shared by neighbouring tiles; keep above the widest word
+    TILING_MAX_TILES: int = 36  # larger images are downscaled until they fit in this many tiles
+
+    # Multi-page Settings (every frame of an animated GIF / page of a TIFF is OCR'd; otherwise only the first)
+    MULTIPAGE_ENABLED: bool = False  # each distinct page is a billed Vision call
+    MULTIPAGE_MAX_FRAMES: int = 200  # frames/pages accepted per upload (MAX_GIF_FRAMES applies when disabled)
+    MULTIPAGE_MAX_PAGES: int = 20  # distinct pages sent to Vision after de-duplication
+    MULTIPAGE_DEDUP_MAX_DISTANCE: int = 4  # consecutive frames within this many dHash bits (of 256) are one page
+
+    # Preprocessing Execution Settings
+    PREPROCESS_EXECUTOR: str = "thread"  # "inline", "thread" or "process"
+    PREPROCESS_WORKERS: int = 2
+    PREPROCESS_INLINE_MAX_PIXELS: int = 250_000  # images decoding to fewer pixels (all frames, from headers) run inline
+
     # Rate Limiting Settings
     RATE_LIMIT_SINGLE: str = "100/minute"
     RATE_LIMIT_BATCH: str = "20/minute"
     RATE_LIMIT_GLOBAL: str = "200/minute"
+    RATE_LIMIT_JOBS: str = "10/minute"
+    RATE_LIMIT_STORAGE_URI: str = "memory://"  # "redis://host:6379/0" shares limits across instances
+    RATE_LIMIT_WORK_UNITS: str = "300/minute"  # per client, charged per image and per megapixel; "" disables
+    RATE_LIMIT_UNIT_MEGAPIXELS: float = 4.0  # each image costs 1 unit plus 1 per started block of this many MP
+
+    # Load Shedding Settings (503 + Retry-After instead of queueing work the instance can't finish)
+    SHED_VISION_PENDING: int = 64  # Vision calls running or waiting for a slot; 0 disables
+    SHED_QUEUED_BYTES: int = 192 * 1024 * 1024  # upload bytes admitted and not finished, plus queued job bytes
+    SHED_MAX_RETRY_AFTER: int = 30
+
+    # Memory Budget Settings (process-wide byte semaphore for uploads and decoded images)
+    MEMORY_BUDGET_BYTES: int = 1024 * 1024 * 1024  # size instance memory / concurrency from this; 0 disables
+    MEMORY_BYTES_PER_PIXEL: int = 8  # decoded RGB plus the working copies made while preprocessing
+    MEMORY_UNKNOWN_EXPANSION: int = 10  # decoded/encoded size ratio assumed when headers give no dimensions
+    MEMORY_ACQUIRE_TIMEOUT: float = 10.0  # seconds a request waits for budget before 503; 0 rejects at once
 
     model_config = ConfigDict(env_file=".env", case_sensitive=True)
 
@@ -0,0 +1,46 @@
+import time
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from src.config import settings
+from src.services.metrics import REQUEST_SECONDS, end_request_timings, server_timing_header, start_request_timings
+
+
+class MetricsMiddleware:
+    """
+    Records request latency per route and, when SERVER_TIMING_ENABLED, adds a Server-Timing header with
+    the stage durations observed while handling the request (summed across a batch's images).
+    Plain ASGI so streaming responses are passed through untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+        timings, token = start_request_timings() if settings.SERVER_TIMING_ENABLED else (None, None)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if timings is not None:
+                    header = server_timing_header(timings, time.perf_counter() - start)
+                    MutableHeaders(scope=message).append("Server-Timing", header)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                end_request_timings(token)
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route.path if route is not None else "unmatched",
+                status=status["code"],
+            )
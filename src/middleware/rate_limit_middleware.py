@@ -1,24 +1,32 @@
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
+from slowapi import Limiter
 from slowapi.errors import RateLimitExceeded
-import json
+from slowapi.util import get_remote_address
+from src.config import settings
 from src.services.logger import logger
 
+# The one request-count limiter for the app and every router; RATE_LIMIT_STORAGE_URI makes the counters
+# shared across instances. Work-unit limits (images, megapixels) are charged in services/work_limiter.py.
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=[settings.RATE_LIMIT_GLOBAL],
+    storage_uri=settings.RATE_LIMIT_STORAGE_URI,
+)
+
 
 async def rate_limit_handler(request: Request, exc: RateLimitExceeded) -> Response:
     """Custom rate limit exceeded handler with logging"""
 
     # Log the rate limit violation
     logger.warning(
-        json.dumps(
-            {
-                "event": "rate_limit_exceeded",
-                "ip": request.client.host,
-                "path": request.url.path,
-                "method": request.method,
-                "limit": str(exc.detail),
-            }
-        )
+        {
+            "event": "rate_limit_exceeded",
+            "ip": request.client.host,
+            "path": request.url.path,
+            "method": request.method,
+            "limit": str(exc.detail),
+        }
     )
 
     return JSONResponse(
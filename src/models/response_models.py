@@ -1,11 +1,61 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 
+class Encoding(BaseModel):
+    format: str
+    quality: Optional[int] = None
+    grayscale: bool = False
+    scale: float = 1.0
+    width: int
+    height: int
+    bytes: int
+    tiles: int = 0
+
+class Analysis(BaseModel):
+    blank: bool
+    ink_ratio: float
+    background: int
+    crop: Optional[List[int]] = None  # [x0, y0, x1, y1] in uploaded-image pixels
+
 class Metadata(BaseModel):
     width: int
     height: int
     format: str
     mimetype: str
+    encoding: Optional[Encoding] = None
+    analysis: Optional[Analysis] = None
+
+class BlockColumns(BaseModel):
+    confidence: List[float]
+    x0: List[int]
+    y0: List[int]
+    x1: List[int]
+    y1: List[int]
+
+class WordColumns(BaseModel):
+    text: List[str]
+    confidence: List[float]
+    block: List[int]
+    x0: List[int]
+    y0: List[int]
+    x1: List[int]
+    y1: List[int]
+
+class Layout(BaseModel):
+    """Columnar layout: one list per attribute; boxes are in uploaded-image pixels."""
+    blocks: Optional[BlockColumns] = None
+    words: Optional[WordColumns] = None
+
+class PageResult(BaseModel):
+    """One distinct page of a multi-frame GIF or multi-page TIFF; frames are the 0-based frames it stands for."""
+    index: int
+    frames: List[int]
+    text: str = ""
+    confidence: float = 0.0
+    blank: bool = False
+    encoding: Optional[Encoding] = None
+    timings_ms: Dict[str, float] = {}
+    layout: Optional[Layout] = None
 
 class OCRResult(BaseModel):
     filename: str
@@ -15,6 +65,9 @@ class OCRResult(BaseModel):
     metadata: Optional[Metadata] = None
     processing_time_ms: int = 0
     error: Optional[str] = None
+    near_duplicate: bool = False
+    layout: Optional[Layout] = None
+    pages: Optional[List[PageResult]] = None
 
 class SingleOCRResponse(BaseModel):
     success: bool
@@ -22,9 +75,27 @@ class SingleOCRResponse(BaseModel):
     confidence: float
     metadata: Metadata
     processing_time_ms: int
+    near_duplicate: bool = False
+    layout: Optional[Layout] = None
+    pages: Optional[List[PageResult]] = None
 
 class BatchOCRResponse(BaseModel):
     success: bool
     total_images: int
     total_processing_time_ms: int
     results: List[OCRResult]
+
+class JobResult(OCRResult):
+    index: int
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    status: str
+    total_images: int
+    completed: int
+    succeeded: int
+    failed: int
+    created_at: float
+    updated_at: float
+    offset: int = 0
+    results: List[JobResult] = []
@@ -0,0 +1,95 @@
+import math
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+from fastapi import HTTPException
+from src.config import settings
+from src.services import vision_client, vision_policy
+from src.services.job_service import job_manager
+from src.services.logger import logger
+from src.services.metrics import ADMISSION_REJECTED, ADMITTED_BYTES
+from src.utils.ingest import Upload
+
+# Adaptive load shedding: new synchronous OCR work is refused with 503 + Retry-After while Vision is
+# saturated or too many upload bytes are already admitted, instead of queueing work the instance can't
+# finish in time. Retry-After follows the current backlog and recent Vision latency.
+
+
+class AdmissionController:
+    """
+    vision_pending_limit: Vision calls running or waiting above which requests are shed (0 disables)
+    queued_bytes_limit: admitted, unfinished upload bytes (plus external_bytes()) above which requests are shed
+    external_bytes: other queued work competing for the same instance (e.g. the job queue)
+    """
+
+    def __init__(
+        self,
+        vision_pending_limit: int,
+        queued_bytes_limit: int,
+        max_retry_after: int,
+        external_bytes: Optional[Callable[[], int]] = None,
+    ):
+        self.vision_pending_limit = vision_pending_limit
+        self.queued_bytes_limit = queued_bytes_limit
+        self.max_retry_after = max_retry_after
+        self.external_bytes = external_bytes or (lambda: 0)
+        self.admitted_bytes = 0
+
+    def queued_bytes(self) -> int:
+        return self.admitted_bytes + self.external_bytes()
+
+    def _retry_after(self) -> int:
+        """Roughly how long the current Vision backlog takes to drain."""
+        median = vision_policy.latencies.percentile(50) or 1.0
+        backlog = vision_client.pending_calls() / max(1, settings.VISION_MAX_IN_FLIGHT)
+        return max(1, min(self.max_retry_after, math.ceil(backlog * median)))
+
+    def _shed(self, reason: str) -> None:
+        retry_after = self._retry_after()
+        ADMISSION_REJECTED.inc(reason=reason)
+        logger.warning({"event": "load_shed", "reason": reason, "retry_after": retry_after})
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at capacity. Please retry later.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def acquire(self, n_bytes: int, vision_calls: int = 1) -> None:
+        """
+        Admit a request carrying n_bytes of uploads that will make about vision_calls Vision calls, or raise
+        503; pair with release().
+        """
+        pending = vision_client.pending_calls()
+        if self.vision_pending_limit and pending and pending + vision_calls > self.vision_pending_limit:
+            self._shed("vision_pending")
+        # A request is always admitted into an idle instance, however large, so it can't be shed forever
+        if self.admitted_bytes and self.queued_bytes() + n_bytes > self.queued_bytes_limit:
+            self._shed("queued_bytes")
+        self.admitted_bytes += n_bytes
+        ADMITTED_BYTES.set(self.admitted_bytes)
+
+    def release(self, n_bytes: int) -> None:
+        self.admitted_bytes -= n_bytes
+        ADMITTED_BYTES.set(self.admitted_bytes)
+
+    @contextmanager
+    def admitted(self, n_bytes: int, vision_calls: int = 1):
+        self.acquire(n_bytes, vision_calls)
+        try:
+            yield
+        finally:
+            self.release(n_bytes)
+
+
+def expected_vision_calls(uploads: List[Upload]) -> int:
+    """Vision calls a request makes at most: one per page of multi-page uploads, the rest batched."""
+    multipage = sum(upload.pages for upload in uploads if upload.pages > 1)
+    single = sum(1 for upload in uploads if upload.pages == 1 and not upload.error)
+    return multipage + math.ceil(single / max(1, min(settings.VISION_BATCH_SIZE, 16)))
+
+
+admission = AdmissionController(
+    vision_pending_limit=settings.SHED_VISION_PENDING,
+    queued_bytes_limit=settings.SHED_QUEUED_BYTES,
+    max_retry_after=settings.SHED_MAX_RETRY_AFTER,
+    external_bytes=lambda: job_manager.queued_bytes,
+)
@@ -1,17 +1,218 @@
-from cachetools import TTLCache
-from src.utils.hashing import sha256_bytes
+import asyncio
+import weakref
+from collections import OrderedDict
+from typing import Optional, Tuple
+from src.utils.hashing import hamming_distance, sha256_bytes
 from datetime import datetime, timezone
 from src.config import settings
+from src.services.cache_store import ByteBudgetCache, decompress_result
+from src.services.kv_store import get_kv_store
+from src.services.logger import logger
+from src.services.metrics import CACHE_BYTES, CACHE_ENTRIES, CACHE_EVICTIONS, CACHE_LOOKUPS
 
-cache = TTLCache(maxsize=settings.CACHE_MAXSIZE, ttl=settings.CACHE_TTL)
+# L1: per-process, byte-budgeted cache of compressed results. L2 (optional, CACHE_L2_URL): shared
+# Redis-compatible store holding the same compressed payloads, read through on L1 misses and
+# written behind in the background.
+cache = ByteBudgetCache(
+    max_bytes=settings.CACHE_MAX_BYTES,
+    ttl=settings.CACHE_TTL,
+    maxsize=settings.CACHE_MAXSIZE,
+    compress_level=settings.CACHE_COMPRESSION_LEVEL,
+)
+CACHE_EVICTIONS.set_function(lambda: {(): cache.evictions})
+CACHE_BYTES.set_function(lambda: {(): cache.current_bytes})
+CACHE_ENTRIES.set_function(lambda: {(): len(cache)})
 
+_L2_KEY_PREFIX = "ocr:result:"
+_pending_writes = set()
 
-def get_cache(image_bytes: bytes):
-    key = sha256_bytes(image_bytes)
+# Perceptual index (optional, CACHE_PHASH_ENABLED): dHash -> exact cache key, so re-saved or
+# re-compressed copies of a page can be served from the cache entry of the original upload.
+_phash_index: "OrderedDict[int, str]" = OrderedDict()
+
+
+def _l2_key(key: str) -> str:
+    return f"{_L2_KEY_PREFIX}{key}"
+
+
+def get_cache(image_bytes: bytes, key: Optional[str] = None):
+    """L1 lookup only (no I/O). key: precomputed content hash, if the caller already has it."""
+    key = key or sha256_bytes(image_bytes)
     return cache.get(key)
 
 
-def set_cache(image_bytes: bytes, result: dict):
-    key = sha256_bytes(image_bytes)
+async def get_cache_async(image_bytes: bytes, key: Optional[str] = None, record_metrics: bool = True):
+    """
+    L1 lookup, then read-through from L2; L2 hits are promoted into L1.
+    record_metrics: count the lookup in ocr_cache_lookups_total (off for header-only peeks).
+    """
+    key = key or sha256_bytes(image_bytes)
+    cached = cache.get(key)
+    if cached is not None or not settings.CACHE_L2_URL:
+        if record_metrics:
+            CACHE_LOOKUPS.inc(outcome="l1_hit" if cached is not None else "miss")
+        return cached
+
+    try:
+        store = get_kv_store(settings.CACHE_L2_URL)
+        payload = await asyncio.wait_for(store.get(_l2_key(key)), timeout=settings.CACHE_L2_TIMEOUT)
+    except Exception as e:
+        # L2 is best-effort; a slow or unavailable store must never fail a request
+        logger.warning({"event": "cache_l2_error", "op": "get", "error": str(e)})
+        payload = None
+
+    if record_metrics:
+        CACHE_LOOKUPS.inc(outcome="l2_hit" if payload is not None else "miss")
+    if payload is None:
+        return None
+    cache.set_payload(key, payload)
+    return decompress_result(payload)
+
+
+async def _write_l2(key: str, payload: bytes):
+    try:
+        store = get_kv_store(settings.CACHE_L2_URL)
+        await asyncio.wait_for(
+            store.set(_l2_key(key), payload, ex=settings.CACHE_TTL), timeout=settings.CACHE_L2_TIMEOUT
+        )
+    except Exception as e:
+        logger.warning({"event": "cache_l2_error", "op": "set", "error": str(e)})
+
+
+def set_cache(image_bytes: bytes, result: dict, perceptual_hash: Optional[int] = None, key: Optional[str] = None):
+    key = key or sha256_bytes(image_bytes)
     result_with_meta = {**result, "_cached_at": datetime.now(timezone.utc).isoformat()}
     cache[key] = result_with_meta
+
+    if perceptual_hash is not None and settings.CACHE_PHASH_ENABLED and not result.get("near_duplicate"):
+        _phash_index[perceptual_hash] = key
+        _phash_index.move_to_end(perceptual_hash)
+        while len(_phash_index) > settings.CACHE_PHASH_INDEX_SIZE:
+            _phash_index.popitem(last=False)
+
+    if settings.CACHE_L2_URL:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop to write behind from (sync caller); L1 still holds the result
+        payload = cache.get_payload(key)
+        if payload is None:
+            return  # too large for L1's budget; not worth shipping to L2 either
+        task = loop.create_task(_write_l2(key, payload))
+        _pending_writes.add(task)
+        task.add_done_callback(_pending_writes.discard)
+
+
+async def flush_pending_writes():
+    """Wait for outstanding write-behind tasks (shutdown and tests)."""
+    if _pending_writes:
+        await asyncio.gather(*list(_pending_writes), return_exceptions=True)
+
+
+def find_near_duplicate(perceptual_hash: Optional[int]) -> Optional[dict]:
+    """Closest cached result within CACHE_PHASH_MAX_DISTANCE bits of perceptual_hash, if any."""
+    if perceptual_hash is None or not settings.CACHE_PHASH_ENABLED:
+        return None
+
+    best_distance, best_hash = settings.CACHE_PHASH_MAX_DISTANCE + 1, None
+    for candidate in _phash_index:
+        distance = hamming_distance(perceptual_hash, candidate)
+        if distance < best_distance:
+            best_distance, best_hash = distance, candidate
+            if distance == 0:
+                break
+    if best_hash is None:
+        return None
+
+    cached = cache.get(_phash_index[best_hash])
+    if cached is None:
+        del _phash_index[best_hash]  # the exact entry was evicted or expired
+        return None
+    _phash_index.move_to_end(best_hash)
+    return {**cached, "near_duplicate": True}
+
+
+def save_snapshot() -> int:
+    """Persist live L1 entries to CACHE_SNAPSHOT_PATH (called on shutdown)."""
+    if not settings.CACHE_SNAPSHOT_PATH:
+        return 0
+    try:
+        count = cache.snapshot(settings.CACHE_SNAPSHOT_PATH)
+    except Exception as e:
+        logger.warning({"event": "cache_snapshot_error", "op": "save", "error": str(e)})
+        return 0
+    logger.info({"event": "cache_snapshot_saved", "entries": count, "bytes": cache.current_bytes})
+    return count
+
+
+def restore_snapshot() -> int:
+    """Reload L1 from CACHE_SNAPSHOT_PATH at startup; expired entries are dropped."""
+    if not settings.CACHE_SNAPSHOT_PATH:
+        return 0
+    try:
+        count = cache.restore(settings.CACHE_SNAPSHOT_PATH)
+    except Exception as e:
+        logger.warning({"event": "cache_snapshot_error", "op": "restore", "error": str(e)})
+        return 0
+    logger.info({"event": "cache_snapshot_restored", "entries": count, "bytes": cache.current_bytes})
+    return count
+
+
+# Single-flight: concurrent misses for the same content hash share one OCR run.
+# Futures are loop-bound, so flights are tracked per event loop.
+_in_flight = weakref.WeakKeyDictionary()
+
+
+def cache_key(image_bytes: bytes) -> str:
+    return sha256_bytes(image_bytes)
+
+
+def result_key(key: str, layout_fields: frozenset = frozenset()) -> str:
+    """
+    Cache and flight key for a result: the content hash, plus the layout sections it carries, so text-only
+    callers never pay for layout and callers asking for it never get a result without it.
+    """
+    return f"{key}:{','.join(sorted(layout_fields))}" if layout_fields else key
+
+
+def join_flight(key: str) -> Tuple[asyncio.Future, bool]:
+    """Return (future, is_leader). The leader must call finish_flight(key, ...) exactly once."""
+    loop = asyncio.get_running_loop()
+    flights = _in_flight.setdefault(loop, {})
+    flight = flights.get(key)
+    if flight is not None:
+        return flight, False
+    flight = loop.create_future()
+    flights[key] = flight
+    return flight, True
+
+
+def finish_flight(
+    key: str,
+    result: Optional[dict] = None,
+    error: Optional[BaseException] = None,
+    flight: Optional[asyncio.Future] = None,
+):
+    """
+    Resolve a flight for all waiters; errors are propagated but never cached.
+    flight: the leader's own future; when given, a newer flight registered under key is left alone.
+    """
+    flights = _in_flight.get(asyncio.get_running_loop(), {})
+    if flight is not None and flights.get(key) is not flight:
+        return
+    flight = flights.pop(key, None)
+    if flight is None or flight.done():
+        return
+    if error is None:
+        flight.set_result(result)
+        return
+    if isinstance(error, asyncio.CancelledError):
+        error = RuntimeError("Coalesced OCR request was cancelled.")
+    flight.set_exception(error)
+    flight.exception()  # mark retrieved so a flight without waiters doesn't log "never retrieved"
+
+
+async def wait_flight(flight: asyncio.Future) -> dict:
+    """Await another caller's flight; shielded so a waiter's cancellation doesn't cancel the leader."""
+    return {**(await asyncio.shield(flight))}
+
@@ -0,0 +1,151 @@
+import json
+import os
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+_SNAPSHOT_MAGIC = b"OCRCACHE1"
+_ENTRY_HEADER = struct.Struct("<HdI")  # key length, expires_at (unix time), payload length
+_ENTRY_OVERHEAD = 200  # rough per-entry bookkeeping cost (key str, tuple, dict slot)
+
+
+def compress_result(result: dict, level: int = 6) -> bytes:
+    return zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"), level)
+
+
+def decompress_result(payload: bytes) -> dict:
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+
+class ByteBudgetCache:
+    """
+    LRU + TTL cache of result dicts, sized by compressed bytes rather than entry count.
+    Values are stored as zlib-compressed JSON; expiry uses wall-clock time so entries
+    can be snapshotted to disk and restored after a cold start.
+    max_bytes: memory budget for keys + compressed payloads
+    ttl: seconds an entry lives after it is written
+    maxsize: optional entry-count cap (0 disables)
+    """
+
+    def __init__(self, max_bytes: int, ttl: int, maxsize: int = 0, compress_level: int = 6, timer=time.time):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.compress_level = compress_level
+        self.timer = timer
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, payload)
+
+    @staticmethod
+    def _entry_size(key: str, payload: bytes) -> int:
+        return len(key) + len(payload) + _ENTRY_OVERHEAD
+
+    def _remove(self, key: str):
+        _, payload = self._entries.pop(key)
+        self.current_bytes -= self._entry_size(key, payload)
+
+    def _over_budget(self, needed: int) -> bool:
+        return self.current_bytes + needed > self.max_bytes or bool(
+            self.maxsize and len(self._entries) >= self.maxsize
+        )
+
+    def _evict_for(self, needed: int):
+        if self._over_budget(needed):
+            # Drop expired entries before evicting live ones
+            now = self.timer()
+            for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                self._remove(key)
+        while self._entries and self._over_budget(needed):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get_payload(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= self.timer():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def set_payload(self, key: str, payload: bytes, expires_at: Optional[float] = None):
+        size = self._entry_size(key, payload)
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return  # larger than the whole budget; don't thrash the cache for it
+        self._evict_for(size)
+        self._entries[key] = (expires_at if expires_at is not None else self.timer() + self.ttl, payload)
+        self.current_bytes += size
+
+    def get(self, key: str, default=None):
+        payload = self.get_payload(key)
+        return decompress_result(payload) if payload is not None else default
+
+    def __getitem__(self, key: str) -> dict:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: dict):
+        self.set_payload(key, compress_result(value, self.compress_level))
+
+    def __contains__(self, key: str) -> bool:
+        return self.get_payload(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def snapshot(self, path: str) -> int:
+        """Write live entries (oldest first) to path atomically; returns the number written."""
+        now = self.timer()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        count = 0
+        with open(tmp_path, "wb") as f:
+            f.write(_SNAPSHOT_MAGIC)
+            for key, (expires_at, payload) in self._entries.items():
+                if expires_at <= now:
+                    continue
+                encoded_key = key.encode("utf-8")
+                f.write(_ENTRY_HEADER.pack(len(encoded_key), expires_at, len(payload)))
+                f.write(encoded_key)
+                f.write(payload)
+                count += 1
+        os.replace(tmp_path, path)
+        return count
+
+    def restore(self, path: str) -> int:
+        """Load a snapshot written by snapshot(), skipping expired entries; returns the number loaded."""
+        if not os.path.exists(path):
+            return 0
+        now = self.timer()
+        count = 0
+        with open(path, "rb") as f:
+            if f.read(len(_SNAPSHOT_MAGIC)) != _SNAPSHOT_MAGIC:
+                raise ValueError("Not a cache snapshot file.")
+            while True:
+                header = f.read(_ENTRY_HEADER.size)
+                if len(header) < _ENTRY_HEADER.size:
+                    break
+                key_length, expires_at, payload_length = _ENTRY_HEADER.unpack(header)
+                key = f.read(key_length).decode("utf-8")
+                payload = f.read(payload_length)
+                if len(payload) < payload_length:
+                    break  # truncated snapshot; keep what we have
+                if expires_at > now:
+                    self.set_payload(key, payload, expires_at)
+                    count += 1
+        return count
@@ -0,0 +1,119 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from fastapi import HTTPException
+from src.config import settings
+from src.services.image_context import ImageContext
+from src.services.metrics import EXECUTOR_PENDING, observe_stage
+from src.services.preprocess import preprocess_image, request_jpeg_draft
+from src.utils.file_utils import _validate_image_bytes
+from src.utils.ingest import read_header_info, sniff_format
+
+# CPU-bound Pillow work (decode/validate + enhance/re-encode) runs "inline" on the event loop,
+# on the default thread pool ("thread"), or in a process pool ("process") so one uvicorn worker
+# can use several cores. Workers receive and return bytes, never PIL objects.
+
+_lock = threading.Lock()
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _lock:
+        if _process_pool is None:
+            # spawn, not fork: forking a process that already holds gRPC threads is unsafe
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max(1, settings.PREPROCESS_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _prepare_image_sync(contents: bytes, mimetype: str) -> ImageContext:
+    """Validate and preprocess; the decoded image is released before returning."""
+    image_ctx = _validate_image_bytes(contents, mimetype, draft=request_jpeg_draft)
+    return preprocess_image(image_ctx)
+
+
+def _prepare_in_worker(contents: bytes, mimetype: str):
+    """
+    Process-pool entry point. Returns (image_ctx, None) or (None, (status_code, detail)),
+    since HTTPException can't be pickled back to the parent.
+    """
+    try:
+        image_ctx = _prepare_image_sync(contents, mimetype)
+    except HTTPException as he:
+        return None, (he.status_code, he.detail)
+    image_ctx.raw_bytes = b""  # the parent already holds the upload; don't ship it back
+    return image_ctx, None
+
+
+def _record_timings(image_ctx: ImageContext, elapsed: Optional[float] = None) -> ImageContext:
+    """Record the stage timings measured by the worker; whatever else elapsed was spent queueing."""
+    for stage, seconds in image_ctx.timings.items():
+        observe_stage(stage, seconds)
+    if elapsed is not None:
+        observe_stage("queue_wait", max(0.0, elapsed - sum(image_ctx.timings.values())))
+    return image_ctx
+
+
+def _decoded_pixels(contents: bytes) -> int:
+    """Pixels the upload decodes to (all frames), from its headers; 0 when they can't be read."""
+    image_format = sniff_format(contents[:8])
+    if image_format is None:
+        return 0
+    width, height, n_frames = read_header_info(contents, image_format)
+    return width * height * max(1, n_frames)
+
+
+def _runs_inline(contents: bytes) -> bool:
+    """
+    Small images aren't worth an executor hop. Judged by decoded size, not upload size: a small PNG can
+    decode to a huge bitmap. Images whose headers can't be read are never run inline.
+    """
+    if settings.PREPROCESS_EXECUTOR == "inline":
+        return True
+    pixels = _decoded_pixels(contents)
+    return 0 < pixels < settings.PREPROCESS_INLINE_MAX_PIXELS
+
+
+async def prepare_image(contents: bytes, mimetype: str) -> ImageContext:
+    """Validate and preprocess an upload using the configured execution mode."""
+    mode = settings.PREPROCESS_EXECUTOR
+    if _runs_inline(contents):
+        return _record_timings(_prepare_image_sync(contents, mimetype))
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    with EXECUTOR_PENDING.track(executor="preprocess"):
+        if mode == "process":
+            image_ctx, error = await loop.run_in_executor(get_process_pool(), _prepare_in_worker, contents, mimetype)
+            if error:
+                raise HTTPException(status_code=error[0], detail=error[1])
+            image_ctx.raw_bytes = contents
+        else:
+            image_ctx = await loop.run_in_executor(None, _prepare_image_sync, contents, mimetype)
+    return _record_timings(image_ctx, time.perf_counter() - start)
+
+
+async def warm_up(contents: bytes, mimetype: str) -> int:
+    """Start every process-pool worker by running a tiny image through each; returns the workers started."""
+    if settings.PREPROCESS_EXECUTOR != "process":
+        return 0
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    workers = max(1, settings.PREPROCESS_WORKERS)
+    # Concurrent submissions make the pool spawn all its workers now rather than on the first requests
+    await asyncio.gather(*(loop.run_in_executor(pool, _prepare_in_worker, contents, mimetype) for _ in range(workers)))
+    return workers
+
+
+def shutdown() -> None:
+    global _process_pool
+    with _lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
@@ -0,0 +1,101 @@
+from typing import Iterable, Optional
+
+# Single traversal of Vision's full_text_annotation. Works on the raw protobuf (proto-plus wrappers
+# are slow to walk) and produces the mean word confidence plus per-block and per-word layout in a
+# columnar form: one list per attribute, so large documents serialize compactly.
+
+DEFAULT_FIELDS = frozenset({"text", "confidence"})
+LAYOUT_FIELDS = frozenset({"blocks", "words"})
+RESPONSE_FIELDS = DEFAULT_FIELDS | LAYOUT_FIELDS
+
+
+def parse_fields(fields: Optional[str]) -> frozenset:
+    """Parse a fields= query value ("text,confidence,words"); raises ValueError on unknown names."""
+    if not fields:
+        return DEFAULT_FIELDS
+    requested = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = requested - RESPONSE_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(sorted(RESPONSE_FIELDS))}.")
+    return requested
+
+
+def _new_columns(*names: str) -> dict:
+    return {name: [] for name in names}
+
+
+def _box(bounding_box) -> tuple:
+    """(x0, y0, x1, y1) enclosing a bounding polygon; zeros when Vision returned no vertices."""
+    vertices = bounding_box.vertices
+    if not vertices:
+        return (0, 0, 0, 0)
+    xs = [v.x for v in vertices]
+    ys = [v.y for v in vertices]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def _append_box(columns: dict, bounding_box, scale: float, offset: tuple = (0, 0)):
+    box = _box(bounding_box)
+    # Vision saw the (possibly downscaled) processed image; report original-image pixels
+    columns["x0"].append(round(box[0] / scale) + offset[0])
+    columns["y0"].append(round(box[1] / scale) + offset[1])
+    columns["x1"].append(round(box[2] / scale) + offset[0])
+    columns["y1"].append(round(box[3] / scale) + offset[1])
+
+
+def extract_annotation(
+    full_text, layout_fields: Iterable[str] = LAYOUT_FIELDS, scale: float = 1.0, offset: tuple = (0, 0)
+) -> dict:
+    """
+    Walk pages -> blocks -> paragraphs -> words once.
+    Returns {"confidence": mean word confidence or None, "layout": {"blocks": {...}, "words": {...}}}
+    with only the requested layout_fields present in layout (layout is None when none are requested).
+    scale: processed/original size ratio, used to map boxes back to the uploaded image.
+    offset: (x, y) of the processed region in the uploaded image, when its margins were cropped.
+    """
+    layout_fields = frozenset(layout_fields) & LAYOUT_FIELDS
+    want_blocks = "blocks" in layout_fields
+    want_words = "words" in layout_fields
+    blocks = _new_columns("confidence", "x0", "y0", "x1", "y1") if want_blocks else None
+    words = _new_columns("text", "confidence", "block", "x0", "y0", "x1", "y1") if want_words else None
+
+    total, count = 0.0, 0
+    pb = type(full_text).pb(full_text) if full_text is not None and hasattr(type(full_text), "pb") else full_text
+    block_index = 0
+    for page in (pb.pages if pb is not None else ()):
+        for block in page.blocks:
+            if want_blocks:
+                blocks["confidence"].append(round(block.confidence, 3))
+                _append_box(blocks, block.bounding_box, scale, offset)
+            for paragraph in block.paragraphs:
+                for word in paragraph.words:
+                    # word.confidence is a float between 0 and 1
+                    total += word.confidence
+                    count += 1
+                    if want_words:
+                        words["text"].append("".join(symbol.text for symbol in word.symbols))
+                        words["confidence"].append(round(word.confidence, 3))
+                        words["block"].append(block_index)
+                        _append_box(words, word.bounding_box, scale, offset)
+            block_index += 1
+
+    layout = {}
+    if want_blocks:
+        layout["blocks"] = blocks
+    if want_words:
+        layout["words"] = words
+    return {
+        "confidence": round(total / count, 3) if count else None,
+        "layout": layout or None,
+    }
+
+
+def select_fields(result: dict, fields: frozenset) -> dict:
+    """Drop layout sections the caller didn't ask for (also from each page of a multi-page result)."""
+    if result.get("pages"):
+        result = {**result, "pages": [select_fields(page, fields) for page in result["pages"]]}
+    layout = result.get("layout")
+    if not layout:
+        return result
+    selected = {name: columns for name, columns in layout.items() if name in fields}
+    return {**result, "layout": selected or None}
@@ -0,0 +1,110 @@
+import asyncio
+import random
+import time
+from typing import List, Optional
+from google.api_core import exceptions as google_exceptions
+from google.cloud import vision
+from src.config import settings
+
+# Local stand-in for the Vision API (VISION_BACKEND="fake"), used by the benchmark suite and for load
+# tests that must not spend Vision quota. Latency, RPC error rate and the returned annotation are
+# configurable; the sync and async clients mirror the two transports in vision_client.
+
+
+def _word(text: str, x: int, y: int, confidence: float) -> vision.Word:
+    box = vision.BoundingPoly(
+        vertices=[vision.Vertex(x=x, y=y), vision.Vertex(x=x + 40, y=y), vision.Vertex(x=x + 40, y=y + 20), vision.Vertex(x=x, y=y + 20)]
+    )
+    return vision.Word(symbols=[vision.Symbol(text=c) for c in text], confidence=confidence, bounding_box=box)
+
+
+def synthetic_response(words: int = 200, words_per_block: int = 20) -> vision.AnnotateImageResponse:
+    """A document-shaped response with the given number of words split into blocks."""
+    rng = random.Random(words)
+    texts = [f"word{index}" for index in range(words)]
+    blocks = []
+    for start in range(0, words, words_per_block):
+        block_words = [
+            _word(text, 50 * (i % 10), 30 * (start // 10 + i // 10), round(rng.uniform(0.7, 1.0), 3))
+            for i, text in enumerate(texts[start:start + words_per_block])
+        ]
+        blocks.append(
+            vision.Block(
+                confidence=0.9,
+                bounding_box=block_words[0].bounding_box,
+                paragraphs=[vision.Paragraph(words=block_words)],
+            )
+        )
+    text = " ".join(texts)
+    return vision.AnnotateImageResponse(
+        text_annotations=[vision.EntityAnnotation(description=text)],
+        full_text_annotation=vision.TextAnnotation(pages=[vision.Page(blocks=blocks)], text=text),
+    )
+
+
+def load_response(path: str) -> vision.AnnotateImageResponse:
+    """Canned AnnotateImageResponse from a JSON file (the REST/JSON form of a real Vision response)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return vision.AnnotateImageResponse.from_json(f.read(), ignore_unknown_fields=True)
+
+
+class FakeVisionBackend:
+    """
+    Shared behaviour of the fake clients.
+    latency_ms: fixed delay per RPC, plus up to jitter_ms of random extra delay
+    error_rate: probability that an RPC fails with ServiceUnavailable
+    response: canned AnnotateImageResponse returned for every image
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        response: Optional[vision.AnnotateImageResponse] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.response = response if response is not None else synthetic_response()
+        self.calls = 0
+        self.images = 0
+        self._random = random.Random(seed)
+
+    def _delay(self) -> float:
+        return (self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+
+    def _respond(self, requests: List[vision.AnnotateImageRequest]) -> vision.BatchAnnotateImagesResponse:
+        self.calls += 1
+        self.images += len(requests)
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise google_exceptions.ServiceUnavailable("Fake Vision backend error.")
+        return vision.BatchAnnotateImagesResponse(responses=[self.response] * len(requests))
+
+
+class FakeVisionClient(FakeVisionBackend):
+    """Blocking client with the ImageAnnotatorClient.batch_annotate_images signature."""
+
+    def batch_annotate_images(self, requests, timeout=None, **kwargs):
+        time.sleep(self._delay())
+        return self._respond(requests)
+
+
+class FakeVisionAsyncClient(FakeVisionBackend):
+    """Coroutine client with the ImageAnnotatorAsyncClient.batch_annotate_images signature."""
+
+    async def batch_annotate_images(self, requests, timeout=None, **kwargs):
+        await asyncio.sleep(self._delay())
+        return self._respond(requests)
+
+
+def backend_options() -> dict:
+    """FakeVisionBackend arguments from the VISION_FAKE_* settings."""
+    response = load_response(settings.VISION_FAKE_RESPONSE_PATH) if settings.VISION_FAKE_RESPONSE_PATH else None
+    return {
+        "latency_ms": settings.VISION_FAKE_LATENCY_MS,
+        "jitter_ms": settings.VISION_FAKE_JITTER_MS,
+        "error_rate": settings.VISION_FAKE_ERROR_RATE,
+        "response": response,
+    }
@@ -0,0 +1,49 @@
+from dataclasses import dataclass, field
+from typing import Optional
+from PIL import Image
+
+
+@dataclass
+class ImageContext:
+    """
+    A single upload decoded once and carried through validation, preprocessing and metadata.
+    raw_bytes: original uploaded bytes
+    format / width / height / n_frames: read from the original image while validating
+    image: decoded PIL image, released once preprocessing has encoded it
+    processed_*: the bytes sent to Vision and their dimensions
+    analysis: page analysis (blank, ink_ratio, background, crop) from preprocessing; crop is in original pixels
+    encoding: parameters chosen by the adaptive encoder (format, quality, grayscale, scale, ...)
+    tiles: for a tiled image (see tiling), {"box", "owns", "bytes"} per tile; processed_bytes is then None
+    pages: for a multi-page upload (see preprocess_image), one preprocessed context per distinct page;
+           the upload's own processed_bytes and encoding then stay None
+    frames: for a page of a multi-page upload, the frame indices it stands for (near-identical repeats included)
+    layout_fields: layout sections ("blocks", "words") to extract from the Vision response, as requested
+    perceptual_hash: 256-bit dHash (16x16 difference hash) of the decoded image, when near-duplicate lookup is enabled
+    timings: seconds spent per preprocessing stage (decode, analyze, resize, enhance, encode); measured wherever
+             the work ran (thread or worker process) and recorded as metrics by the caller
+    """
+
+    raw_bytes: bytes
+    mimetype: str
+    format: str
+    width: int
+    height: int
+    n_frames: int = 1
+    image: Optional[Image.Image] = None
+    processed_bytes: Optional[bytes] = None
+    processed_width: int = 0
+    processed_height: int = 0
+    encoding: Optional[dict] = None
+    analysis: Optional[dict] = None
+    tiles: list = field(default_factory=list)
+    pages: list = field(default_factory=list)
+    frames: list = field(default_factory=list)
+    layout_fields: frozenset = frozenset()
+    perceptual_hash: Optional[int] = None
+    timings: dict = field(default_factory=dict)
+
+    def release(self) -> None:
+        """Drop the decoded image so its pixel buffer can be freed."""
+        if self.image is not None:
+            self.image.close()
+            self.image = None
@@ -0,0 +1,150 @@
+import asyncio
+import uuid
+from collections import Counter
+from typing import List, Optional
+from fastapi import HTTPException
+from src.config import settings
+from src.models.response_models import OCRResult
+from src.services.job_store import create_job_store
+from src.services.logger import logger
+from src.services.memory_budget import memory_budget, reserve_uploads
+from src.services.ocr_service import process_upload
+from src.utils.ingest import Upload
+
+INTERRUPTED_ERROR = "Job was interrupted by a restart. Please resubmit this image."
+
+
+class JobManager:
+    """
+    Asynchronous OCR jobs: uploads are queued as (job_id, index, Upload) work items and processed by a
+    bounded pool of in-process worker tasks through the regular single-image path (cache, coalescing).
+    queue_factory: creates the work queue (asyncio.Queue-compatible); store: job/result store, called on the
+    default executor when it is blocking; budget: MemoryBudget the queued upload bytes are pinned in.
+    """
+
+    def __init__(self, store, workers: int, max_queued_bytes: int, queue_factory=asyncio.Queue, budget=None):
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queued_bytes = max_queued_bytes
+        self.queue_factory = queue_factory
+        self.budget = budget
+        self.queued_bytes = 0
+        self._queue = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop = None
+
+    def start(self) -> None:
+        """Start workers on the running loop (idempotent; restarts them if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks and not all(task.done() for task in self._tasks):
+            return
+        self._loop = loop
+        self._queue = self.queue_factory()
+        self._unqueue(self.queued_bytes)  # items left in the old loop's queue are gone
+        self._tasks = [loop.create_task(self._worker(n)) for n in range(self.workers)]
+
+    async def shutdown(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def queue_room(self) -> int:
+        """Upload bytes a new job may still add before the queue holds JOB_MAX_QUEUED_BYTES."""
+        return max(0, self.max_queued_bytes - self.queued_bytes)
+
+    @staticmethod
+    def queue_full_error() -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="Job queue is full. Please retry later.",
+            headers={"Retry-After": "30"},
+        )
+
+    async def submit(self, uploads: List[Upload]) -> dict:
+        """
+        Queue a job; raises 503 when the queue already holds JOB_MAX_QUEUED_BYTES of uploads or the
+        memory budget can't hold the job's bytes until the workers get to them.
+        """
+        self.start()
+        job_bytes = sum(len(upload.contents) for upload in uploads)
+        if job_bytes > self.queue_room():
+            raise self.queue_full_error()
+        if self.budget is not None:
+            self.budget.pin(job_bytes)
+        self.queued_bytes += job_bytes
+
+        try:
+            await self._call_store(self.store.purge_expired, settings.JOB_RESULT_TTL)
+            job = await self._call_store(self.store.create_job, uuid.uuid4().hex, len(uploads))
+        except BaseException:
+            self._unqueue(job_bytes)
+            raise
+        for index, upload in enumerate(uploads):
+            self._queue.put_nowait((job["job_id"], index, upload))
+
+        logger.info({"event": "job_submitted", "job_id": job["job_id"], "total_images": len(uploads)})
+        return job
+
+    def fail_interrupted(self) -> int:
+        """
+        Fail the items of jobs a previous process left unfinished (persistent stores only). Their uploads
+        lived in that process's queue and cannot be re-queued, so each missing item gets an error result
+        and the job completes. Call once at startup, before any job is submitted.
+        """
+        items = self.store.unfinished_items()
+        for job_id, index in items:
+            self.store.add_result(job_id, index, OCRResult(filename="", success=False, error=INTERRUPTED_ERROR).model_dump())
+        for job_id, count in Counter(job_id for job_id, _ in items).items():
+            logger.warning({"event": "job_interrupted", "job_id": job_id, "failed_items": count})
+        return len(items)
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        return await self._call_store(self.store.get_job, job_id)
+
+    async def get_results(self, job_id: str, offset: int, limit: int) -> List[dict]:
+        return await self._call_store(self.store.get_results, job_id, offset, limit)
+
+    async def _call_store(self, method, *args):
+        """Blocking stores (SQLite) run on the default executor, off the event loop."""
+        if not self.store.blocking:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    def _unqueue(self, n_bytes: int) -> None:
+        self.queued_bytes -= n_bytes
+        if self.budget is not None and n_bytes:
+            self.budget.unpin(n_bytes)
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job_id, index, upload = await self._queue.get()
+            try:
+                # Background work waits for memory budget rather than failing
+                async with reserve_uploads([upload]) as reservation:
+                    result = await process_upload(upload, reservation=reservation)
+                await self._call_store(self.store.add_result, job_id, index, result.model_dump())
+            except Exception as e:
+                logger.error({"event": "job_item_error", "job_id": job_id, "index": index, "error": str(e)})
+                error_result = OCRResult(filename=upload.filename, success=False, error=str(e)).model_dump()
+                await self._call_store(self.store.add_result, job_id, index, error_result)
+            finally:
+                self._unqueue(len(upload.contents))
+                self._queue.task_done()
+
+            job = await self._call_store(self.store.get_job, job_id)
+            if job and job["status"] == "completed":
+                logger.info({
+                    "event": "job_completed",
+                    "job_id": job_id,
+                    "total_images": job["total_images"],
+                    "failed": job["failed"],
+                })
+
+
+job_manager = JobManager(
+    create_job_store(settings.JOB_STORE_URL),
+    workers=settings.JOB_WORKERS,
+    max_queued_bytes=settings.JOB_MAX_QUEUED_BYTES,
+    budget=memory_budget,
+)
@@ -0,0 +1,192 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+# Result stores for asynchronous OCR jobs. Both keep the same shapes:
+# job dict: job_id, status (queued/running/completed), total_images, completed, succeeded, failed,
+#           created_at, updated_at (unix seconds)
+# result dict: index plus the OCRResult fields
+
+
+def _job_status(total: int, completed: int) -> str:
+    if completed >= total:
+        return "completed"
+    return "running" if completed else "queued"
+
+
+class InMemoryJobStore:
+    """Per-process job store; jobs are lost on restart."""
+
+    blocking = False  # cheap dict operations, called directly on the event loop
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._results = {}
+
+    def create_job(self, job_id: str, total_images: int) -> dict:
+        now = time.time()
+        job = {
+            "job_id": job_id,
+            "status": _job_status(total_images, 0),
+            "total_images": total_images,
+            "completed": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._results[job_id] = {}
+        return dict(job)
+
+    def add_result(self, job_id: str, index: int, result: dict) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or index in self._results[job_id]:
+                return
+            self._results[job_id][index] = {"index": index, **result}
+            job["completed"] += 1
+            job["succeeded" if result.get("success") else "failed"] += 1
+            job["status"] = _job_status(job["total_images"], job["completed"])
+            job["updated_at"] = time.time()
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 50) -> List[dict]:
+        """Completed results ordered by input index."""
+        with self._lock:
+            results = self._results.get(job_id, {})
+            return [results[index] for index in sorted(results)[offset:offset + limit]]
+
+    def unfinished_items(self) -> List[Tuple[str, int]]:
+        """Nothing outlives the process, so no job is left over from a previous one."""
+        return []
+
+    def purge_expired(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items() if job["updated_at"] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+                del self._results[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore:
+    """Job store in a local SQLite file; survives restarts of the process on the same disk."""
+
+    blocking = True  # disk I/O: JobManager runs these calls on the default executor
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " job_id TEXT PRIMARY KEY, total_images INTEGER, completed INTEGER, succeeded INTEGER,"
+            " failed INTEGER, created_at REAL, updated_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            " job_id TEXT, idx INTEGER, result TEXT, PRIMARY KEY (job_id, idx))"
+        )
+
+    @staticmethod
+    def _row_to_job(row) -> dict:
+        job_id, total, completed, succeeded, failed, created_at, updated_at = row
+        return {
+            "job_id": job_id,
+            "status": _job_status(total, completed),
+            "total_images": total,
+            "completed": completed,
+            "succeeded": succeeded,
+            "failed": failed,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+
+    def create_job(self, job_id: str, total_images: int) -> dict:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs VALUES (?, ?, 0, 0, 0, ?, ?)", (job_id, total_images, now, now)
+            )
+        return self._row_to_job((job_id, total_images, 0, 0, 0, now, now))
+
+    def add_result(self, job_id: str, index: int, result: dict) -> None:
+        success_column = "succeeded" if result.get("success") else "failed"
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO job_results VALUES (?, ?, ?)",
+                    (job_id, index, json.dumps({"index": index, **result})),
+                ).rowcount
+                if inserted:
+                    self._conn.execute(
+                        f"UPDATE jobs SET completed = completed + 1, {success_column} = {success_column} + 1,"
+                        " updated_at = ? WHERE job_id = ?",
+                        (time.time(), job_id),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, total_images, completed, succeeded, failed, created_at, updated_at"
+                " FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def get_results(self, job_id: str, offset: int = 0, limit: int = 50) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM job_results WHERE job_id = ? ORDER BY idx LIMIT ? OFFSET ?",
+                (job_id, limit, offset),
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def unfinished_items(self) -> List[Tuple[str, int]]:
+        """(job_id, index) of every item without a result, ordered by job and index."""
+        with self._lock:
+            jobs = self._conn.execute(
+                "SELECT job_id, total_images FROM jobs WHERE completed < total_images ORDER BY created_at"
+            ).fetchall()
+            items = []
+            for job_id, total in jobs:
+                done = {row[0] for row in self._conn.execute("SELECT idx FROM job_results WHERE job_id = ?", (job_id,))}
+                items.extend((job_id, index) for index in range(total) if index not in done)
+        return items
+
+    def purge_expired(self, max_age: float) -> int:
+        cutoff = time.time() - max_age
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM job_results WHERE job_id IN (SELECT job_id FROM jobs WHERE updated_at < ?)", (cutoff,)
+            )
+            return self._conn.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,)).rowcount
+
+
+def create_job_store(url: str):
+    """"memory://" or "sqlite:///path/to/jobs.sqlite3"."""
+    if url.startswith("sqlite:///"):
+        return SQLiteJobStore(url[len("sqlite:///"):])
+    if url.startswith("memory://"):
+        return InMemoryJobStore()
+    raise ValueError(f"Unsupported JOB_STORE_URL: {url}")
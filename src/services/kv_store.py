@@ -0,0 +1,65 @@
+import asyncio
+import time
+import weakref
+from typing import Optional
+from src.config import settings
+
+
+class InMemoryKV:
+    """
+    In-process stand-in for the subset of the redis.asyncio API we use (get/set with expiry/delete).
+    Selected with a "memory://" URL; handy for local runs and tests without a Redis server.
+    """
+
+    def __init__(self):
+        self._data = {}
+
+    def _live(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    async def set(self, key: str, value: bytes, ex: Optional[int] = None):
+        self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+
+    async def flushdb(self):
+        self._data.clear()
+        return True
+
+
+_memory_stores = {}
+_redis_clients = weakref.WeakKeyDictionary()
+
+
+def get_kv_store(url: str):
+    """
+    Return a Redis-compatible async store for url ("memory://name" or "redis://...").
+    Memory stores are shared per URL; redis.asyncio clients are bound to a loop, so one per loop.
+    """
+    if url.startswith("memory://"):
+        if url not in _memory_stores:
+            _memory_stores[url] = InMemoryKV()
+        return _memory_stores[url]
+
+    import redis.asyncio as redis_asyncio
+
+    loop = asyncio.get_running_loop()
+    clients = _redis_clients.setdefault(loop, {})
+    if url not in clients:
+        clients[url] = redis_asyncio.Redis.from_url(
+            url, socket_timeout=settings.CACHE_L2_TIMEOUT, socket_connect_timeout=settings.CACHE_L2_TIMEOUT
+        )
+    return clients[url]
@@ -1,15 +1,144 @@
+import atexit
+import hashlib
+import json
 import logging
+import logging.handlers
 import os
-import json
+import queue
+import random
+import sys
+from src.config import settings
+
+# Log calls pass a dict: logger.info({"event": "...", ...}). On the calling thread we only sample and
+# enqueue; truncating large fields and JSON serialization happen on the background listener thread,
+# so logging never blocks the event loop on disk I/O or on dumping a multi-page OCR result.
+
+
+def _shrink(value):
+    """Replace oversized strings with a preview + hash and long lists with their length."""
+    if isinstance(value, str):
+        if len(value) <= settings.LOG_MAX_FIELD_CHARS:
+            return value
+        return {
+            "preview": value[:settings.LOG_TRUNCATE_PREVIEW_CHARS],
+            "chars": len(value),
+            "sha256": hashlib.sha256(value.encode("utf-8", "replace")).hexdigest()[:16],
+        }
+    if isinstance(value, dict):
+        return {key: _shrink(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if len(value) > settings.LOG_MAX_LIST_ITEMS:
+            return {"items": len(value)}
+        return [_shrink(item) for item in value]
+    return value
+
+
+def _payload(record: logging.LogRecord):
+    """The record's message as a JSON-ready value: shrunk dicts, or plain / pre-serialized strings."""
+    if isinstance(record.msg, dict):
+        return _shrink(record.msg)
+    message = record.getMessage()
+    try:
+        return json.loads(message)  # legacy json.dumps(...) messages
+    except ValueError:
+        return message
+
+
+class JSONLineFormatter(logging.Formatter):
+    """{"time": ..., "level": ..., "message": {...}} per line (file log format)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {"time": self.formatTime(record), "level": record.levelname, "message": _payload(record)}
+        if record.exc_text:
+            line["exc_info"] = record.exc_text
+        return json.dumps(line, default=str)
+
+
+class CloudLoggingFormatter(logging.Formatter):
+    """Structured stdout lines that Cloud Logging parses (severity + flattened fields)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = _payload(record)
+        line = {"severity": record.levelname, "time": self.formatTime(record), "logger": record.name}
+        if isinstance(payload, dict):
+            line.update(payload)
+            line.setdefault("message", payload.get("event", ""))
+        else:
+            line["message"] = payload
+        if record.exc_text:
+            line["exc_info"] = record.exc_text
+        return json.dumps(line, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of records per event name (LOG_SAMPLE_RATES), decided before enqueueing."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not isinstance(record.msg, dict):
+            return True
+        rate = settings.LOG_SAMPLE_RATES.get(record.msg.get("event"), 1.0)
+        if rate >= 1.0:
+            return True
+        if random.random() >= rate:
+            return False
+        record.msg = {**record.msg, "sample_rate": rate}
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers formatting to the listener and drops (and counts) records when full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if isinstance(record.msg, dict):
+            record.msg = dict(record.msg)  # shallow copy: callers may keep mutating their dict
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _build_handlers():
+    handlers = []
+    if settings.LOG_FILE:
+        directory = os.path.dirname(settings.LOG_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = logging.FileHandler(settings.LOG_FILE)
+        file_handler.setFormatter(JSONLineFormatter())
+        handlers.append(file_handler)
+    if settings.LOG_STDOUT:
+        stdout_handler = logging.StreamHandler(sys.stdout)
+        stdout_handler.setFormatter(CloudLoggingFormatter())
+        handlers.append(stdout_handler)
+    return handlers
 
-os.makedirs("logs", exist_ok=True)
 
 logger = logging.getLogger("ocr_service")
 logger.setLevel(logging.INFO)
+logger.propagate = False
+
+queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+queue_handler.addFilter(SamplingFilter())
+logger.addHandler(queue_handler)
+
+listener = logging.handlers.QueueListener(queue_handler.queue, *_build_handlers(), respect_handler_level=True)
+listener.start()
+
+
+def stop_listener() -> None:
+    """Flush queued records and stop the writer thread (safe to call more than once)."""
+    if listener._thread is not None:
+        listener.stop()
+
 
-file_handler = logging.FileHandler("logs/ocr_service.log")
-formatter = logging.Formatter(
-    '{"time": "%(asctime)s", "level": "%(levelname)s", "message": %(message)s}'
-)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+atexit.register(stop_listener)
@@ -0,0 +1,186 @@
+import asyncio
+import heapq
+from collections import deque
+from typing import List, Optional
+from fastapi import HTTPException
+from src.config import settings
+from src.services.logger import logger
+from src.services.metrics import MEMORY_BUDGET_IN_USE, MEMORY_BUDGET_REJECTED
+from src.utils.ingest import Upload
+
+# Process-wide memory budget for image work. Before processing, a request reserves its upload bytes
+# plus the decoded size of the images it will have open at once (from header-sniffed dimensions), so
+# peak memory stays under MEMORY_BUDGET_BYTES however many requests arrive. The decoded part is
+# handed back as soon as preprocessing has finished, before the (slow) Vision call. Upload bytes queued
+# for async jobs are pinned: held without waiting until a job worker has processed them.
+
+
+def upload_cost(upload: Upload) -> tuple:
+    """
+    (raw bytes, decoded bytes) for one upload: the bytes plus an encoded copy per page, and the decoded
+    pixels of one page (multi-page uploads decode one frame at a time, but keep every page's encoded copy).
+    """
+    raw = 2 * len(upload.contents)  # upload + preprocessed copy sent to Vision (never larger in practice)
+    if upload.error:
+        return raw, 0
+    if upload.width and upload.height:
+        decoded = upload.width * upload.height * settings.MEMORY_BYTES_PER_PIXEL
+    else:
+        decoded = len(upload.contents) * settings.MEMORY_UNKNOWN_EXPANSION  # header couldn't be parsed
+    if upload.pages > 1:
+        raw = len(upload.contents) + upload.pages * max(
+            len(upload.contents) // upload.n_frames, decoded // settings.MEMORY_UNKNOWN_EXPANSION
+        )
+    return raw, decoded
+
+
+def estimate(uploads: List[Upload], concurrency: int) -> tuple:
+    """(raw, decoded) for a request whose images are prepared `concurrency` at a time."""
+    costs = [upload_cost(upload) for upload in uploads]
+    raw = sum(cost[0] for cost in costs)
+    decoded = sum(heapq.nlargest(max(1, concurrency), (cost[1] for cost in costs)))
+    return raw, decoded
+
+
+class MemoryBudget:
+    """
+    Byte semaphore with FIFO waiters. A reservation larger than what pinned bytes leave of the budget is
+    clamped to it, so it runs alone instead of never (pinned bytes are only freed by work that may itself
+    be waiting here).
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self.pinned = 0  # part of in_use
+        self._waiters = deque()  # (n_bytes, future)
+
+    def _clamp(self, n_bytes: int) -> int:
+        return min(n_bytes, self.max_bytes - self.pinned)
+
+    def _fits(self, n_bytes: int) -> bool:
+        return self.in_use + self._clamp(n_bytes) <= self.max_bytes
+
+    def _grant(self, n_bytes: int) -> int:
+        n_bytes = self._clamp(n_bytes)
+        self.in_use += n_bytes
+        MEMORY_BUDGET_IN_USE.set(self.in_use)
+        return n_bytes
+
+    def pin(self, n_bytes: int) -> None:
+        """Hold n_bytes until unpin() without waiting (queued job uploads); raises 503 when they don't fit."""
+        if self.in_use + n_bytes > self.max_bytes:
+            self._reject(n_bytes)
+        self.pinned += n_bytes
+        self.in_use += n_bytes
+        MEMORY_BUDGET_IN_USE.set(self.in_use)
+
+    def unpin(self, n_bytes: int) -> None:
+        self.pinned -= n_bytes
+        self.release(n_bytes)
+
+    async def acquire(self, n_bytes: int, timeout: Optional[float]) -> int:
+        """
+        Reserve n_bytes (clamped when granted); returns the amount reserved. Waits up to timeout seconds
+        (None waits indefinitely, 0 fails immediately) and raises 503 when it can't be granted.
+        """
+        if n_bytes <= 0:
+            return 0
+        if not self._waiters and self._fits(n_bytes):
+            return self._grant(n_bytes)
+        if timeout == 0:
+            self._reject(n_bytes)
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (n_bytes, future)
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            self._reject(n_bytes)
+        except asyncio.CancelledError:
+            self._forget(waiter)
+            raise
+
+    def _forget(self, waiter) -> None:
+        _, future = waiter
+        if future.done() and not future.cancelled():
+            self.release(future.result())  # granted just as we gave up
+        else:
+            future.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._wake()
+
+    def _reject(self, n_bytes: int) -> None:
+        MEMORY_BUDGET_REJECTED.inc()
+        logger.warning({"event": "memory_budget_exhausted", "requested": n_bytes, "in_use": self.in_use})
+        raise HTTPException(
+            status_code=503,
+            detail="Server is at memory capacity. Please retry later.",
+            headers={"Retry-After": "5"},
+        )
+
+    def release(self, n_bytes: int) -> None:
+        self.in_use -= n_bytes
+        MEMORY_BUDGET_IN_USE.set(self.in_use)
+        self._wake()
+
+    def _wake(self) -> None:
+        # Strict FIFO: a large waiter at the head isn't starved by smaller ones behind it
+        while self._waiters:
+            n_bytes, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(n_bytes):
+                break
+            self._waiters.popleft()
+            future.set_result(self._grant(n_bytes))
+
+
+class MemoryReservation:
+    """
+    async with reserve_uploads(uploads, ...) as reservation: ...  (or acquire() / release())
+    release_decoded() returns the decoded-pixel part early, once images have been encoded and closed.
+    """
+
+    def __init__(self, budget: Optional[MemoryBudget], raw: int, decoded: int, timeout: Optional[float]):
+        self.budget = budget
+        self.raw = raw
+        self.decoded = decoded
+        self.timeout = timeout
+        self.held = 0
+
+    async def acquire(self) -> None:
+        if self.budget is not None:
+            self.held = await self.budget.acquire(self.raw + self.decoded, self.timeout)
+
+    def release_decoded(self) -> None:
+        amount = min(self.decoded, self.held - self.raw) if self.held > self.raw else 0
+        if amount > 0:
+            self.held -= amount
+            self.budget.release(amount)
+        self.decoded = 0
+
+    def release(self) -> None:
+        if self.held:
+            self.budget.release(self.held)
+            self.held = 0
+
+    async def __aenter__(self) -> "MemoryReservation":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self.release()
+
+
+memory_budget = MemoryBudget(settings.MEMORY_BUDGET_BYTES) if settings.MEMORY_BUDGET_BYTES else None
+
+
+def reserve_uploads(uploads: List[Upload], concurrency: int = 1, timeout: Optional[float] = None) -> MemoryReservation:
+    """Reservation for processing uploads `concurrency` at a time; a no-op when the budget is disabled."""
+    raw, decoded = estimate(uploads, concurrency)
+    return MemoryReservation(memory_budget, raw, decoded, timeout)
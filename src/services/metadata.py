@@ -1,12 +1,19 @@
-from PIL import Image
-import io
+from src.services.image_context import ImageContext
 
-def extract_metadata(raw_bytes: bytes, original_format: str, mimetype: str):
+def extract_metadata(image_ctx: ImageContext):
     """
-    Extract image metadata for OCR.
-    raw_bytes: preprocessed bytes (JPEG for Vision)
-    original_format: original uploaded format (PNG, GIF, etc.)
+    Extract image metadata for OCR from the already decoded image context.
+    width/height: dimensions of the uploaded image
+    format: original uploaded format (PNG, GIF, etc.)
     mimetype: original uploaded mimetype (image/png etc.)
+    encoding: how the image was re-encoded for Vision (format, size, scale, grayscale)
+    analysis: page analysis before encoding (blank page, ink ratio, background, margin crop)
     """
-    img = Image.open(io.BytesIO(raw_bytes))
-    return {"width": img.width, "height": img.height, "format": original_format, "mimetype": mimetype}
+    return {
+        "width": image_ctx.width,
+        "height": image_ctx.height,
+        "format": image_ctx.format,
+        "mimetype": image_ctx.mimetype,
+        "encoding": image_ctx.encoding,
+        "analysis": image_ctx.analysis,
+    }
@@ -0,0 +1,227 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Minimal, dependency-free metrics registry rendered in the Prometheus text exposition format.
+# Stage timings are also collected per request (when Server-Timing is enabled) through a context
+# variable that the metrics middleware installs, so one observation feeds both.
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (16_384, 65_536, 262_144, 1_048_576, 4_194_304, 10_485_760, 16_777_216)
+_INF_LABEL = 'le="+Inf"'
+
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+        """Read values at scrape time instead; function returns {label values tuple: value}."""
+        self._function = function
+
+    def samples(self):
+        values = self._function() if self._function else dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in progress."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=SECONDS_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if position < len(self.buckets):
+                series[position] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            series_items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in series_items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, _INF_LABEL)} {series[-1]}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {series[-1]}"
+
+
+STAGE_SECONDS = Histogram(
+    "ocr_stage_duration_seconds",
+    "Time spent per processing stage (validate, cache_lookup, decode, analyze, resize, enhance, encode, queue_wait, vision, build_result, serialize, compress).",
+    ["stage"],
+)
+IMAGE_SECONDS = Histogram(
+    "ocr_image_duration_seconds", "End-to-end time per image by outcome.", ["outcome"]
+)
+REQUEST_SECONDS = Histogram(
+    "ocr_http_request_duration_seconds", "HTTP request latency by route and status code.", ["method", "route", "status"]
+)
+UPLOAD_BYTES = Histogram("ocr_upload_bytes", "Size of accepted uploads in bytes.", buckets=BYTES_BUCKETS)
+RESPONSE_BYTES = Histogram(
+    "ocr_response_bytes", "Size of OCR response bodies as sent, by media type and content coding.",
+    ["media_type", "encoding"], buckets=BYTES_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "ocr_cache_lookups_total", "Result cache lookups by outcome (l1_hit, l2_hit, near_duplicate, miss).", ["outcome"]
+)
+CACHE_EVICTIONS = Counter("ocr_cache_evictions_total", "L1 entries evicted to stay within the byte budget.")
+CACHE_BYTES = Gauge("ocr_cache_bytes", "Bytes held by the L1 result cache.")
+CACHE_ENTRIES = Gauge("ocr_cache_entries", "Entries held by the L1 result cache.")
+VISION_IN_FLIGHT = Gauge("ocr_vision_in_flight", "Vision RPCs currently in progress.")
+VISION_CALLS = Counter("ocr_vision_calls_total", "Vision RPCs by outcome.", ["outcome"])
+VISION_RETRIES = Counter("ocr_vision_retries_total", "Vision attempts retried after a transient error.")
+VISION_HEDGES = Counter("ocr_vision_hedges_total", "Hedged duplicate Vision requests that returned first, by winner.", ["winner"])
+BLANK_PAGES = Counter("ocr_blank_pages_total", "Uploads detected as blank and answered without a Vision call.")
+VISION_CIRCUIT_OPEN = Gauge("ocr_vision_circuit_open", "1 while the Vision circuit breaker is open.")
+ADMISSION_REJECTED = Counter("ocr_admission_rejected_total", "Requests shed with 503 by reason.", ["reason"])
+ADMITTED_BYTES = Gauge("ocr_admitted_bytes", "Upload bytes of admitted requests that haven't finished.")
+MEMORY_BUDGET_IN_USE = Gauge("ocr_memory_budget_bytes_in_use", "Bytes reserved against MEMORY_BUDGET_BYTES.")
+MEMORY_BUDGET_REJECTED = Counter("ocr_memory_budget_rejected_total", "Requests refused after waiting for memory budget.")
+STARTUP_PHASE_SECONDS = Gauge("ocr_startup_phase_seconds", "Duration of each import and startup phase.", ["phase"])
+EXECUTOR_PENDING = Gauge(
+    "ocr_executor_pending_tasks", "Tasks submitted to an executor and not yet finished (queued + running).", ["executor"]
+)
+
+REGISTRY = (
+    STAGE_SECONDS,
+    IMAGE_SECONDS,
+    REQUEST_SECONDS,
+    UPLOAD_BYTES,
+    RESPONSE_BYTES,
+    CACHE_LOOKUPS,
+    CACHE_EVICTIONS,
+    CACHE_BYTES,
+    CACHE_ENTRIES,
+    VISION_IN_FLIGHT,
+    VISION_CALLS,
+    VISION_RETRIES,
+    VISION_HEDGES,
+    VISION_CIRCUIT_OPEN,
+    BLANK_PAGES,
+    ADMISSION_REJECTED,
+    ADMITTED_BYTES,
+    MEMORY_BUDGET_IN_USE,
+    MEMORY_BUDGET_REJECTED,
+    EXECUTOR_PENDING,
+    STARTUP_PHASE_SECONDS,
+)
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record a stage duration in the histogram and in the current request's Server-Timing, if collected."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage_timer(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def start_request_timings() -> Tuple[Dict[str, float], contextvars.Token]:
+    """Begin collecting stage timings for the current request (see observe_stage)."""
+    timings: Dict[str, float] = {}
+    return timings, _request_timings.set(timings)
+
+
+def end_request_timings(token: contextvars.Token) -> None:
+    _request_timings.reset(token)
+
+
+def server_timing_header(timings: Dict[str, float], total: Optional[float] = None) -> str:
+    """Format collected timings as a Server-Timing header value (durations in milliseconds)."""
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
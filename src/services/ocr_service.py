@@ -1,43 +1,200 @@
 import time
-import json
 import asyncio
-from typing import Optional, Tuple
+from typing import AsyncIterator, Callable, List, Optional, Tuple
 from fastapi import UploadFile, HTTPException
-from google.cloud import vision
-from src.utils.file_utils import _validate_image_bytes, validate_file
+from src.utils.file_utils import _check_upload_limits, validate_file
 from src.services.metadata import extract_metadata
-from src.services.confidence import compute_confidence
-from src.services.cache_service import get_cache, set_cache
-from src.services.preprocess import preprocess_image
+from src.services.extractor import DEFAULT_FIELDS, LAYOUT_FIELDS, extract_annotation, select_fields
+from src.services.cache_service import (
+    cache_key,
+    result_key,
+    find_near_duplicate,
+    finish_flight,
+    get_cache,
+    get_cache_async,
+    join_flight,
+    set_cache,
+    wait_flight,
+)
+from src.services.cpu_pool import prepare_image
 from src.services.logger import logger
-from src.models.response_models import SingleOCRResponse, OCRResult, BatchOCRResponse
-
-client = vision.ImageAnnotatorClient()
+from src.services.memory_budget import MemoryReservation
+from src.services.metrics import BLANK_PAGES, CACHE_LOOKUPS, IMAGE_SECONDS, stage_timer
+from src.services.image_context import ImageContext
+from src.services import vision_client, vision_policy
+from src.services.tiling import stitch
+from src.utils.ingest import Upload
+from src.models.response_models import OCRResult
+from src.config import settings
 
 
 async def _call_document_text_detection(processed_bytes: bytes):
-    """Async wrapper for blocking Vision API call."""
-    loop = asyncio.get_running_loop()
-    vision_image = vision.Image(content=processed_bytes)
-    return await loop.run_in_executor(None, client.document_text_detection, vision_image)
+    """Single-image Vision call through the transport layer, under the retry/hedge/breaker policy."""
+    return await vision_policy.call_vision(
+        lambda timeout: vision_client.document_text_detection(processed_bytes, timeout)
+    )
+
+
+async def _call_batch_annotate_images(processed_images: List[bytes]):
+    """Vision batch annotate call under the call policy; returns one response per image."""
+    return await vision_policy.call_vision(lambda timeout: vision_client.annotate_images(processed_images, timeout))
+
+
+def _error_result(error: str, start_time: Optional[float] = None) -> dict:
+    """Result dict for an image that could not be processed; start_time fills in processing_time_ms."""
+    processing_time_ms = int((time.time() - start_time) * 1000) if start_time else 0
+    return {
+        "success": False,
+        "text": "",
+        "confidence": 0.0,
+        "metadata": None,
+        "processing_time_ms": processing_time_ms,
+        "error": error,
+    }
+
+
+def _observe_image(result: dict, start_time: float) -> None:
+    IMAGE_SECONDS.observe(time.time() - start_time, outcome="success" if result.get("success") else "error")
+
+
+def _raise_for_error(response):
+    """Return the response, raising when Vision reported a per-image error."""
+    if getattr(response, "error", None) and response.error.message:
+        raise Exception(response.error.message)
+    return response
+
+
+async def _annotate_tiles(image_ctx: ImageContext) -> list:
+    """OCR every tile of a tiled image concurrently; raises if any tile fails."""
+    responses = await asyncio.gather(*(_call_document_text_detection(tile["bytes"]) for tile in image_ctx.tiles))
+    return [_raise_for_error(response) for response in responses]
+
+
+def _sent_alone(image_ctx: ImageContext) -> bool:
+    """Tiled and multi-page images need several Vision requests, so they never join a batch request."""
+    return bool(image_ctx.tiles or image_ctx.pages)
+
+
+def _vision_requests(image_ctx: ImageContext) -> int:
+    """Vision requests a tiled or multi-page image is sent as (blank pages are skipped)."""
+    if image_ctx.pages:
+        return sum(_vision_requests(page) for page in image_ctx.pages if not page.analysis["blank"])
+    return len(image_ctx.tiles) or 1
+
+
+def _layout_mapping(image_ctx: ImageContext) -> tuple:
+    """(scale, offset) mapping boxes on the image Vision saw back to uploaded-image pixels."""
+    scale = image_ctx.encoding["scale"] if image_ctx.encoding else 1.0
+    crop = image_ctx.analysis.get("crop") if image_ctx.analysis else None
+    return scale, (crop[0], crop[1]) if crop else (0, 0)
+
+
+def _blank_result(filename: str, contents: bytes, key: str, image_ctx: ImageContext, start_time: float) -> Optional[dict]:
+    """The usual no-text result for a page that analysis found blank, without calling Vision; cached."""
+    if not (image_ctx.analysis and image_ctx.analysis["blank"]):
+        return None
+    BLANK_PAGES.inc()
+    result = _result_dict("", {"confidence": None, "layout": None}, image_ctx, start_time)
+    set_cache(contents, result, key=key)
+    logger.info({"event": "blank_page_skipped", "filename": filename, "ink_ratio": image_ctx.analysis["ink_ratio"]})
+    return result
+
+
+def _extract_response(response, image_ctx: ImageContext) -> tuple:
+    """(text, {"confidence", "layout"}) from a Vision response for one image."""
+    text = response.text_annotations[0].description if response.text_annotations else ""
+    # One pass over the annotation for confidence and, when the caller asked for it, layout
+    scale, offset = _layout_mapping(image_ctx)
+    extraction = extract_annotation(response.full_text_annotation, image_ctx.layout_fields, scale=scale, offset=offset)
+    return text, extraction
+
+
+def _extract_tiles(responses: list, image_ctx: ImageContext) -> tuple:
+    """(text, {"confidence", "layout"}) from the Vision responses for a tiled image's tiles, stitched into one page."""
+    scale, offset = _layout_mapping(image_ctx)
+    stitched = stitch(responses, image_ctx.tiles, image_ctx.layout_fields, scale=scale, offset=offset)
+    return stitched["text"], stitched
 
 
 def _build_result_dict_from_response(
     response,
-    processed_bytes: bytes,
-    original_format: str,
-    mimetype: str,
+    image_ctx: ImageContext,
     start_time: float,
 ):
     """Build OCR result dict from Vision response."""
-    text = response.text_annotations[0].description if response.text_annotations else ""
-    confidence = compute_confidence(response.full_text_annotation) or 0.0
-    metadata = extract_metadata(processed_bytes, original_format, mimetype)
+    return _result_dict(*_extract_response(response, image_ctx), image_ctx, start_time)
+
+
+def _build_result_dict_from_tiles(responses: list, image_ctx: ImageContext, start_time: float) -> dict:
+    """Build OCR result dict from the Vision responses for a tiled image's tiles."""
+    return _result_dict(*_extract_tiles(responses, image_ctx), image_ctx, start_time)
+
+
+async def _ocr_page(index: int, page_ctx: ImageContext) -> dict:
+    """OCR one page of a multi-page upload (blank pages skip Vision); returns its page result dict."""
+    start = time.perf_counter()
+    blank = bool(page_ctx.analysis and page_ctx.analysis["blank"])
+    if blank:
+        BLANK_PAGES.inc()
+        text, extraction = "", {"confidence": None, "layout": None}
+    elif page_ctx.tiles:
+        text, extraction = _extract_tiles(await _annotate_tiles(page_ctx), page_ctx)
+    else:
+        response = _raise_for_error(await _call_document_text_detection(page_ctx.processed_bytes))
+        text, extraction = _extract_response(response, page_ctx)
+    return {
+        "index": index,
+        "frames": page_ctx.frames,
+        "text": text,
+        "confidence": extraction["confidence"] or 0.0,
+        "blank": blank,
+        "encoding": page_ctx.encoding,
+        "timings_ms": {
+            "preprocess": round(sum(page_ctx.timings.values()) * 1000, 1),
+            "vision": round((time.perf_counter() - start) * 1000, 1),
+        },
+        "layout": extraction["layout"],
+    }
+
+
+async def _ocr_pages(image_ctx: ImageContext) -> List[dict]:
+    """OCR the distinct pages of a multi-page upload concurrently; raises if any page fails."""
+    for page in image_ctx.pages:
+        page.layout_fields = image_ctx.layout_fields
+    return list(await asyncio.gather(*(_ocr_page(index, page) for index, page in enumerate(image_ctx.pages))))
+
+
+def _build_result_dict_from_pages(pages: List[dict], image_ctx: ImageContext, start_time: float) -> dict:
+    """
+    Build OCR result dict for a multi-page upload: page texts joined by form feeds, the mean confidence
+    of pages with text, and the page results under "pages".
+    """
+    with_text = [page for page in pages if page["text"]]
+    text = "\f".join(page["text"] for page in pages) if with_text else ""
+    confidence = round(sum(page["confidence"] for page in with_text) / len(with_text), 3) if with_text else None
+    result = _result_dict(text, {"confidence": confidence, "layout": None}, image_ctx, start_time)
+    result["pages"] = pages
+    return result
+
+
+async def _annotate_alone(image_ctx: ImageContext, start_time: float) -> Callable[[], dict]:
+    """Vision calls for a tiled or multi-page image (several requests, not one); returns its result builder."""
+    if image_ctx.pages:
+        pages = await _ocr_pages(image_ctx)
+        return lambda: _build_result_dict_from_pages(pages, image_ctx, start_time)
+    responses = await _annotate_tiles(image_ctx)
+    return lambda: _build_result_dict_from_tiles(responses, image_ctx, start_time)
+
+
+def _result_dict(text: str, extraction: dict, image_ctx: ImageContext, start_time: float) -> dict:
+    confidence = extraction["confidence"] or 0.0
+    metadata = extract_metadata(image_ctx)
     result = {
         "success": bool(text),
         "text": text,
         "confidence": confidence,
         "metadata": metadata,
+        "layout": extraction["layout"],
         "processing_time_ms": int((time.time() - start_time) * 1000),
         "error": None
     }
@@ -47,96 +204,509 @@ def _build_result_dict_from_response(
     return result
 
 
-async def _process_single_safe(filename: str, contents: bytes, mimetype: str) -> dict:
-    """Safe single-image processing; always returns dict with error info if fails."""
+def _near_duplicate_result(
+    filename: str, contents: bytes, key: str, image_ctx: ImageContext, start_time: float
+) -> Optional[dict]:
+    """
+    Serve a perceptually near-identical cached result instead of calling Vision; caches it under the exact key.
+    Only for text-only callers: another image's layout boxes don't fit this one.
+    """
+    if image_ctx.layout_fields:
+        return None
+    cached = find_near_duplicate(image_ctx.perceptual_hash)
+    if not cached:
+        return None
+    CACHE_LOOKUPS.inc(outcome="near_duplicate")
+    cached.pop("_cached_at", None)
+    result = {
+        **cached,
+        "layout": None,
+        "metadata": extract_metadata(image_ctx),
+        "processing_time_ms": int((time.time() - start_time) * 1000),
+    }
+    set_cache(contents, result, key=key)
+    logger.info({"event": "near_duplicate_hit", "filename": filename})
+    return result
+
+
+async def _ocr_uncached(
+    filename: str,
+    contents: bytes,
+    key: str,
+    mimetype: str,
+    start_time: float,
+    reservation: Optional[MemoryReservation] = None,
+    layout_fields: frozenset = frozenset(),
+) -> dict:
+    """Preprocess, call Vision and cache the result; raises on failure."""
+    image_ctx = await prepare_image(contents, mimetype)
+    image_ctx.layout_fields = layout_fields
+    if reservation:
+        reservation.release_decoded()  # decoded images are closed; only the encoded bytes remain
+    logger.info({"event": "preprocessing_done", "filename": filename, "original_format": image_ctx.format})
+
+    skipped = _blank_result(filename, contents, key, image_ctx, start_time) or _near_duplicate_result(
+        filename, contents, key, image_ctx, start_time
+    )
+    if skipped:
+        return skipped
+
+    if _sent_alone(image_ctx):
+        build_result = await _annotate_alone(image_ctx, start_time)
+    else:
+        response = _raise_for_error(await _call_document_text_detection(image_ctx.processed_bytes))
+        build_result = lambda: _build_result_dict_from_response(response, image_ctx, start_time)
+    with stage_timer("build_result"):
+        result = build_result()
+    set_cache(contents, result, image_ctx.perceptual_hash, key=key)
+    logger.info({"event": "response_ready", "filename": filename, "result": result})
+    return result
+
+
+async def _process_single_safe(
+    filename: str,
+    contents: bytes,
+    mimetype: str,
+    key: Optional[str] = None,
+    reservation: Optional[MemoryReservation] = None,
+    layout_fields: frozenset = frozenset(),
+    cache_checked: bool = False,
+    cached: Optional[dict] = None,
+) -> dict:
+    """
+    Safe single-image processing; always returns dict with error info if fails.
+    key: content hash computed during ingestion, so the bytes aren't hashed again.
+    reservation: memory reserved for this image; its decoded part is released after preprocessing.
+    layout_fields: layout sections to extract; results are cached per set of sections (see result_key).
+    cache_checked/cached: the caller already looked this key up (L1 and L2) and got `cached`,
+    so a miss isn't sent to L2 a second time.
+    """
     start_time = time.time()
+    result = await _process_single(
+        filename, contents, mimetype, key, start_time, reservation, layout_fields, cache_checked, cached
+    )
+    _observe_image(result, start_time)
+    return result
+
+
+async def _process_single(
+    filename: str,
+    contents: bytes,
+    mimetype: str,
+    key: Optional[str],
+    start_time: float,
+    reservation: Optional[MemoryReservation],
+    layout_fields: frozenset,
+    cache_checked: bool = False,
+    cached: Optional[dict] = None,
+) -> dict:
     try:
-        _validate_image_bytes(contents, mimetype)
+        with stage_timer("validate"):
+            _check_upload_limits(contents, mimetype)
 
-        cached = get_cache(contents)
+        # A cached result means these exact bytes already passed decode-level validation
+        key = result_key(key or cache_key(contents), layout_fields)
+        with stage_timer("cache_lookup"):
+            if cache_checked:
+                cached = cached or get_cache(contents, key=key)  # L1 only: another request may have filled it since
+            else:
+                cached = await get_cache_async(contents, key=key)
         if cached:
-            logger.info(json.dumps({"event": "cache_hit", "filename": filename}))
+            logger.info({"event": "cache_hit", "filename": filename})
             return {**cached}
 
-        processed_bytes, original_format = preprocess_image(contents)
-        logger.info(json.dumps({"event": "preprocessing_done", "filename": filename, "original_format": original_format}))
+        # Identical images already being processed are awaited instead of re-OCR'd
+        flight, leader = join_flight(key)
+        if not leader:
+            logger.info({"event": "request_coalesced", "filename": filename})
+            return await wait_flight(flight)
 
-        response = await _call_document_text_detection(processed_bytes)
-        if getattr(response, "error", None) and response.error.message:
-            raise Exception(response.error.message)
-
-        result = _build_result_dict_from_response(response, processed_bytes, original_format, mimetype, start_time)
-        set_cache(contents, result)
-        logger.info(json.dumps({"event": "response_ready", "filename": filename, "result": result}))
+        try:
+            result = await _ocr_uncached(filename, contents, key, mimetype, start_time, reservation, layout_fields)
+        except BaseException as e:
+            finish_flight(key, error=e, flight=flight)
+            raise
+        finish_flight(key, result=result, flight=flight)
         return result
 
     except HTTPException as he:
-        logger.warning(json.dumps({"event": "validation_error", "filename": filename, "error": he.detail}))
-        return {"success": False, "text": "", "confidence": 0.0, "metadata": None, "processing_time_ms": 0, "error": str(he.detail)}
+        logger.warning({"event": "validation_error", "filename": filename, "error": he.detail})
+        return _error_result(str(he.detail), start_time)
 
     except Exception as e:
-        logger.error(json.dumps({"event": "processing_error", "filename": filename, "error": str(e)}))
-        return {"success": False, "text": "", "confidence": 0.0, "metadata": None, "processing_time_ms": 0, "error": str(e)}
+        logger.error({"event": "processing_error", "filename": filename, "error": str(e)})
+        return _error_result(str(e), start_time)
+
+
+async def _prepare_batch_item(
+    upload: Upload, semaphore: asyncio.Semaphore, start_time: float, layout_fields: frozenset = frozenset()
+) -> dict:
+    """
+    Validate, cache-check and preprocess one batch image.
+    Returns {"result": dict} when the item is already finished (cache hit or failure),
+    {"flight": Future} when an identical image is already being processed (by this batch or another request),
+    otherwise {"image_ctx": ImageContext, "key": str, "own_flight": Future} with processed bytes ready for the
+    Vision stage; the item then leads the flight for key and the Vision stage must finish it.
+    """
+    filename, contents, mimetype = upload.filename, upload.contents, upload.content_type
+    key = result_key(upload.digest, layout_fields)
+    if upload.error:
+        logger.warning({"event": "validation_error", "filename": filename, "error": upload.error})
+        return {"result": _error_result(upload.error)}
+
+    async with semaphore:
+        try:
+            with stage_timer("validate"):
+                _check_upload_limits(contents, mimetype)
+
+            with stage_timer("cache_lookup"):
+                cached = await get_cache_async(contents, key=key)
+            if cached:
+                logger.info({"event": "cache_hit", "filename": filename})
+                return {"result": {**cached}}
+
+            flight, leader = join_flight(key)
+            if not leader:
+                logger.info({"event": "request_coalesced", "filename": filename})
+                return {"flight": flight}
+
+            # As leader, every exit must finish the flight or waiters from other requests hang
+            try:
+                image_ctx = await prepare_image(contents, mimetype)
+                image_ctx.layout_fields = layout_fields
+                logger.info({"event": "preprocessing_done", "filename": filename, "original_format": image_ctx.format})
+
+                skipped = _blank_result(filename, contents, key, image_ctx, start_time) or _near_duplicate_result(
+                    filename, contents, key, image_ctx, start_time
+                )
+            except BaseException as e:
+                finish_flight(key, error=e, flight=flight)
+                raise
+            if skipped:
+                finish_flight(key, result=skipped, flight=flight)
+                return {"result": skipped}
+            return {"image_ctx": image_ctx, "key": key, "own_flight": flight}
+
+        except HTTPException as he:
+            logger.warning({"event": "validation_error", "filename": filename, "error": he.detail})
+            return {"result": _error_result(str(he.detail), start_time)}
+
+        except Exception as e:
+            logger.error({"event": "processing_error", "filename": filename, "error": str(e)})
+            return {"result": _error_result(str(e), start_time)}
+
+
+def _set_item_result(item: dict, result: dict) -> None:
+    """Store a batch item's final result and notify the streaming consumer, if any."""
+    item["result"] = result
+    _observe_image(result, item["start_time"])
+    if item.get("on_result"):
+        item["on_result"](item["index"], result)
+
+
+async def _prepare_and_store(
+    item: dict, upload: Upload, semaphore: asyncio.Semaphore, start_time: float, layout_fields: frozenset
+) -> None:
+    stage = await _prepare_batch_item(upload, semaphore, start_time, layout_fields)
+    result = stage.pop("result", None)
+    item.update(stage)
+    if result is not None:
+        _set_item_result(item, result)
+
+
+def _fail_batch_item(item: dict, error: Exception, start_time: float) -> None:
+    logger.error({"event": "processing_error", "filename": item["filename"], "error": str(error)})
+    _set_item_result(item, _error_result(str(error), start_time))
+    finish_flight(item["key"], error=error, flight=item["own_flight"])
+    item.pop("image_ctx", None)
+
+
+def _complete_batch_item(item: dict, build_result: Callable[[], dict], start_time: float) -> None:
+    """Build, cache and publish a batch item's result from its Vision response(s); failures become error results."""
+    try:
+        with stage_timer("build_result"):
+            result = build_result()
+        set_cache(item["contents"], result, item["image_ctx"].perceptual_hash, key=item["key"])
+        logger.info({"event": "response_ready", "filename": item["filename"], "result": result})
+        _set_item_result(item, result)
+        finish_flight(item["key"], result=result, flight=item["own_flight"])
+    except Exception as e:
+        _fail_batch_item(item, e, start_time)
+    finally:
+        item.pop("image_ctx", None)  # free the encoded copy now rather than when the whole batch returns
+
+
+async def _annotate_batch_chunk(
+    chunk: List[dict], semaphore: asyncio.Semaphore, start_time: float
+) -> None:
+    """Run one batch_annotate_images call for a chunk of prepared items; stores each item's result in place."""
+    async with semaphore:
+        try:
+            responses = await _call_batch_annotate_images([item["image_ctx"].processed_bytes for item in chunk])
+        except Exception as e:
+            for item in chunk:
+                _fail_batch_item(item, e, start_time)
+            return
+
+    for item, response in zip(chunk, responses):
+        _complete_batch_item(
+            item,
+            lambda: _build_result_dict_from_response(_raise_for_error(response), item["image_ctx"], start_time),
+            start_time,
+        )
+
+
+async def _annotate_alone_item(item: dict, semaphore: asyncio.Semaphore, start_time: float) -> None:
+    """Vision stage for a tiled or multi-page batch item: its tiles or pages are OCR'd concurrently."""
+    async with semaphore:
+        try:
+            build_result = await _annotate_alone(item["image_ctx"], start_time)
+        except Exception as e:
+            _fail_batch_item(item, e, start_time)
+            return
+
+    _complete_batch_item(item, build_result, start_time)
+
+
+async def _await_coalesced_item(item: dict) -> None:
+    """Wait for the flight an item joined; stores its result (or error) in place."""
+    try:
+        result = await wait_flight(item["flight"])
+    except HTTPException as he:
+        result = _error_result(str(he.detail))
+    except Exception as e:
+        logger.error({"event": "processing_error", "filename": item["filename"], "error": str(e)})
+        result = _error_result(str(e))
+    _set_item_result(item, result)
 
 
 async def process_single_image(
     image: UploadFile,
     preloaded_bytes: Optional[bytes] = None,
     preloaded_mimetype: Optional[str] = None,
-) -> SingleOCRResponse:
-    """Single image OCR endpoint processor; raises HTTPException on failure."""
-    logger.info(json.dumps({"event": "request_received", "filename": image.filename}))
+    preloaded_digest: Optional[str] = None,
+    fields: frozenset = DEFAULT_FIELDS,
+    reservation: Optional[MemoryReservation] = None,
+    cache_checked: bool = False,
+    cached: Optional[dict] = None,
+) -> dict:
+    """
+    Single image OCR endpoint processor; returns the SingleOCRResponse fields as a dict (see
+    response_encoding) and raises HTTPException on failure.
+    fields: response fields from extractor.parse_fields (layout sections are opt-in).
+    reservation: the request's memory reservation (see memory_budget), released in stages.
+    cache_checked/cached: result of the caller's own cache lookup, reused instead of a second one.
+    """
+    logger.info({"event": "request_received", "filename": image.filename})
     contents = preloaded_bytes or await validate_file(image)
     mimetype = preloaded_mimetype or image.content_type
 
-    result = await _process_single_safe(image.filename, contents, mimetype)
+    result = await _process_single_safe(
+        image.filename,
+        contents,
+        mimetype,
+        key=preloaded_digest,
+        reservation=reservation,
+        layout_fields=fields & LAYOUT_FIELDS,
+        cache_checked=cache_checked,
+        cached=cached,
+    )
     if not result.get("success", False):
         raise HTTPException(status_code=500, detail=result.get("error", "OCR failed"))
-    return SingleOCRResponse(**result)
+    response = _ocr_result_dict(image.filename, select_fields(result, fields))
+    return {name: value for name, value in response.items() if name not in ("filename", "error")}
+
+
+def _ocr_result_dict(filename: str, single_result: dict) -> dict:
+    """The OCRResult fields of a result dict, defaults filled in, without building the model."""
+    return {
+        "filename": filename,
+        "success": single_result.get("success", False),
+        "text": single_result.get("text", ""),
+        "confidence": single_result.get("confidence", 0.0),
+        "metadata": single_result.get("metadata"),
+        "processing_time_ms": single_result.get("processing_time_ms", 0),
+        "error": single_result.get("error"),  # now always populated
+        "near_duplicate": single_result.get("near_duplicate", False),
+        "layout": single_result.get("layout"),
+        "pages": single_result.get("pages"),
+    }
+
+
+def _ocr_result(filename: str, single_result: dict) -> OCRResult:
+    return OCRResult(**_ocr_result_dict(filename, single_result))
+
+
+async def _run_batch(
+    uploads: List[Upload],
+    start_time: float,
+    on_result: Optional[Callable[[int, dict], None]] = None,
+    reservation: Optional[MemoryReservation] = None,
+    layout_fields: frozenset = frozenset(),
+) -> Tuple[List[dict], int]:
+    """
+    Batch engine shared by the buffered and streaming endpoints. Returns (result dicts in input order,
+    number of Vision requests). on_result(index, result) is called as soon as each item finishes.
+    reservation: the request's memory reservation; its decoded part is released once preprocessing is done.
+    layout_fields: layout sections to extract for every item (see result_key).
+    Images are validated and preprocessed in parallel and cache misses are sent to Vision in as few
+    batch_annotate_images calls as possible; tiled and multi-page images send their tiles or pages as
+    concurrent single calls.
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.BATCH_CONCURRENCY))
+    items = [
+        {
+            "index": index,
+            "filename": upload.filename,
+            "contents": upload.contents,
+            "on_result": on_result,
+            "start_time": start_time,
+        }
+        for index, upload in enumerate(uploads)
+    ]
+
+    try:
+        await asyncio.gather(
+            *(
+                _prepare_and_store(item, upload, semaphore, start_time, layout_fields)
+                for item, upload in zip(items, uploads)
+            )
+        )
+        if reservation:
+            reservation.release_decoded()
+
+        prepared = [item for item in items if "image_ctx" in item]
+        pending = [item for item in prepared if not _sent_alone(item["image_ctx"])]
+        alone = [item for item in prepared if _sent_alone(item["image_ctx"])]
+        chunk_size = max(1, min(settings.VISION_BATCH_SIZE, 16))  # Vision accepts at most 16 images per request
+        chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+        vision_requests = len(chunks) + sum(_vision_requests(item["image_ctx"]) for item in alone)
+        await asyncio.gather(
+            *(_annotate_batch_chunk(chunk, semaphore, start_time) for chunk in chunks),
+            *(_annotate_alone_item(item, semaphore, start_time) for item in alone),
+        )
+
+        # Duplicates (within this batch or of another in-flight request) resolve once their leader finishes
+        await asyncio.gather(*(_await_coalesced_item(item) for item in items if "flight" in item))
+    finally:
+        # Never leave waiters hanging if this batch is cancelled or fails midway. Only flights this batch
+        # still owns are failed: once an item's flight finishes, another request may lead the same key.
+        for item in items:
+            if "own_flight" in item and "result" not in item and not item["own_flight"].done():
+                aborted = RuntimeError("Batch processing was aborted.")
+                finish_flight(item["key"], error=aborted, flight=item["own_flight"])
+
+    return [item["result"] for item in items], vision_requests
+
+
+async def process_upload(
+    upload: Upload, fields: frozenset = DEFAULT_FIELDS, reservation: Optional[MemoryReservation] = None
+) -> OCRResult:
+    """OCR one ingested upload through the single-image path; failures are reported on the result."""
+    if upload.error:
+        logger.warning({"event": "validation_error", "filename": upload.filename, "error": upload.error})
+        return _ocr_result(upload.filename, _error_result(upload.error))
+    result = await _process_single_safe(
+        upload.filename,
+        upload.contents,
+        upload.content_type,
+        key=upload.digest,
+        reservation=reservation,
+        layout_fields=fields & LAYOUT_FIELDS,
+    )
+    return _ocr_result(upload.filename, select_fields(result, fields))
 
 
 async def process_batch_images(
-    images: list[UploadFile],
-) -> Tuple[BatchOCRResponse, int]:
-    """Process multiple images sequentially. Returns batch response and status code (207 if partial failure)."""
-    results = []
+    uploads: List[Upload],
+    fields: frozenset = DEFAULT_FIELDS,
+    reservation: Optional[MemoryReservation] = None,
+) -> Tuple[dict, int]:
+    """
+    Process multiple ingested uploads concurrently. Returns the BatchOCRResponse fields as a dict and the
+    status code (207 if partial failure). Results are returned in input order.
+    """
     total_start = time.time()
-    any_failure = False
-
-    for img in images:
-        contents = await img.read()
-        mimetype = img.content_type
-        await img.seek(0)  # rewind so UploadFile can be reused
-        single_result = await _process_single_safe(img.filename, contents, mimetype)
-
-        ocr_result = OCRResult(
-            filename=img.filename,
-            success=single_result.get("success", False),
-            text=single_result.get("text", ""),
-            confidence=single_result.get("confidence", 0.0),
-            metadata=single_result.get("metadata"),
-            processing_time_ms=single_result.get("processing_time_ms", 0),
-            error=single_result.get("error"),  # now always populated
-        )
+    batch_results, vision_requests = await _run_batch(
+        uploads, total_start, reservation=reservation, layout_fields=fields & LAYOUT_FIELDS
+    )
 
-        if not ocr_result.success:
-            any_failure = True
-        results.append(ocr_result)
+    results = [
+        _ocr_result_dict(upload.filename, select_fields(result, fields)) for upload, result in zip(uploads, batch_results)
+    ]
+    any_failure = not all(result["success"] for result in results)
 
     total_processing_time = int((time.time() - total_start) * 1000)
-    batch_response = BatchOCRResponse(
-        success=not any_failure,
-        total_images=len(images),
-        total_processing_time_ms=total_processing_time,
-        results=results,
-    )
+    batch_response = {
+        "success": not any_failure,
+        "total_images": len(uploads),
+        "total_processing_time_ms": total_processing_time,
+        "results": results,
+    }
     status_code = 200 if not any_failure else 207
 
-    logger.info(json.dumps({
+    logger.info({
         "event": "batch_response_ready",
-        "total_images": len(images),
+        "total_images": len(uploads),
+        "vision_requests": vision_requests,
         "total_processing_time_ms": total_processing_time,
         "any_failure": any_failure,
-    }))
+    })
 
     return batch_response, status_code
+
+
+async def stream_batch_images(
+    uploads: List[Upload], fields: frozenset = DEFAULT_FIELDS, reservation: Optional[MemoryReservation] = None
+) -> AsyncIterator[dict]:
+    """
+    Process a batch like process_batch_images, yielding one {"type": "result", "index", ...OCRResult} record
+    per image as soon as it finishes, then a {"type": "summary"} record with totals.
+    """
+    total_start = time.time()
+    queue: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(
+        _run_batch(
+            uploads,
+            total_start,
+            on_result=lambda index, result: queue.put_nowait((index, result)),
+            reservation=reservation,
+            layout_fields=fields & LAYOUT_FIELDS,
+        )
+    )
+
+    succeeded = 0
+    try:
+        for _ in range(len(uploads)):
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                # The engine finished (or failed) without queueing this item; surface its error
+                getter.cancel()
+                task.result()
+                getter = asyncio.ensure_future(queue.get())
+            index, result = await getter
+            ocr_result = _ocr_result_dict(uploads[index].filename, select_fields(result, fields))
+            succeeded += ocr_result["success"]
+            yield {"type": "result", "index": index, **ocr_result}
+        _, vision_requests = await task
+    finally:
+        if not task.done():
+            task.cancel()  # client went away; the engine's cleanup fails any flights it leads
+
+    total_processing_time = int((time.time() - total_start) * 1000)
+    logger.info({
+        "event": "batch_stream_complete",
+        "total_images": len(uploads),
+        "vision_requests": vision_requests,
+        "total_processing_time_ms": total_processing_time,
+        "any_failure": succeeded < len(uploads),
+    })
+    yield {
+        "type": "summary",
+        "success": succeeded == len(uploads),
+        "total_images": len(uploads),
+        "succeeded": succeeded,
+        "failed": len(uploads) - succeeded,
+        "total_processing_time_ms": total_processing_time,
+    }
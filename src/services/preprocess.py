@@ -1,27 +1,268 @@
-from PIL import Image, ImageEnhance, UnidentifiedImageError
+from PIL import Image, ImageEnhance, ImageSequence, ImageStat, UnidentifiedImageError
 import io
+import math
+import time
 from src.config import settings
+from src.services.image_context import ImageContext
+from src.services.tiling import plan_tiles, should_tile, tiled_size
+from src.utils.hashing import dhash, hamming_distance
 
-def preprocess_image(raw_bytes: bytes):
-    try:
-        image = Image.open(io.BytesIO(raw_bytes))
-    except UnidentifiedImageError:
-        raise ValueError("Invalid or corrupted image file.")
+def _target_size(width: int, height: int):
+    """Largest size within PREPROCESS_MAX_EDGE and PREPROCESS_MAX_MEGAPIXELS, keeping aspect ratio."""
+    scale = 1.0
+    if settings.PREPROCESS_MAX_EDGE > 0:
+        scale = min(scale, settings.PREPROCESS_MAX_EDGE / max(width, height))
+    if settings.PREPROCESS_MAX_MEGAPIXELS > 0:
+        scale = min(scale, math.sqrt(settings.PREPROCESS_MAX_MEGAPIXELS * 1_000_000 / (width * height)))
+    if scale >= 1.0:
+        return width, height
+    return max(1, int(width * scale)), max(1, int(height * scale))
 
-    original_format = image.format
+def _working_size(width: int, height: int):
+    """Size the image is processed at: the tiling size for large scans when tiling is on, else _target_size."""
+    return tiled_size(width, height) if should_tile(width, height) else _target_size(width, height)
 
-    if image.format == "GIF":
+def request_jpeg_draft(image: Image.Image):
+    """
+    Ask the JPEG decoder to decode at a reduced scale when we'd downscale anyway.
+    Must be called before the image is loaded; no-op for other formats.
+    """
+    if image.format != "JPEG":
+        return
+    target = _working_size(*image.size)
+    if target != image.size:
+        image.draft("L" if image.mode == "L" else "RGB", target)
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """Convert to RGB or L, compositing transparency onto white (JPEG can't store alpha)."""
+    if image.mode in ("RGB", "L"):
+        return image
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    if image.mode == "1":
+        return image.convert("L")
+    return image.convert("RGB")
+
+def _is_effectively_grayscale(image: Image.Image) -> bool:
+    """True when mean saturation of a small thumbnail is below PREPROCESS_GRAYSCALE_MAX_SATURATION."""
+    if image.mode == "L":
+        return True
+    thumb = image.resize((64, 64), Image.Resampling.BILINEAR).convert("HSV")
+    mean_saturation = ImageStat.Stat(thumb.getchannel("S")).mean[0] / 255
+    return mean_saturation <= settings.PREPROCESS_GRAYSCALE_MAX_SATURATION
+
+def _is_bilevel(gray: Image.Image) -> bool:
+    """True when nearly all pixels are close to black or white (text-like scans)."""
+    histogram = gray.histogram()
+    total = sum(histogram)
+    extremes = sum(histogram[:32]) + sum(histogram[224:])
+    return total > 0 and extremes / total >= settings.PREPROCESS_BILEVEL_RATIO
+
+def analyze_page(image: Image.Image) -> dict:
+    """
+    Pixel statistics on a small grayscale copy (histogram and LUT passes run in Pillow's C code).
+    Returns {"blank", "ink_ratio", "background", "ink_box"}: background is the most common grey level,
+    ink the pixels further than PREPROCESS_INK_DELTA from it, ink_box their bounds in image pixels (or None).
+    """
+    factor = max(1, math.ceil(max(image.size) / max(1, settings.PREPROCESS_ANALYSIS_EDGE)))
+    small = (image.reduce(factor) if factor > 1 else image).convert("L")
+    histogram = small.histogram()
+    background = histogram.index(max(histogram))
+    low = max(0, background - settings.PREPROCESS_INK_DELTA)
+    high = min(255, background + settings.PREPROCESS_INK_DELTA)
+    ink = sum(histogram) - sum(histogram[low:high + 1])
+    ink_ratio = ink / (small.width * small.height)
+
+    ink_box = None
+    if ink:
+        mask = small.point([0 if low <= level <= high else 255 for level in range(256)])
+        x0, y0, x1, y1 = mask.getbbox()
+        scale_x, scale_y = image.width / small.width, image.height / small.height
+        ink_box = (int(x0 * scale_x), int(y0 * scale_y), math.ceil(x1 * scale_x), math.ceil(y1 * scale_y))
+    threshold = settings.PREPROCESS_BLANK_MAX_INK_RATIO
+    return {
+        "blank": threshold > 0 and ink_ratio < threshold,
+        "ink_ratio": round(ink_ratio, 6),
+        "background": background,
+        "ink_box": ink_box,
+    }
+
+def _margin_crop(size, ink_box):
+    """The ink box plus PREPROCESS_CROP_PADDING, or None when that wouldn't remove PREPROCESS_CROP_MIN_SAVING of the area."""
+    if not settings.PREPROCESS_CROP_ENABLED or ink_box is None:
+        return None
+    width, height = size
+    pad = int(settings.PREPROCESS_CROP_PADDING * max(width, height))
+    box = (max(0, ink_box[0] - pad), max(0, ink_box[1] - pad), min(width, ink_box[2] + pad), min(height, ink_box[3] + pad))
+    if (box[2] - box[0]) * (box[3] - box[1]) > (1 - settings.PREPROCESS_CROP_MIN_SAVING) * width * height:
+        return None
+    return box
+
+def _enhance_and_encode(image: Image.Image, grayscale: bool, timings: dict, png=None):
+    """
+    Contrast-enhance and encode for Vision; returns (bytes, format, quality).
+    png: force the format; None picks PNG when the enhanced grayscale image is bilevel.
+    """
+    start = time.perf_counter()
+    image = ImageEnhance.Contrast(image).enhance(settings.CONTRAST_ENHANCE_FACTOR)
+    timings["enhance"] = timings.get("enhance", 0.0) + time.perf_counter() - start
+
+    start = time.perf_counter()
+    if png is None:
+        png = grayscale and settings.PREPROCESS_PNG_FOR_BILEVEL and _is_bilevel(image)
+    output = io.BytesIO()
+    if png:
+        output_format, quality = "PNG", None
+        image.save(output, format="PNG", compress_level=6)
+    else:
+        output_format, quality = "JPEG", settings.JPEG_QUALITY
+        image.save(output, format="JPEG", quality=quality)
+    timings["encode"] = timings.get("encode", 0.0) + time.perf_counter() - start
+    return output.getvalue(), output_format, quality
+
+def _is_multipage(image_ctx: ImageContext) -> bool:
+    return settings.MULTIPAGE_ENABLED and image_ctx.n_frames > 1 and image_ctx.format in ("GIF", "TIFF")
+
+def _preprocess_pages(image_ctx: ImageContext, image: Image.Image) -> ImageContext:
+    """
+    Split a multi-page upload into image_ctx.pages. Each frame is hashed; one within
+    MULTIPAGE_DEDUP_MAX_DISTANCE bits of the last distinct page is folded into that page's frames,
+    otherwise it becomes a new page and is preprocessed right away, so one decoded frame is held at a time.
+    """
+    timings = image_ctx.timings
+    page_hash = None
+    for index, frame in enumerate(ImageSequence.Iterator(image)):
+        start = time.perf_counter()
+        page_image = _flatten(frame)
+        if page_image is frame:
+            page_image = frame.copy()  # the next seek reuses the frame's buffer
+        frame_hash = dhash(page_image)
+        decode_seconds = time.perf_counter() - start
+        if page_hash is not None and hamming_distance(frame_hash, page_hash) <= settings.MULTIPAGE_DEDUP_MAX_DISTANCE:
+            image_ctx.pages[-1].frames.append(index)
+            page_image.close()
+            timings["decode"] = timings.get("decode", 0.0) + decode_seconds
+            continue
+        if len(image_ctx.pages) >= settings.MULTIPAGE_MAX_PAGES:
+            raise ValueError(f"Too many distinct pages (max {settings.MULTIPAGE_MAX_PAGES}).")
+
+        page_hash = frame_hash
+        page = ImageContext(
+            raw_bytes=b"",
+            mimetype=image_ctx.mimetype,
+            format=image_ctx.format,
+            width=page_image.width,
+            height=page_image.height,
+            image=page_image,
+            frames=[index],
+            timings={"decode": decode_seconds},
+        )
+        preprocess_image(page)
+        for stage, seconds in page.timings.items():
+            timings[stage] = timings.get(stage, 0.0) + seconds
+        image_ctx.pages.append(page)
+
+    image_ctx.release()
+    return image_ctx
+
+def preprocess_image(image_ctx: ImageContext) -> ImageContext:
+    """
+    Adaptively encode the decoded image for Vision; fills processed_* and encoding on the context.
+    Downscales to the configured edge/megapixel budget, drops colour when it adds nothing and
+    writes PNG for bilevel images, JPEG otherwise. Large scans are instead cut into tiles (see tiling)
+    when TILING_ENABLED; their encoded bytes go to tiles and processed_bytes stays None.
+    Uniform margins are cropped first; a blank page is returned unencoded with analysis["blank"] set.
+    Multi-frame GIFs and multi-page TIFFs are split into de-duplicated pages when MULTIPAGE_ENABLED.
+    """
+    timings = image_ctx.timings
+    start = time.perf_counter()
+    image = image_ctx.image
+    if image is None:
+        try:
+            image = Image.open(io.BytesIO(image_ctx.raw_bytes))
+            request_jpeg_draft(image)
+        except UnidentifiedImageError:
+            raise ValueError("Invalid or corrupted image file.")
+
+    if _is_multipage(image_ctx):
+        try:
+            return _preprocess_pages(image_ctx, image)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Multi-page processing failed: {str(e)}")
+
+    if image_ctx.format == "GIF" and not image_ctx.frames:  # pages of a multi-page upload arrive flattened
         try:
             image.seek(0)
-            if getattr(image, "n_frames", 1) > settings.MAX_GIF_FRAMES:
+            if image_ctx.n_frames > settings.MAX_GIF_FRAMES:
                 raise ValueError("GIF has too many frames.")
             image = image.convert("RGB")
         except Exception as e:
             raise ValueError(f"GIF processing failed: {str(e)}")
 
-    enhancer = ImageEnhance.Contrast(image)
-    image = enhancer.enhance(settings.CONTRAST_ENHANCE_FACTOR)
+    image = _flatten(image)
+    timings["decode"] = timings.get("decode", 0.0) + time.perf_counter() - start  # includes mode conversion
+    if settings.CACHE_PHASH_ENABLED:
+        image_ctx.perceptual_hash = dhash(image)
 
-    output = io.BytesIO()
-    image.save(output, format="JPEG", quality=settings.JPEG_QUALITY)
-    return output.getvalue(), original_format
+    start = time.perf_counter()
+    page = analyze_page(image)
+    crop = None if page["blank"] else _margin_crop(image.size, page["ink_box"])
+    to_original = image_ctx.width / image.width  # the decoder may have drafted a smaller image
+    image_ctx.analysis = {
+        "blank": page["blank"],
+        "ink_ratio": page["ink_ratio"],
+        "background": page["background"],
+        "crop": [round(value * to_original) for value in crop] if crop else None,
+    }
+    if crop:
+        image = image.crop(crop)
+    timings["analyze"] = time.perf_counter() - start
+    if page["blank"]:
+        image_ctx.release()
+        return image_ctx
+
+    start = time.perf_counter()
+    # Sizing works in original-image pixels of the (possibly cropped) page
+    width, height = round(image.width * to_original), round(image.height * to_original)
+    tiled = should_tile(width, height)
+    target = _working_size(width, height)
+    if target[0] < image.width:
+        image = image.resize(target, Image.Resampling.LANCZOS)
+    timings["resize"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grayscale = settings.PREPROCESS_GRAYSCALE and _is_effectively_grayscale(image)
+    if grayscale and image.mode != "L":
+        image = image.convert("L")
+    timings["enhance"] = time.perf_counter() - start
+
+    if tiled:
+        # Bilevel is judged once for the page so every tile is encoded the same way
+        png = grayscale and settings.PREPROCESS_PNG_FOR_BILEVEL and _is_bilevel(image)
+        image_ctx.tiles = []
+        for tile in plan_tiles(*image.size):
+            tile["bytes"], output_format, quality = _enhance_and_encode(image.crop(tile["box"]), grayscale, timings, png)
+            image_ctx.tiles.append(tile)
+        encoded_bytes = sum(len(tile["bytes"]) for tile in image_ctx.tiles)
+    else:
+        image_ctx.processed_bytes, output_format, quality = _enhance_and_encode(image, grayscale, timings)
+        encoded_bytes = len(image_ctx.processed_bytes)
+
+    image_ctx.processed_width, image_ctx.processed_height = image.size
+    image_ctx.encoding = {
+        "format": output_format,
+        "quality": quality,
+        "grayscale": grayscale,
+        "scale": round(image.size[0] / width, 4),
+        "width": image.size[0],
+        "height": image.size[1],
+        "bytes": encoded_bytes,
+        "tiles": len(image_ctx.tiles),
+    }
+    image_ctx.release()
+    return image_ctx
@@ -0,0 +1,106 @@
+import gzip
+import importlib
+import json
+import time
+from functools import lru_cache
+from typing import Dict, Optional
+from fastapi import Request, Response
+from src.config import settings
+from src.services.metrics import RESPONSE_BYTES, observe_stage
+
+# Negotiated response bodies for the OCR and job routes. Results are serialized straight from the
+# result dicts (the response models only document the shape; they aren't validated again) as JSON,
+# or as MessagePack when Accept asks for it, then compressed with brotli or gzip when Accept-Encoding
+# allows and the body is at least RESPONSE_COMPRESSION_MIN_BYTES. brotli and msgpack are optional:
+# without them only JSON and gzip are offered.
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_MSGPACK_ALIASES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+_CODINGS = ("br", "gzip")  # server preference when the client accepts both equally
+
+
+@lru_cache(maxsize=None)
+def _optional_module(name: str):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+
+def _parse_accept(value: str) -> Dict[str, float]:
+    """{lower-cased token: q} from an Accept or Accept-Encoding value; parameters other than q are ignored."""
+    accepted = {}
+    for part in value.split(","):
+        token, *params = [piece.strip() for piece in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, number = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(number)
+                except ValueError:
+                    q = 0.0
+        accepted[token.lower()] = q
+    return accepted
+
+
+def negotiate_media_type(accept: str) -> str:
+    """MessagePack when Accept ranks it at least as high as JSON (and it's enabled and installed), else JSON."""
+    if not accept or not settings.RESPONSE_MSGPACK_ENABLED or _optional_module("msgpack") is None:
+        return JSON_MEDIA_TYPE
+    accepted = _parse_accept(accept)
+    msgpack_q = max(accepted.get(alias, 0.0) for alias in _MSGPACK_ALIASES)
+    if msgpack_q > 0 and msgpack_q >= accepted.get(JSON_MEDIA_TYPE, 0.0):
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """The accepted content coding with the highest q ("br" needs brotli), or None for identity."""
+    accepted = _parse_accept(accept_encoding or "")
+    best, best_q = None, 0.0
+    for coding in _CODINGS:
+        if coding == "br" and _optional_module("brotli") is None:
+            continue
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def serialize_body(content, media_type: str) -> bytes:
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return _optional_module("msgpack").packb(content)
+    # Same output as FastAPI's JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def compress_body(body: bytes, coding: str) -> bytes:
+    if coding == "br":
+        return _optional_module("brotli").compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL, mtime=0)
+
+
+def encoded_response(
+    request: Request, content, status_code: int = 200, headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Serialize content (plain dicts and lists) in the negotiated media type and content coding."""
+    start = time.perf_counter()
+    media_type = negotiate_media_type(request.headers.get("accept", ""))
+    body = serialize_body(content, media_type)
+    observe_stage("serialize", time.perf_counter() - start)
+
+    headers = {**(headers or {}), "Vary": "Accept, Accept-Encoding"}
+    coding = None
+    if settings.RESPONSE_COMPRESSION_ENABLED and len(body) >= settings.RESPONSE_COMPRESSION_MIN_BYTES:
+        coding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if coding:
+        start = time.perf_counter()
+        body = compress_body(body, coding)
+        observe_stage("compress", time.perf_counter() - start)
+        headers["Content-Encoding"] = coding
+    RESPONSE_BYTES.observe(len(body), media_type=media_type, encoding=coding or "identity")
+    return Response(body, status_code=status_code, headers=headers, media_type=media_type)
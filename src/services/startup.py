@@ -0,0 +1,135 @@
+import asyncio
+import importlib
+import io
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from src.config import settings
+from src.services import cache_service, cpu_pool, vision_client
+from src.services.job_service import job_manager
+from src.services.logger import logger
+from src.services.metrics import STARTUP_PHASE_SECONDS
+
+# Cold-start subsystem, run from the app lifespan. Restores the cache, starts job workers and warms up:
+# imports google.cloud.vision, runs tiny JPEG/PNG/GIF images through preprocessing (loading the Pillow
+# codecs and starting process-pool workers) and connects the Vision channels. Every phase is timed for
+# /v1/debug/startup and /metrics, and /v1/ready reports 503 until warm-up has finished.
+
+_phases: Dict[str, float] = {}
+_details: dict = {}
+_ready = False
+_ready_at: Optional[float] = None  # process age when ready
+_task: Optional[asyncio.Task] = None
+
+
+def record_phase(name: str, seconds: float) -> None:
+    _phases[name] = seconds
+    STARTUP_PHASE_SECONDS.set(seconds, phase=name)
+
+
+def is_ready() -> bool:
+    return _ready
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process started (Linux), including interpreter start-up before any of our code."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return round(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 3)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _import_vision() -> None:
+    importlib.import_module("google.cloud.vision")
+
+
+def _synthetic_images() -> Dict[str, bytes]:
+    """Tiny JPEG, PNG and GIF uploads with some ink, so warm-up runs the whole preprocessing path."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (64, 64), "white")
+    ImageDraw.Draw(image).rectangle((8, 24, 56, 40), fill="black")
+    images = {}
+    for image_format, mimetype in (("JPEG", "image/jpeg"), ("PNG", "image/png"), ("GIF", "image/gif")):
+        output = io.BytesIO()
+        image.save(output, format=image_format)
+        images[mimetype] = output.getvalue()
+    return images
+
+
+def _warm_codecs(images: Dict[str, bytes]) -> list:
+    for mimetype, contents in images.items():
+        cpu_pool._prepare_image_sync(contents, mimetype)
+    return sorted(images)
+
+
+async def _phase(name: str, action: Callable[[], Awaitable]) -> None:
+    """Run and time one warm-up phase; a failure is logged and reported, never fatal."""
+    start = time.perf_counter()
+    try:
+        result = await action()
+        if result is not None:
+            _details[name] = result
+    except Exception as e:
+        _details[name] = {"error": str(e)}
+        logger.warning({"event": "warm_up_failed", "phase": name, "error": str(e)})
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+async def warm_up() -> None:
+    """Warm the process for its first request, then mark it ready (also when a phase failed)."""
+    global _ready, _ready_at
+    loop = asyncio.get_running_loop()
+    try:
+        if settings.STARTUP_WARMUP_ENABLED:
+            images = _synthetic_images()
+            await _phase("import_vision", lambda: loop.run_in_executor(None, _import_vision))
+            await _phase("codecs", lambda: loop.run_in_executor(None, _warm_codecs, images))
+            await _phase("preprocess_workers", lambda: cpu_pool.warm_up(images["image/png"], "image/png"))
+            await _phase("vision_connect", lambda: vision_client.warm_up(settings.STARTUP_WARMUP_TIMEOUT))
+            if settings.STARTUP_WARMUP_VISION_CALL:
+                await _phase("vision_call", lambda: vision_client.annotate_images([images["image/png"]]))
+    finally:
+        _ready = True
+        _ready_at = _process_age()
+        logger.info({"event": "startup_complete", "process_age_s": _ready_at, "phases_ms": _phases_ms()})
+
+
+async def start() -> None:
+    """Lifespan startup: restore state and warm up, in the background when STARTUP_WARMUP_BACKGROUND."""
+    global _task
+    start_time = time.perf_counter()
+    # Warm cache survives scale-to-zero when a snapshot path is configured
+    cache_service.restore_snapshot()
+    record_phase("cache_restore", time.perf_counter() - start_time)
+    job_manager.start()
+    if settings.STARTUP_WARMUP_BACKGROUND:
+        _task = asyncio.create_task(warm_up())
+    else:
+        await warm_up()
+
+
+async def stop() -> None:
+    if _task is not None and not _task.done():
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+
+
+def _phases_ms() -> Dict[str, float]:
+    return {name: round(seconds * 1000, 1) for name, seconds in _phases.items()}
+
+
+def report() -> dict:
+    """Startup timings for the debug endpoint."""
+    return {
+        "ready": _ready,
+        "process_age_at_ready_s": _ready_at,
+        "process_age_s": _process_age(),
+        "phases_ms": _phases_ms(),
+        "details": _details,
+    }
@@ -0,0 +1,213 @@
+import math
+from statistics import median
+from typing import Iterable, List, Tuple
+from src.config import settings
+from src.services.extractor import LAYOUT_FIELDS, _box, _new_columns
+
+# Tiled OCR for large scans (TILING_ENABLED). Instead of being downscaled to PREPROCESS_MAX_MEGAPIXELS,
+# a large page is cut into overlapping TILE_SIZE tiles that are OCR'd in parallel. Each tile owns its
+# half of every overlap, so a word seen by two tiles is kept once, by the tile that owns its centre.
+# Kept words are regrouped into blocks (fragments of one block split by a seam are joined again) and
+# put back into reading order with a recursive XY-cut: columns first, then rows.
+
+Box = Tuple[int, int, int, int]
+
+
+def should_tile(width: int, height: int) -> bool:
+    return settings.TILING_ENABLED and width * height > settings.TILING_MIN_MEGAPIXELS * 1_000_000
+
+
+def _tile_geometry() -> Tuple[int, int]:
+    tile_size = max(256, settings.TILE_SIZE)
+    return tile_size, min(max(0, settings.TILE_OVERLAP), tile_size // 2)
+
+
+def _spans(length: int, tile_size: int, overlap: int) -> List[Tuple[int, int]]:
+    """Evenly spaced [start, end) ranges of tile_size covering length, neighbours sharing at least overlap."""
+    if length <= tile_size:
+        return [(0, length)]
+    count = math.ceil((length - overlap) / (tile_size - overlap))
+    stride = (length - tile_size) / (count - 1)
+    return [(round(i * stride), round(i * stride) + tile_size) for i in range(count)]
+
+
+def _owned(spans: List[Tuple[int, int]]) -> List[Tuple[float, float]]:
+    """Each span owns up to the middle of its overlap with each neighbour."""
+    cuts = [(spans[i][1] + spans[i + 1][0]) / 2 for i in range(len(spans) - 1)]
+    bounds = [-math.inf] + cuts + [math.inf]
+    return list(zip(bounds, bounds[1:]))
+
+
+def plan_tiles(width: int, height: int) -> List[dict]:
+    """Tiles for a width x height image in row-major order: {"box": (x0, y0, x1, y1), "owns": (x0, y0, x1, y1)}."""
+    tile_size, overlap = _tile_geometry()
+    xs, ys = _spans(width, tile_size, overlap), _spans(height, tile_size, overlap)
+    tiles = []
+    for (y0, y1), (oy0, oy1) in zip(ys, _owned(ys)):
+        for (x0, x1), (ox0, ox1) in zip(xs, _owned(xs)):
+            tiles.append({"box": (x0, y0, x1, y1), "owns": (ox0, oy0, ox1, oy1)})
+    return tiles
+
+
+def tiled_size(width: int, height: int) -> Tuple[int, int]:
+    """Full size, or the largest size whose tiling needs no more than TILING_MAX_TILES tiles."""
+    tile_size, overlap = _tile_geometry()
+    scale = 1.0
+    while True:
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        count = len(_spans(size[0], tile_size, overlap)) * len(_spans(size[1], tile_size, overlap))
+        if count <= max(1, settings.TILING_MAX_TILES) or max(size) <= tile_size:
+            return size
+        scale *= 0.9
+
+
+def _owned_words(response, tile: dict) -> Iterable[tuple]:
+    """(block index, (text, confidence, page box)) for the words of one tile's response that the tile owns."""
+    full_text = response.full_text_annotation
+    pb = type(full_text).pb(full_text) if hasattr(type(full_text), "pb") else full_text
+    left, top = tile["box"][:2]
+    owns = tile["owns"]
+    block_index = 0
+    for page in pb.pages:
+        for block in page.blocks:
+            for paragraph in block.paragraphs:
+                for word in paragraph.words:
+                    x0, y0, x1, y1 = _box(word.bounding_box)
+                    box = (x0 + left, y0 + top, x1 + left, y1 + top)
+                    center_x, center_y = (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+                    if owns[0] <= center_x < owns[2] and owns[1] <= center_y < owns[3]:
+                        text = "".join(symbol.text for symbol in word.symbols)
+                        yield block_index, (text, word.confidence, box)
+            block_index += 1
+
+
+def _union(boxes: Iterable[Box]) -> Box:
+    boxes = list(boxes)
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+
+def _adjacent(a: Box, b: Box, gap: float) -> bool:
+    """Side by side or stacked, at most gap apart, and mostly overlapping along the other axis."""
+    for axis in (0, 1):
+        other = 1 - axis
+        distance = max(a[axis], b[axis]) - min(a[axis + 2], b[axis + 2])
+        shared = min(a[other + 2], b[other + 2]) - max(a[other], b[other])
+        if distance <= gap and shared > 0.5 * min(a[other + 2] - a[other], b[other + 2] - b[other]):
+            return True
+    return False
+
+
+def _join_seam_fragments(groups: List[dict], gap: float) -> List[dict]:
+    """Merge blocks from different tiles that touch across a seam (one block cut in two by the tiling)."""
+    parent = list(range(len(groups)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, a in enumerate(groups):
+        for j in range(i + 1, len(groups)):
+            b = groups[j]
+            if a["tile"] != b["tile"] and _adjacent(a["box"], b["box"], gap):
+                parent[find(j)] = find(i)
+
+    merged = {}
+    for i, group in enumerate(groups):
+        merged.setdefault(find(i), []).extend(group["words"])
+    return [{"words": words, "box": _union(word[2] for word in words)} for words in merged.values()]
+
+
+def _split(groups: List[dict], axis: int, gap: float) -> List[List[dict]]:
+    """Split groups wherever a band wider than gap along axis (0: x, 1: y) crosses none of them."""
+    parts, end = [], None
+    for group in sorted(groups, key=lambda g: g["box"][axis]):
+        if end is None or group["box"][axis] - end > gap:
+            parts.append([])
+        parts[-1].append(group)
+        end = group["box"][axis + 2] if end is None else max(end, group["box"][axis + 2])
+    return parts
+
+
+def _reading_order(groups: List[dict], gap: float) -> List[dict]:
+    """Recursive XY-cut: split into columns where possible, otherwise into rows."""
+    if len(groups) <= 1:
+        return groups
+    for axis in (0, 1):
+        parts = _split(groups, axis, gap)
+        if len(parts) > 1:
+            return [group for part in parts for group in _reading_order(part, gap)]
+    return sorted(groups, key=lambda g: (g["box"][1], g["box"][0]))
+
+
+def _lines(words: List[tuple], line_height: float) -> List[List[tuple]]:
+    """Words grouped into lines by vertical centre, top to bottom, each line left to right."""
+    lines = []  # [centre y of the line's first word, words]
+    for word in sorted(words, key=lambda w: w[2][1] + w[2][3]):
+        center = (word[2][1] + word[2][3]) / 2
+        if lines and abs(center - lines[-1][0]) <= line_height / 2:
+            lines[-1][1].append(word)
+        else:
+            lines.append([center, [word]])
+    return [sorted(line, key=lambda w: w[2][0]) for _, line in lines]
+
+
+def _append_scaled(columns: dict, box: Box, scale: float, offset: tuple) -> None:
+    for name, value, shift in zip(("x0", "y0", "x1", "y1"), box, offset + offset):
+        columns[name].append(round(value / scale) + shift)
+
+
+def stitch(
+    responses: list,
+    tiles: List[dict],
+    layout_fields: Iterable[str] = LAYOUT_FIELDS,
+    scale: float = 1.0,
+    offset: tuple = (0, 0),
+) -> dict:
+    """
+    Combine the Vision responses for tiles (same order) into one page.
+    Returns {"text", "confidence", "layout"}: confidence and layout as in extractor.extract_annotation,
+    with boxes in original-image pixels (scale: processed/original size ratio; offset: crop origin).
+    """
+    groups = {}  # (tile index, block index) -> {"tile", "words"}
+    for tile_index, (response, tile) in enumerate(zip(responses, tiles)):
+        for block_index, word in _owned_words(response, tile):
+            groups.setdefault((tile_index, block_index), {"tile": tile_index, "words": []})["words"].append(word)
+
+    words = [word for group in groups.values() for word in group["words"]]
+    if not words:
+        return {"text": "", "confidence": None, "layout": None}
+
+    line_height = median(word[2][3] - word[2][1] for word in words) or 1
+    for group in groups.values():
+        group["box"] = _union(word[2] for word in group["words"])
+    ordered = _reading_order(_join_seam_fragments(list(groups.values()), line_height), line_height)
+
+    layout_fields = frozenset(layout_fields) & LAYOUT_FIELDS
+    blocks = _new_columns("confidence", "x0", "y0", "x1", "y1") if "blocks" in layout_fields else None
+    word_columns = _new_columns("text", "confidence", "block", "x0", "y0", "x1", "y1") if "words" in layout_fields else None
+    texts = []
+    for index, group in enumerate(ordered):
+        lines = _lines(group["words"], line_height)
+        texts.append("\n".join(" ".join(word[0] for word in line) for line in lines))
+        if blocks is not None:
+            blocks["confidence"].append(round(sum(word[1] for word in group["words"]) / len(group["words"]), 3))
+            _append_scaled(blocks, group["box"], scale, offset)
+        if word_columns is not None:
+            for text, confidence, box in (word for line in lines for word in line):
+                word_columns["text"].append(text)
+                word_columns["confidence"].append(round(confidence, 3))
+                word_columns["block"].append(index)
+                _append_scaled(word_columns, box, scale, offset)
+
+    layout = {}
+    if blocks is not None:
+        layout["blocks"] = blocks
+    if word_columns is not None:
+        layout["words"] = word_columns
+    return {
+        "text": "\n".join(texts),
+        "confidence": round(sum(word[1] for word in words) / len(words), 3),
+        "layout": layout or None,
+    }
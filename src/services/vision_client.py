@@ -0,0 +1,284 @@
+import asyncio
+import itertools
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+from src.config import settings
+from src.services.metrics import EXECUTOR_PENDING, VISION_CALLS, VISION_IN_FLIGHT, observe_stage
+
+# Vision transport layer: clients are created lazily (never at import time), blocking gRPC calls run on a
+# dedicated executor instead of the loop's default one, and in-flight calls are capped per event loop
+# (vision_policy takes the slot before an attempt's deadline starts, so local queueing isn't timed as Vision).
+# google.cloud.vision (a large import) is only loaded on first use or by the startup warm-up.
+
+_lock = threading.Lock()
+_clients: list = []
+_client_cycle = None
+_executor: Optional[ThreadPoolExecutor] = None
+_async_clients = weakref.WeakKeyDictionary()
+_async_override = None
+_pending_calls = 0  # running or waiting for an in-flight slot, across loops
+_semaphores = weakref.WeakKeyDictionary()
+_current_slot: ContextVar[Optional["_Slot"]] = ContextVar("vision_slot", default=None)
+
+
+class VisionBacklogError(Exception):
+    """No VISION_MAX_IN_FLIGHT slot freed up in time: local queueing, not a Vision failure."""
+
+
+def _create_client():
+    """Create a sync client; with a pool each client gets its own gRPC connection."""
+    if settings.VISION_BACKEND == "fake":
+        from src.services.fake_vision import FakeVisionClient, backend_options
+
+        return FakeVisionClient(**backend_options())
+    from google.cloud import vision
+    from google.cloud.vision_v1.services.image_annotator.transports import ImageAnnotatorGrpcTransport
+
+    if settings.VISION_CHANNEL_POOL_SIZE <= 1:
+        return vision.ImageAnnotatorClient()
+    channel = ImageAnnotatorGrpcTransport.create_channel(
+        options=[
+            ("grpc.use_local_subchannel_pool", 1),  # don't let channels share one TCP connection
+            ("grpc.max_send_message_length", -1),
+            ("grpc.max_receive_message_length", -1),
+        ]
+    )
+    return vision.ImageAnnotatorClient(transport=ImageAnnotatorGrpcTransport(channel=channel))
+
+
+def get_client():
+    """Return the next sync client from the channel pool (round-robin)."""
+    global _client_cycle
+    with _lock:
+        if not _clients:
+            _clients.extend(_create_client() for _ in range(max(1, settings.VISION_CHANNEL_POOL_SIZE)))
+            _client_cycle = itertools.cycle(_clients)
+        return next(_client_cycle)
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Dedicated, bounded executor for blocking Vision calls."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.VISION_EXECUTOR_WORKERS), thread_name_prefix="vision"
+            )
+        return _executor
+
+
+def _get_async_client(loop: asyncio.AbstractEventLoop):
+    """grpc.aio channels are bound to a loop, so keep one async client per loop."""
+    if _async_override is not None:
+        return _async_override
+    client = _async_clients.get(loop)
+    if client is None:
+        if settings.VISION_BACKEND == "fake":
+            from src.services.fake_vision import FakeVisionAsyncClient, backend_options
+
+            client = FakeVisionAsyncClient(**backend_options())
+        else:
+            from google.cloud import vision
+
+            client = vision.ImageAnnotatorAsyncClient()
+        _async_clients[loop] = client
+    return client
+
+
+def _get_semaphore(loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, settings.VISION_MAX_IN_FLIGHT))
+        _semaphores[loop] = semaphore
+    return semaphore
+
+
+class _Slot:
+    """
+    One VISION_MAX_IN_FLIGHT slot, counted as a pending call from creation until its last holder lets go.
+    A gRPC call on the executor keeps holding it after the coroutine awaiting it is cancelled (timed-out
+    attempt, hedge loser), so no more than VISION_MAX_IN_FLIGHT RPCs ever run at once.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        global _pending_calls
+        self._loop = loop
+        self._semaphore = _get_semaphore(loop)
+        self._acquired = False
+        self._holders = 1
+        _pending_calls += 1
+
+    async def acquire(self) -> None:
+        start = time.perf_counter()
+        await self._semaphore.acquire()
+        self._acquired = True
+        observe_stage("vision_wait", time.perf_counter() - start)  # contention for VISION_MAX_IN_FLIGHT
+
+    def retain(self) -> None:
+        self._holders += 1
+
+    def release(self) -> None:
+        global _pending_calls
+        self._holders -= 1
+        if self._holders == 0:
+            _pending_calls -= 1
+            if self._acquired:
+                self._semaphore.release()
+
+    def release_threadsafe(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self.release)
+        except RuntimeError:  # the loop is closed; its semaphore went with it
+            pass
+
+
+@asynccontextmanager
+async def in_flight_slot(timeout: Optional[float] = None):
+    """
+    Hold a VISION_MAX_IN_FLIGHT slot for the Vision calls made inside; reentrant, so calls made within an
+    outer slot don't take a second one. Raises VisionBacklogError when none frees up within timeout.
+    """
+    if _current_slot.get() is not None:
+        yield
+        return
+    slot = _Slot(asyncio.get_running_loop())
+    try:
+        try:
+            await asyncio.wait_for(slot.acquire(), timeout)
+        except asyncio.TimeoutError:
+            raise VisionBacklogError(f"No Vision call slot freed up within {timeout:.1f}s.")
+        token = _current_slot.set(slot)
+        try:
+            yield
+        finally:
+            _current_slot.reset(token)
+    finally:
+        slot.release()
+
+
+def _build_request(content: bytes):
+    from google.cloud import vision
+
+    return vision.AnnotateImageRequest(
+        image=vision.Image(content=content),
+        features=[vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)],
+    )
+
+
+async def annotate_images(contents: List[bytes], timeout: Optional[float] = None) -> list:
+    """
+    Run DOCUMENT_TEXT_DETECTION for the given images in one RPC; returns one response per image.
+    The client library's own retries are disabled; vision_policy decides what to retry.
+    """
+    loop = asyncio.get_running_loop()
+    requests = [_build_request(content) for content in contents]
+    timeout = timeout or settings.VISION_CALL_TIMEOUT
+    async with in_flight_slot():
+        return await _annotate(loop, requests, timeout)
+
+
+def pending_calls() -> int:
+    """Vision calls in progress or waiting for a VISION_MAX_IN_FLIGHT slot (load-shedding signal)."""
+    return _pending_calls
+
+
+async def _annotate(loop: asyncio.AbstractEventLoop, requests: list, timeout: float) -> list:
+    """One RPC; the caller holds an in-flight slot."""
+    start = time.perf_counter()
+    try:
+        with VISION_IN_FLIGHT.track():
+            if settings.VISION_TRANSPORT == "async":
+                batch_response = await _get_async_client(loop).batch_annotate_images(
+                    requests=requests, retry=None, timeout=timeout
+                )
+            else:
+                batch_response = await _annotate_in_executor(requests, timeout)
+    except Exception:
+        VISION_CALLS.inc(outcome="error")
+        raise
+    finally:
+        observe_stage("vision", time.perf_counter() - start)
+    VISION_CALLS.inc(outcome="ok")
+    return list(batch_response.responses)
+
+
+async def _annotate_in_executor(requests: list, timeout: float):
+    """Blocking RPC on the Vision executor; the slot is held until the thread returns, even if cancelled."""
+    client = get_client()
+    slot = _current_slot.get()
+    slot.retain()
+    try:
+        future = get_executor().submit(
+            lambda: client.batch_annotate_images(requests=requests, retry=None, timeout=timeout)
+        )
+    except BaseException:
+        slot.release()
+        raise
+    future.add_done_callback(lambda _: slot.release_threadsafe())
+    with EXECUTOR_PENDING.track(executor="vision"):
+        return await asyncio.wrap_future(future)
+
+
+async def document_text_detection(content: bytes, timeout: Optional[float] = None):
+    """Single-image DOCUMENT_TEXT_DETECTION call."""
+    responses = await annotate_images([content], timeout)
+    return responses[0]
+
+
+async def warm_up(timeout: float) -> dict:
+    """
+    Create the clients for the configured transport and connect their gRPC channels (no RPC is sent),
+    so the first request doesn't pay for channel set-up. Raises if a channel isn't ready within timeout.
+    """
+    loop = asyncio.get_running_loop()
+    if settings.VISION_TRANSPORT == "async":
+        clients = [_get_async_client(loop)]
+    else:
+        await loop.run_in_executor(None, get_client)  # credential discovery can block
+        with _lock:
+            clients = list(_clients)
+    channels = [client.transport.grpc_channel for client in clients if hasattr(client, "transport")]
+
+    if settings.VISION_TRANSPORT == "async":
+        await asyncio.gather(*(asyncio.wait_for(channel.channel_ready(), timeout) for channel in channels))
+    else:
+        import grpc
+
+        await asyncio.gather(
+            *(loop.run_in_executor(None, grpc.channel_ready_future(channel).result, timeout) for channel in channels)
+        )
+    return {"backend": settings.VISION_BACKEND, "transport": settings.VISION_TRANSPORT, "channels": len(channels)}
+
+
+def set_backend(client=None, async_client=None) -> None:
+    """
+    Route Vision calls to the given clients instead of creating real ones (e.g. the fake backend in
+    benchmarks). client serves the "grpc" transport, async_client the "async" one; None restores defaults.
+    """
+    global _client_cycle, _async_override
+    with _lock:
+        _clients.clear()
+        _client_cycle = None
+        if client is not None:
+            _clients.append(client)
+            _client_cycle = itertools.cycle(_clients)
+        _async_override = async_client
+
+
+def shutdown() -> None:
+    """Release the executor and close pooled channels."""
+    global _executor, _client_cycle
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+        for client in _clients:
+            if hasattr(client, "transport"):  # fake clients hold no channel
+                client.transport.close()
+        _clients.clear()
+        _client_cycle = None
@@ -0,0 +1,217 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+from google.api_core import exceptions as google_exceptions
+from src.config import settings
+from src.services import vision_client
+from src.services.logger import logger
+from src.services.metrics import VISION_CIRCUIT_OPEN, VISION_HEDGES, VISION_RETRIES
+
+# Call policy around Vision RPCs: a per-attempt deadline (started once a VISION_MAX_IN_FLIGHT slot is
+# held, so only the RPC is timed) inside an overall budget, jittered retries on
+# transient errors, an optional hedged duplicate once an attempt outlasts recent tail latency, and a
+# circuit breaker that fails fast while Vision is down.
+
+T = TypeVar("T")
+
+TRANSIENT_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.Aborted,
+    google_exceptions.Unknown,
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling Vision while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    closed: calls pass; open: calls fail fast for reset_timeout seconds;
+    half_open: one trial call passes, its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, timer=time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.timer = timer
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.timer() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logger.info({"event": "vision_circuit_closed"})
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        VISION_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        was_trial = self._trial_in_flight
+        self._trial_in_flight = False
+        if was_trial or (self.opened_at is None and self.consecutive_failures >= self.failure_threshold):
+            self.opened_at = self.timer()
+            VISION_CIRCUIT_OPEN.set(1)
+            logger.warning({"event": "vision_circuit_opened", "consecutive_failures": self.consecutive_failures})
+
+    def release_trial(self) -> None:
+        """Let another trial through after a half-open call was cancelled without an outcome."""
+        self._trial_in_flight = False
+
+    def retry_after(self) -> float:
+        """Seconds until a trial call will be let through (0 when not open)."""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self.timer() - self.opened_at))
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_s": round(self.retry_after(), 1),
+        }
+
+
+class LatencyTracker:
+    """Recent successful attempt latencies, for choosing the hedge delay."""
+
+    def __init__(self, window: int = 256, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if len(self._samples) < self.min_samples:
+            return None
+        values = sorted(self._samples)
+        return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+breaker = CircuitBreaker(settings.VISION_BREAKER_FAILURE_THRESHOLD, settings.VISION_BREAKER_RESET_TIMEOUT)
+latencies = LatencyTracker()
+
+
+def _backoff_delay(retry: int) -> float:
+    """Full-jitter exponential backoff for the given retry number (0-based)."""
+    return random.uniform(0, min(settings.VISION_RETRY_MAX_DELAY, settings.VISION_RETRY_BASE_DELAY * (2 ** retry)))
+
+
+def _hedge_delay() -> float:
+    observed = latencies.percentile(settings.VISION_HEDGE_PERCENTILE)
+    return max(settings.VISION_HEDGE_MIN_DELAY, observed or 0.0)
+
+
+async def _attempt(call: Callable[[float], Awaitable[T]], timeout: float, deadline: float) -> T:
+    """
+    One attempt with a deadline; the timeout is also passed down so gRPC can cancel server-side.
+    The clock starts once an in-flight slot is held; waiting for one is bounded by the overall deadline
+    and raises VisionBacklogError instead of DeadlineExceeded.
+    """
+    loop = asyncio.get_running_loop()
+    async with vision_client.in_flight_slot(timeout=max(0.0, deadline - loop.time())):
+        timeout = min(timeout, deadline - loop.time())
+        if timeout <= 0:
+            raise vision_client.VisionBacklogError("The Vision request deadline passed while waiting for a call slot.")
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(call(timeout), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise google_exceptions.DeadlineExceeded(f"Vision call exceeded its {timeout:.1f}s deadline.")
+    latencies.add(time.perf_counter() - start)
+    return result
+
+
+async def _hedged_attempt(call: Callable[[float], Awaitable[T]], timeout: float, deadline: float) -> T:
+    """
+    Attempt, plus one duplicate request if the first hasn't answered after the hedge delay; the first
+    successful answer wins. With the "grpc" transport the losing RPC can't be interrupted and finishes
+    in the background, holding its in-flight slot until it returns, so hedging trades extra Vision
+    requests (and slots) for tail latency.
+    """
+    delay = _hedge_delay()
+    if not settings.VISION_HEDGE_ENABLED or delay >= timeout:
+        return await _attempt(call, timeout, deadline)
+
+    primary = asyncio.ensure_future(_attempt(call, timeout, deadline))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    hedge = asyncio.ensure_future(_attempt(call, timeout - delay, deadline))
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    VISION_HEDGES.inc(winner="hedge" if task is hedge else "primary")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_vision(call: Callable[[float], Awaitable[T]]) -> T:
+    """
+    Run call(timeout) under the call policy. Retries TRANSIENT_ERRORS with jittered backoff within
+    VISION_REQUEST_DEADLINE; raises CircuitOpenError without calling Vision while the breaker is open.
+    Only the RPC feeds the breaker: a VisionBacklogError (no slot within the deadline) is not retried.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.VISION_REQUEST_DEADLINE
+    attempts = max(1, settings.VISION_RETRY_ATTEMPTS)
+    attempt = 0
+
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(f"Vision API is unavailable; retry in {breaker.retry_after():.0f}s.")
+        try:
+            result = await _hedged_attempt(call, settings.VISION_CALL_TIMEOUT, deadline)
+        except TRANSIENT_ERRORS as e:
+            breaker.record_failure()
+            attempt += 1
+            delay = _backoff_delay(attempt - 1)
+            if attempt >= attempts or loop.time() + delay >= deadline:
+                raise
+            VISION_RETRIES.inc()
+            logger.warning({"event": "vision_retry", "attempt": attempt, "delay_s": round(delay, 3), "error": str(e)})
+            await asyncio.sleep(delay)
+            continue
+        except (asyncio.CancelledError, vision_client.VisionBacklogError):
+            breaker.release_trial()
+            raise
+        except Exception:
+            breaker.record_success()  # Vision answered (e.g. InvalidArgument); it's not an outage
+            raise
+        breaker.record_success()
+        return result
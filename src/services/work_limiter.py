@@ -0,0 +1,82 @@
+import math
+import time
+from typing import List, Optional
+from fastapi import HTTPException
+from limits import parse
+from limits.aio.strategies import FixedWindowRateLimiter
+from limits.storage import storage_from_string
+from src.config import settings
+from src.services.logger import logger
+from src.utils.ingest import Upload
+
+# Cost-weighted rate limiting: a request is charged by the work it brings (images and megapixels,
+# read from the upload headers before any decoding) rather than counted once. Counters live in
+# RATE_LIMIT_STORAGE_URI, the same store as the request-count limiter, so they are shared when it's Redis.
+
+
+def work_units(uploads: List[Upload]) -> int:
+    """
+    1 unit per page plus 1 per started RATE_LIMIT_UNIT_MEGAPIXELS of each page (a multi-page upload is
+    charged for every page it may send to Vision); failed uploads cost 1.
+    """
+    units = 0
+    for upload in uploads:
+        if upload.error:
+            units += 1
+            continue
+        megapixels = upload.width * upload.height / 1_000_000
+        units += upload.pages * (1 + math.ceil(megapixels / settings.RATE_LIMIT_UNIT_MEGAPIXELS))
+    return units
+
+
+def _async_storage(uri: str):
+    if uri.startswith(("redis://", "rediss://")):
+        return storage_from_string(f"async+{uri}", implementation="redispy")
+    return storage_from_string(f"async+{uri}")
+
+
+class WorkUnitLimiter:
+    """
+    Fixed-window limiter charged in work units per client.
+    limit: limits-style string ("300/minute"); a single request is never charged more than the whole
+    window, so one large job can use a client's full budget but is never rejected outright.
+    """
+
+    def __init__(self, limit: str, storage_uri: str):
+        self.limit = limit
+        self.enabled = bool(limit)
+        self._item = parse(limit) if limit else None
+        self._strategy = FixedWindowRateLimiter(_async_storage(storage_uri)) if limit else None
+
+    async def charge(self, client_id: str, units: int) -> None:
+        """Consume units for client_id; raises 429 with Retry-After when the window is used up."""
+        if not self.enabled:
+            return
+        cost = max(1, min(units, self._item.amount))
+        try:
+            allowed = await self._strategy.hit(self._item, "work", client_id, cost=cost)
+            if allowed:
+                return
+            stats = await self._strategy.get_window_stats(self._item, "work", client_id)
+        except Exception as e:
+            # A broken shared store must not take the API down with it
+            logger.warning({"event": "work_limiter_error", "error": str(e)})
+            return
+
+        retry_after = max(1, math.ceil(stats.reset_time - time.time()))
+        logger.warning({"event": "work_limit_exceeded", "client": client_id, "units": units, "limit": self.limit})
+        raise HTTPException(
+            status_code=429,
+            detail=f"Work-unit rate limit exceeded: request costs {units} units, limit is {self.limit}.",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+work_limiter = WorkUnitLimiter(settings.RATE_LIMIT_WORK_UNITS, settings.RATE_LIMIT_STORAGE_URI)
+
+
+async def charge_uploads(client_id: Optional[str], uploads: List[Upload]) -> int:
+    """Charge a request's uploads to its client; returns the units charged."""
+    units = work_units(uploads)
+    await work_limiter.charge(client_id or "unknown", units)
+    return units
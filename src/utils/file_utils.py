@@ -1,9 +1,13 @@
 from fastapi import UploadFile, HTTPException
 from PIL import Image, UnidentifiedImageError
 import io
+import time
+from typing import Callable, Optional
 from src.config import settings
+from src.services.image_context import ImageContext
 
-ALLOWED_TYPES = ["image/jpeg", "image/jpg", "image/png", "image/gif"]
+ALLOWED_TYPES = ["image/jpeg", "image/jpg", "image/png", "image/gif", "image/tiff"]
+MULTIPAGE_TYPES = ["image/gif", "image/tiff"]
 
 async def validate_file(file: UploadFile):
     if file.content_type not in ALLOWED_TYPES:
@@ -12,7 +16,8 @@ async def validate_file(file: UploadFile):
     _validate_image_bytes(contents, file.content_type)
     return contents
 
-def _validate_image_bytes(contents: bytes, content_type: str):
+def _check_upload_limits(contents: bytes, content_type: str):
+    """Cheap byte-level checks (type and size) that don't need to decode the image."""
     if content_type not in ALLOWED_TYPES:
         raise HTTPException(status_code=415, detail="Unsupported file type.")
 
@@ -22,16 +27,48 @@ def _validate_image_bytes(contents: bytes, content_type: str):
     if content_type == "image/gif" and len(contents) > settings.MAX_GIF_SIZE:
         raise HTTPException(status_code=413, detail="GIF too large.")
 
+def _check_frame_count(n_frames: int, content_type: str):
+    """Frame limit: MULTIPAGE_MAX_FRAMES for multi-page uploads when multi-page OCR is on, else MAX_GIF_FRAMES for GIFs."""
+    if settings.MULTIPAGE_ENABLED and content_type in MULTIPAGE_TYPES:
+        if n_frames > settings.MULTIPAGE_MAX_FRAMES:
+            raise HTTPException(status_code=415, detail=f"Too many frames or pages (max {settings.MULTIPAGE_MAX_FRAMES}).")
+    elif content_type == "image/gif" and n_frames > settings.MAX_GIF_FRAMES:
+        raise HTTPException(status_code=415, detail="Animated GIFs are not supported. Upload a static image.")
+
+def _validate_image_bytes(
+    contents: bytes, content_type: str, draft: Optional[Callable[[Image.Image], None]] = None
+) -> ImageContext:
+    """
+    Validate an upload and return it decoded once as an ImageContext.
+    draft: called on the opened image before it is loaded, so the caller can request a reduced-scale decode.
+    """
+    _check_upload_limits(contents, content_type)
+
+    start = time.perf_counter()
     try:
-        img = Image.open(io.BytesIO(contents))
-        img.verify()
         img = Image.open(io.BytesIO(contents))
         n_frames = getattr(img, "n_frames", 1)
-        if content_type == "image/gif" and n_frames > settings.MAX_GIF_FRAMES:
-            raise HTTPException(status_code=415, detail="Animated GIFs are not supported. Upload a static image.")
+        _check_frame_count(n_frames, content_type)
+        img.seek(0)
+        width, height = img.size
+        if draft is not None:
+            draft(img)
+        # Full decode of the first frame; raises on truncated or corrupted data like verify() did
+        img.load()
     except UnidentifiedImageError:
         raise HTTPException(status_code=400, detail="Uploaded file is not a valid image.")
     except HTTPException:
         raise
     except Exception:
         raise HTTPException(status_code=400, detail="Uploaded file appears to be corrupted or unreadable.")
+
+    return ImageContext(
+        raw_bytes=contents,
+        mimetype=content_type,
+        format=img.format,
+        width=width,
+        height=height,
+        n_frames=n_frames,
+        image=img,
+        timings={"decode": time.perf_counter() - start},
+    )
@@ -2,3 +2,22 @@ import hashlib
 
 def sha256_bytes(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
+
+def dhash(image, hash_size: int = 16) -> int:
+    """
+    Difference hash of a PIL image: compare adjacent pixels of a (hash_size+1) x hash_size
+    grayscale thumbnail. Re-encoded or format-converted copies of a page hash within a few bits.
+    """
+    from PIL import Image
+
+    small = image.resize((hash_size + 1, hash_size), Image.Resampling.BOX).convert("L")
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
@@ -0,0 +1,221 @@
+import hashlib
+import struct
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from fastapi import UploadFile, HTTPException
+from src.config import settings
+from src.services.metrics import UPLOAD_BYTES
+from src.utils.file_utils import ALLOWED_TYPES, _check_frame_count
+
+_MAGIC_NUMBERS = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+    (b"II*\x00", "TIFF"),
+    (b"MM\x00*", "TIFF"),
+)
+_SNIFF_BYTES = 8
+
+
+class UploadLimitExceeded(Exception):
+    """A request's uploads passed the max_total_bytes given to read_batch_uploads."""
+
+
+@dataclass
+class Upload:
+    """
+    An upload read once in chunks: bytes, incremental SHA-256 and what the headers told us.
+    error: detail of an ingestion failure (batch uploads carry it instead of raising)
+    """
+
+    filename: str
+    content_type: str
+    contents: bytes = b""
+    digest: str = ""
+    image_format: Optional[str] = None
+    width: int = 0
+    height: int = 0
+    n_frames: int = 1
+    error: Optional[str] = None
+
+    @property
+    def pages(self) -> int:
+        """Pages OCR'd at most, from the header frame count: every frame when multi-page OCR applies."""
+        if self.error or not settings.MULTIPAGE_ENABLED or self.image_format not in ("GIF", "TIFF"):
+            return 1
+        return max(1, min(self.n_frames, settings.MULTIPAGE_MAX_PAGES))
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    for magic, image_format in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return image_format
+    return None
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Walk JPEG markers up to the first SOFn frame header."""
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # markers without a length
+            i += 2
+            continue
+        (length,) = struct.unpack(">H", data[i + 2:i + 4])
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            if i + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + length
+    return None
+
+
+def _gif_frame_count(data: bytes) -> int:
+    """Count image descriptors by walking GIF blocks; no LZW decoding."""
+    if len(data) < 13:
+        return 0
+    i = 13
+    flags = data[10]
+    if flags & 0x80:  # global colour table
+        i += 3 * (2 ** ((flags & 0x07) + 1))
+    frames = 0
+    while i < len(data):
+        block = data[i]
+        if block == 0x3B:  # trailer
+            break
+        if block == 0x21:  # extension: label, then sub-blocks
+            i += 2
+        elif block == 0x2C:  # image descriptor, optional local colour table, LZW code size, sub-blocks
+            frames += 1
+            if i + 10 > len(data):
+                break
+            local_flags = data[i + 9]
+            i += 10
+            if local_flags & 0x80:
+                i += 3 * (2 ** ((local_flags & 0x07) + 1))
+            i += 1
+        else:
+            break  # corrupt; let the decoder report it
+        while i < len(data) and data[i] != 0:
+            i += data[i] + 1
+        i += 1
+    return frames
+
+
+def _tiff_info(data: bytes) -> Tuple[int, int, int]:
+    """First page's size and the page count, by following the chain of IFDs; no strip decoding."""
+    order = "<" if data[:2] == b"II" else ">"
+    (offset,) = struct.unpack(order + "I", data[4:8])
+    width = height = pages = 0
+    seen = set()
+    while offset and offset not in seen and offset + 2 <= len(data):
+        seen.add(offset)  # a looping chain is corrupt; let the decoder report it
+        (count,) = struct.unpack(order + "H", data[offset:offset + 2])
+        if not pages:
+            for i in range(offset + 2, min(offset + 2 + 12 * count, len(data) - 11), 12):
+                tag, value_type = struct.unpack(order + "HH", data[i:i + 4])
+                if tag in (256, 257):  # ImageWidth, ImageLength: SHORT or LONG
+                    value_format = order + ("H" if value_type == 3 else "I")
+                    (value,) = struct.unpack(value_format, data[i + 8:i + 8 + struct.calcsize(value_format)])
+                    width, height = (value, height) if tag == 256 else (width, value)
+        pages += 1
+        end = offset + 2 + 12 * count
+        if end + 4 > len(data):
+            break
+        (offset,) = struct.unpack(order + "I", data[end:end + 4])
+    return width, height, max(pages, 1)
+
+
+def read_header_info(data: bytes, image_format: str) -> Tuple[int, int, int]:
+    """(width, height, n_frames) from image headers; zeros when a header can't be parsed."""
+    if image_format == "PNG" and len(data) >= 24 and data[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height, 1
+    if image_format == "GIF" and len(data) >= 10:
+        width, height = struct.unpack("<HH", data[6:10])
+        return width, height, _gif_frame_count(data)
+    if image_format == "TIFF" and len(data) >= 8:
+        return _tiff_info(data)
+    if image_format == "JPEG":
+        size = _jpeg_size(data)
+        if size:
+            return size[0], size[1], 1
+    return 0, 0, 1
+
+
+async def read_upload(file: UploadFile, max_bytes: Optional[int] = None) -> Upload:
+    """
+    Read an upload once in UPLOAD_CHUNK_SIZE chunks, hashing incrementally.
+    Rejects bad types, oversize files (as soon as the limit is passed), non-image magic bytes
+    and GIFs/TIFFs with too many frames before any image decoding happens.
+    max_bytes: what the request may still read; raises UploadLimitExceeded as soon as it is passed.
+    """
+    content_type = file.content_type
+    if content_type not in ALLOWED_TYPES:
+        raise HTTPException(status_code=415, detail="Unsupported file type.")
+
+    limit = settings.MAX_FILE_SIZE
+    if content_type == "image/gif":
+        limit = min(limit, settings.MAX_GIF_SIZE)
+
+    hasher = hashlib.sha256()
+    buffer = bytearray()
+    image_format = None
+    while True:
+        chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+        if max_bytes is not None and len(buffer) > max_bytes:
+            raise UploadLimitExceeded()
+        if len(buffer) > limit:
+            raise HTTPException(status_code=413, detail="GIF too large." if limit < settings.MAX_FILE_SIZE else "File too large.")
+        if image_format is None and len(buffer) >= _SNIFF_BYTES:
+            image_format = sniff_format(bytes(buffer[:_SNIFF_BYTES]))
+            if image_format is None:
+                raise HTTPException(status_code=400, detail="Uploaded file is not a valid image.")
+        hasher.update(chunk)
+
+    contents = bytes(buffer)
+    if image_format is None:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a valid image.")
+
+    width, height, n_frames = read_header_info(contents, image_format)
+    _check_frame_count(n_frames, content_type)
+
+    UPLOAD_BYTES.observe(len(contents))
+    return Upload(
+        filename=file.filename,
+        content_type=content_type,
+        contents=contents,
+        digest=hasher.hexdigest(),
+        image_format=image_format,
+        width=width,
+        height=height,
+        n_frames=n_frames,
+    )
+
+
+async def read_batch_uploads(files: List[UploadFile], max_total_bytes: Optional[int] = None) -> List[Upload]:
+    """
+    read_upload for each file; failures are recorded on the Upload so the batch can report them per item.
+    max_total_bytes: running cap on the bytes read for the whole batch (UploadLimitExceeded once passed).
+    """
+    uploads = []
+    remaining = max_total_bytes
+    for file in files:
+        try:
+            upload = await read_upload(file, max_bytes=remaining)
+        except HTTPException as he:
+            upload = Upload(filename=file.filename, content_type=file.content_type, error=str(he.detail))
+        uploads.append(upload)
+        if remaining is not None:
+            remaining -= len(upload.contents)
+    return uploads
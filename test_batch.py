@@ -0,0 +1,102 @@
+import asyncio
+import io
+import pytest
+from google.cloud import vision
+from PIL import Image, ImageDraw
+from src.config import settings
+from src.services import ocr_service
+from src.services.cache_service import finish_flight, join_flight
+from src.utils.hashing import sha256_bytes
+from src.utils.ingest import Upload
+
+
+def _upload(width: int, height: int = 120) -> Upload:
+    image = Image.new("RGB", (width, height), "white")
+    ImageDraw.Draw(image).rectangle((10, 10, width - 10, 30), fill="black")
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    contents = output.getvalue()
+    return Upload(filename=f"{width}.png", content_type="image/png", contents=contents, digest=sha256_bytes(contents))
+
+
+@pytest.fixture
+def vision_calls(monkeypatch):
+    """
+    Stubbed batch_annotate_images: answers each image with its width (a per-image error for width 173),
+    recording the size of every call.
+    """
+    calls = []
+
+    def respond(data: bytes):
+        width = Image.open(io.BytesIO(data)).width
+        if width == 173:
+            return vision.AnnotateImageResponse(error={"message": "Image too blurry."})
+        return vision.AnnotateImageResponse(text_annotations=[vision.EntityAnnotation(description=f"width {width}")])
+
+    async def annotate(images):
+        calls.append(len(images))
+        return [respond(data) for data in images]
+
+    monkeypatch.setattr(ocr_service, "_call_batch_annotate_images", annotate)
+    monkeypatch.setattr(settings, "PREPROCESS_CROP_ENABLED", False)
+    monkeypatch.setattr(settings, "PREPROCESS_EXECUTOR", "inline")
+    return calls
+
+
+def test_results_in_input_order_with_chunked_vision_calls(vision_calls, monkeypatch):
+    monkeypatch.setattr(settings, "VISION_BATCH_SIZE", 2)
+    widths = [311, 207, 405, 153, 259]
+    response, status_code = asyncio.run(ocr_service.process_batch_images([_upload(width) for width in widths]))
+
+    assert status_code == 200 and response["success"]
+    assert [result["filename"] for result in response["results"]] == [f"{width}.png" for width in widths]
+    assert [result["text"] for result in response["results"]] == [f"width {width}" for width in widths]
+    assert sorted(vision_calls) == [1, 2, 2]  # ceil(5 / 2) requests
+
+
+def test_bad_items_are_per_item_errors_and_the_batch_returns_207(vision_calls):
+    bad = Upload(filename="bad.png", content_type="image/png", contents=b"\x89PNG\r\n\x1a\nbroken", digest="bad-item")
+    uploads = [_upload(317), bad, _upload(173), _upload(221)]
+    response, status_code = asyncio.run(ocr_service.process_batch_images(uploads))
+
+    assert status_code == 207 and not response["success"]
+    first, undecodable, vision_error, last = response["results"]
+    assert first["success"] and first["text"] == "width 317"
+    assert not undecodable["success"] and undecodable["error"] == "Uploaded file is not a valid image."
+    assert not vision_error["success"] and vision_error["error"] == "Image too blurry."
+    assert last["success"] and last["text"] == "width 221"
+    assert vision_calls == [3]  # the undecodable item never reaches Vision
+
+
+def test_aborted_cleanup_leaves_a_newer_flight_for_the_same_image_alone(vision_calls, monkeypatch):
+    monkeypatch.setattr(settings, "VISION_BATCH_SIZE", 1)
+    failing, slow = _upload(331), _upload(233)
+    failing_called = newer_leader_joined = None
+
+    async def annotate(images):
+        if Image.open(io.BytesIO(images[0])).width == 331:
+            failing_called.set()
+            raise RuntimeError("Vision unavailable.")  # fails the item and finishes its flight
+        await newer_leader_joined.wait()
+        return [vision.AnnotateImageResponse(text_annotations=[vision.EntityAnnotation(description="slow")])]
+
+    monkeypatch.setattr(ocr_service, "_call_batch_annotate_images", annotate)
+
+    async def scenario():
+        nonlocal failing_called, newer_leader_joined
+        failing_called, newer_leader_joined = asyncio.Event(), asyncio.Event()
+        batch = asyncio.create_task(ocr_service.process_batch_images([failing, slow]))
+        await failing_called.wait()
+        await asyncio.sleep(0)  # let the failure finish the batch's flight
+        flight, leader = join_flight(failing.digest)  # another request retries the image mid-batch
+        assert leader
+        newer_leader_joined.set()
+        response, _ = await batch
+        assert not flight.done()  # the batch's cleanup did not take over the newer flight
+        finish_flight(failing.digest, result={"text": "retried"}, flight=flight)
+        return response, await flight
+
+    response, retried = asyncio.run(scenario())
+    assert response["results"][0]["error"] == "Vision unavailable."
+    assert response["results"][1]["text"] == "slow"
+    assert retried == {"text": "retried"}
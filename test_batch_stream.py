@@ -0,0 +1,92 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app import app
+from src.services import vision_client
+from src.services.admission import admission
+from src.services.fake_vision import FakeVisionAsyncClient, FakeVisionClient, synthetic_response
+from src.services.memory_budget import memory_budget
+
+
+@pytest.fixture
+def stream_files():
+    vision_client.set_backend(FakeVisionClient(response=synthetic_response(words=30), seed=0), FakeVisionAsyncClient(seed=0))
+    with open("tests/images/doc_with_formula.png", "rb") as f:
+        contents = f.read()
+    yield lambda tag: [
+        ("images", ("first.png", contents + tag.encode(), "image/png")),  # unique bytes, so not served from cache
+        ("images", ("broken.png", b"\x89PNG\r\n\x1a\nbroken", "image/png")),
+        ("images", ("third.png", contents + tag.encode() + b"-3", "image/png")),
+    ]
+    vision_client.set_backend()
+
+
+def test_ndjson_stream_has_one_line_per_image_then_a_summary(stream_files):
+    response = TestClient(app).post("/v1/batch-extract/stream", files=stream_files("ndjson"))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    results, summary = records[:-1], records[-1]
+    assert all(record["type"] == "result" for record in results)
+    assert sorted(record["index"] for record in results) == [0, 1, 2]
+    by_index = {record["index"]: record for record in results}
+    assert by_index[0]["filename"] == "first.png" and by_index[0]["success"]
+    assert by_index[1]["filename"] == "broken.png" and not by_index[1]["success"]
+    assert summary == {
+        "type": "summary", "success": False, "total_images": 3, "succeeded": 2, "failed": 1,
+        "total_processing_time_ms": summary["total_processing_time_ms"],
+    }
+
+
+def test_sse_stream_frames_each_record_as_an_event(stream_files):
+    response = TestClient(app).post(
+        "/v1/batch-extract/stream", files=stream_files("sse"), headers={"Accept": "text/event-stream"}
+    )
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [event for event in response.text.split("\n\n") if event]
+    assert len(events) == 4
+    for event in events:
+        event_line, data_line = event.split("\n")
+        record = json.loads(data_line.removeprefix("data: "))
+        assert event_line == f"event: {record['type']}"
+    assert events[-1].startswith("event: summary\n")
+
+
+def _asgi_request(path: str, files: list, headers: dict = None) -> tuple:
+    """(scope, body) for a multipart POST, built with httpx so the app can be driven over raw ASGI."""
+    request = httpx.Request("POST", f"http://testserver{path}", files=files, headers=headers)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(name.lower(), value) for name, value in request.headers.raw],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    return scope, request.read()
+
+
+def test_stream_that_never_starts_releases_what_it_holds():
+    with open("tests/images/book page.jpg", "rb") as f:
+        contents = f.read()
+    scope, body = _asgi_request("/v1/batch-extract/stream", [("images", ("a.jpg", contents, "image/jpeg"))])
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        raise OSError("client went away")  # before the response start is sent
+
+    with pytest.raises(Exception):
+        asyncio.run(app(scope, receive, send))
+    assert admission.admitted_bytes == 0
+    assert memory_budget.in_use == 0
@@ -0,0 +1,141 @@
+import asyncio
+import io
+import pytest
+from PIL import Image
+from src.config import settings
+from src.services import cache_service
+from src.services.cache_store import ByteBudgetCache, compress_result
+from src.services.kv_store import get_kv_store
+from src.utils.hashing import dhash
+
+IMAGE_BYTES = b"fake image bytes"
+RESULT = {"success": True, "text": "Hello", "confidence": 0.9, "metadata": None, "processing_time_ms": 5, "error": None}
+
+
+@pytest.fixture
+def l2_cache(monkeypatch):
+    """Enable an in-process L2 store and start from empty caches."""
+    monkeypatch.setattr(settings, "CACHE_L2_URL", "memory://test")
+    cache_service.cache.clear()
+    asyncio.run(get_kv_store("memory://test").flushdb())
+    yield
+    cache_service.cache.clear()
+
+
+def test_l2_read_through_promotes_to_l1(l2_cache):
+    """A result written behind to L2 is served after L1 is lost, and promoted back into L1."""
+    async def scenario():
+        cache_service.set_cache(IMAGE_BYTES, RESULT)
+        await cache_service.flush_pending_writes()
+        cache_service.cache.clear()  # simulate another instance / cold L1
+
+        assert cache_service.get_cache(IMAGE_BYTES) is None
+        cached = await cache_service.get_cache_async(IMAGE_BYTES)
+        assert cached["text"] == "Hello"
+        assert "_cached_at" in cached
+        assert cache_service.get_cache(IMAGE_BYTES) == cached
+
+    asyncio.run(scenario())
+
+
+def test_l2_disabled_is_l1_only(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_L2_URL", "")
+    cache_service.cache.clear()
+
+    async def scenario():
+        cache_service.set_cache(IMAGE_BYTES, RESULT)
+        assert (await cache_service.get_cache_async(IMAGE_BYTES))["text"] == "Hello"
+        cache_service.cache.clear()
+        assert await cache_service.get_cache_async(IMAGE_BYTES) is None
+
+    asyncio.run(scenario())
+
+
+def test_byte_budget_evicts_least_recently_used():
+    store = ByteBudgetCache(max_bytes=1200, ttl=60)
+    for i in range(10):
+        store[f"key{i}"] = {**RESULT, "text": f"text {i}"}
+
+    assert store.current_bytes <= 1200
+    assert store.evictions > 0
+    assert "key9" in store
+    assert "key0" not in store
+
+
+def test_snapshot_restore_drops_expired(tmp_path):
+    now = [1000.0]
+    store = ByteBudgetCache(max_bytes=1024 * 1024, ttl=60, timer=lambda: now[0])
+    store["fresh"] = RESULT
+    store.set_payload("stale", compress_result(RESULT), expires_at=now[0] + 5)
+    path = str(tmp_path / "cache.snapshot")
+    assert store.snapshot(path) == 2
+
+    now[0] += 10  # "stale" expires while the instance is scaled to zero
+    restored = ByteBudgetCache(max_bytes=1024 * 1024, ttl=60, timer=lambda: now[0])
+    assert restored.restore(path) == 1
+    assert restored.get("fresh") == RESULT
+    assert restored.get("stale") is None
+
+
+def test_single_flight_shares_result_and_errors():
+    """Waiters get the leader's result; a failed flight propagates to waiters and is not cached."""
+    async def scenario():
+        flight, leader = cache_service.join_flight("same-image")
+        waiter_flight, waiter_leader = cache_service.join_flight("same-image")
+        assert leader and not waiter_leader and waiter_flight is flight
+
+        waiter = asyncio.ensure_future(cache_service.wait_flight(waiter_flight))
+        cache_service.finish_flight("same-image", result=RESULT)
+        assert await waiter == RESULT
+
+        flight, leader = cache_service.join_flight("same-image")
+        assert leader  # a finished flight is not reused
+        waiter = asyncio.ensure_future(cache_service.wait_flight(flight))
+        cache_service.finish_flight("same-image", error=RuntimeError("vision down"))
+        with pytest.raises(RuntimeError, match="vision down"):
+            await waiter
+        assert cache_service.join_flight("same-image")[1]
+        cache_service.finish_flight("same-image", result=RESULT)
+
+    asyncio.run(scenario())
+
+
+def test_near_duplicate_lookup_matches_reencoded_copy(monkeypatch):
+    """A PNG -> JPEG re-encode of a cached page is found through the perceptual index."""
+    monkeypatch.setattr(settings, "CACHE_PHASH_ENABLED", True)
+    cache_service.cache.clear()
+
+    original = Image.open("tests/images/doc_with_formula.png").convert("RGB")
+    buffer = io.BytesIO()
+    original.save(buffer, format="JPEG", quality=60)
+    reencoded = Image.open(io.BytesIO(buffer.getvalue()))
+
+    cache_service.set_cache(IMAGE_BYTES, RESULT, perceptual_hash=dhash(original))
+    near = cache_service.find_near_duplicate(dhash(reencoded))
+    assert near is not None and near["near_duplicate"] is True
+    assert near["text"] == "Hello"
+
+    other = Image.open("tests/images/inguodo-inc.jpg")
+    assert cache_service.find_near_duplicate(dhash(other)) is None
+
+
+def test_batch_leader_finishes_its_flight_when_skipping_fails(monkeypatch):
+    """A batch item leading a flight resolves it even when the blank-page shortcut raises."""
+    from src.services import ocr_service
+    from src.utils.ingest import Upload
+
+    def failing_set_cache(*args, **kwargs):
+        raise RuntimeError("cache write failed")
+
+    monkeypatch.setattr(ocr_service, "set_cache", failing_set_cache)
+    output = io.BytesIO()
+    Image.new("RGB", (200, 200), "white").save(output, format="PNG")
+    upload = Upload(filename="blank.png", content_type="image/png", contents=output.getvalue(), digest="blank-leader")
+
+    async def scenario():
+        stage = await ocr_service._prepare_batch_item(upload, asyncio.Semaphore(1), start_time=0)
+        assert "cache write failed" in stage["result"]["error"]
+        assert cache_service.join_flight("blank-leader")[1]  # the failed flight was finished, not left open
+        cache_service.finish_flight("blank-leader", result=RESULT)
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import asyncio
+import io
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+from src.config import settings
+from src.services import cpu_pool
+
+
+def _png(width: int, height: int) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(output, format="PNG")
+    return output.getvalue()
+
+
+def test_inline_decision_uses_decoded_pixels(monkeypatch):
+    monkeypatch.setattr(settings, "PREPROCESS_EXECUTOR", "process")
+    small_file_big_bitmap = _png(4000, 4000)  # a few KB of PNG, 16 MP decoded
+    assert len(small_file_big_bitmap) < 64 * 1024
+    assert not cpu_pool._runs_inline(small_file_big_bitmap)
+    assert cpu_pool._runs_inline(_png(100, 100))
+    assert not cpu_pool._runs_inline(b"not an image")
+
+
+def test_process_executor_prepares_in_worker(monkeypatch):
+    monkeypatch.setattr(settings, "PREPROCESS_EXECUTOR", "process")
+    monkeypatch.setattr(settings, "PREPROCESS_WORKERS", 1)
+    with open("tests/images/book page.jpg", "rb") as f:
+        contents = f.read()
+
+    async def scenario():
+        image_ctx = await cpu_pool.prepare_image(contents, "image/jpeg")
+        with pytest.raises(HTTPException) as exc:
+            await cpu_pool.prepare_image(contents[:2000], "image/jpeg")  # truncated: decode fails in the worker
+        return image_ctx, exc.value
+
+    try:
+        image_ctx, error = asyncio.run(scenario())
+    finally:
+        cpu_pool.shutdown()
+    assert image_ctx.raw_bytes == contents  # restored by the parent, not shipped back from the worker
+    assert image_ctx.processed_bytes and image_ctx.image is None
+    assert set(image_ctx.timings) >= {"decode", "encode"}
+    assert error.status_code == 400
@@ -0,0 +1,44 @@
+from google.cloud import vision
+from src.services.confidence import compute_confidence
+from src.services.extractor import extract_annotation, parse_fields, select_fields
+
+
+def _box(x0, y0, x1, y1):
+    return vision.BoundingPoly(
+        vertices=[vision.Vertex(x=x0, y=y0), vision.Vertex(x=x1, y=y0), vision.Vertex(x=x1, y=y1), vision.Vertex(x=x0, y=y1)]
+    )
+
+
+def _annotation():
+    words = [
+        vision.Word(symbols=[vision.Symbol(text=c) for c in "Total"], confidence=0.9, bounding_box=_box(10, 10, 60, 30)),
+        vision.Word(symbols=[vision.Symbol(text=c) for c in "42"], confidence=0.6, bounding_box=_box(70, 10, 90, 30)),
+    ]
+    block = vision.Block(confidence=0.8, bounding_box=_box(10, 10, 90, 30), paragraphs=[vision.Paragraph(words=words)])
+    return vision.TextAnnotation(pages=[vision.Page(blocks=[block])])
+
+
+def test_single_pass_confidence_and_columnar_layout():
+    extraction = extract_annotation(_annotation(), scale=0.5)
+    assert extraction["confidence"] == 0.75
+    words = extraction["layout"]["words"]
+    assert words["text"] == ["Total", "42"]
+    assert words["block"] == [0, 0]
+    # boxes are mapped from the downscaled image Vision saw back to the upload
+    assert (words["x0"], words["x1"]) == ([20, 140], [120, 180])
+    assert extraction["layout"]["blocks"]["confidence"] == [0.8]
+
+
+def test_layout_is_opt_in():
+    assert extract_annotation(_annotation(), layout_fields=())["layout"] is None
+    assert compute_confidence(_annotation()) == 0.75
+    assert compute_confidence(vision.TextAnnotation()) is None
+
+    result = {"text": "Total 42", "layout": extract_annotation(_annotation())["layout"]}
+    assert select_fields(result, parse_fields(None))["layout"] is None
+    assert set(select_fields(result, parse_fields("text,words"))["layout"]) == {"words"}
+
+
+def test_boxes_are_offset_into_the_uncropped_upload():
+    words = extract_annotation(_annotation(), scale=0.5, offset=(100, 40))["layout"]["words"]
+    assert (words["x0"], words["y0"]) == ([120, 240], [60, 60])
@@ -0,0 +1,74 @@
+import pytest
+from fastapi.testclient import TestClient
+from google.api_core import exceptions as google_exceptions
+from google.cloud import vision
+from app import app
+from src.config import settings
+from src.services import cache_service, vision_client
+from src.services.fake_vision import FakeVisionAsyncClient, FakeVisionClient, synthetic_response
+from src.services.kv_store import get_kv_store
+from src.utils.hashing import sha256_bytes
+
+
+@pytest.fixture
+def fake_backend():
+    backend = FakeVisionClient(response=synthetic_response(words=30), seed=0)
+    vision_client.set_backend(backend, FakeVisionAsyncClient(seed=0))
+    yield backend
+    vision_client.set_backend()
+
+
+def test_fake_backend_error_rate():
+    failing = FakeVisionClient(error_rate=1.0)
+    request = vision.AnnotateImageRequest(image=vision.Image(content=b"x"))
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        failing.batch_annotate_images(requests=[request])
+    assert len(FakeVisionClient().batch_annotate_images(requests=[request, request]).responses) == 2
+
+
+def test_extract_text_offline(fake_backend):
+    with open("tests/images/doc_with_formula.png", "rb") as f:
+        contents = f.read() + b"fake-backend-test"  # unique bytes so the result isn't served from cache
+    response = TestClient(app).post("/v1/extract-text", files={"image": ("doc.png", contents, "image/png")})
+    assert response.status_code == 200
+    assert response.json()["text"].startswith("word0 word1")
+    assert fake_backend.calls == 1
+
+
+def test_layout_is_extracted_and_cached_only_for_callers_that_ask(fake_backend):
+    with open("tests/images/doc_with_formula.png", "rb") as f:
+        contents = f.read() + b"layout-on-request"
+    digest = sha256_bytes(contents)
+    client = TestClient(app)
+
+    def post(**params):
+        return client.post("/v1/extract-text", params=params, files={"image": ("doc.png", contents, "image/png")})
+
+    text_only = post()
+    assert text_only.json()["layout"] is None
+    assert cache_service.get_cache(contents, key=digest)["layout"] is None  # no layout built or cached
+
+    with_words = post(fields="words")
+    assert with_words.headers["X-Cache-Status"] == "not-cached"
+    assert len(with_words.json()["layout"]["words"]["text"]) == 30
+    assert post(fields="words").headers["X-Cache-Status"] == "cached"
+    assert post().headers["X-Cache-Status"] == "cached"
+    assert fake_backend.calls == 2  # once per set of layout sections
+
+
+def test_extract_text_cache_miss_reads_l2_once(fake_backend, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_L2_URL", "memory://single-read")
+    store = get_kv_store("memory://single-read")
+    keys = []
+    real_get = store.get
+
+    async def counting_get(key):
+        keys.append(key)
+        return await real_get(key)
+
+    monkeypatch.setattr(store, "get", counting_get)
+    with open("tests/images/doc_with_formula.png", "rb") as f:
+        contents = f.read() + b"single-l2-read"
+    response = TestClient(app).post("/v1/extract-text", files={"image": ("doc.png", contents, "image/png")})
+    assert response.headers["X-Cache-Status"] == "not-cached"
+    assert len(keys) == 1 and fake_backend.calls == 1
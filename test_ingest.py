@@ -0,0 +1,57 @@
+import asyncio
+import io
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+from src.config import settings
+from src.utils.hashing import sha256_bytes
+from src.utils.ingest import UploadLimitExceeded, read_batch_uploads, read_upload
+
+
+def _upload(path_or_bytes, content_type):
+    data = open(path_or_bytes, "rb").read() if isinstance(path_or_bytes, str) else path_or_bytes
+    return UploadFile(
+        file=io.BytesIO(data), filename="upload", headers=Headers({"content-type": content_type})
+    ), data
+
+
+def test_read_upload_hashes_and_sniffs_headers():
+    file, data = _upload("tests/images/animated-test-gif.gif", "image/gif")
+    upload = asyncio.run(read_upload(file))
+    assert upload.digest == sha256_bytes(data)
+    assert upload.contents == data
+    assert (upload.image_format, upload.width, upload.height, upload.n_frames) == ("GIF", 240, 240, 15)
+
+
+@pytest.mark.parametrize(
+    "payload,content_type,status",
+    [
+        (b"not an image at all", "image/png", 400),
+        (b"\x89PNG\r\n\x1a\n" + b"\x00" * 64, "application/pdf", 415),
+    ],
+)
+def test_read_upload_rejects_before_decoding(payload, content_type, status):
+    file, _ = _upload(payload, content_type)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(read_upload(file))
+    assert exc.value.status_code == status
+
+
+def test_oversize_batch_upload_becomes_item_error(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", 1024)
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 256)
+    large, _ = _upload("tests/images/book page.jpg", "image/jpeg")
+    uploads = asyncio.run(read_batch_uploads([large]))
+    assert uploads[0].error == "File too large."
+    assert uploads[0].contents == b""
+
+
+def test_batch_stops_reading_once_the_total_limit_is_passed(monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 256)
+    first, data = _upload("tests/images/doc_with_formula.png", "image/png")
+    second, _ = _upload("tests/images/doc_with_formula.png", "image/png")
+    third, _ = _upload("tests/images/doc_with_formula.png", "image/png")
+    with pytest.raises(UploadLimitExceeded):
+        asyncio.run(read_batch_uploads([first, second, third], max_total_bytes=len(data) + 1000))
+    assert third.file.tell() == 0  # never read
+    assert len(asyncio.run(read_batch_uploads([third], max_total_bytes=len(data)))) == 1
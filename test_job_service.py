@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import httpx
+import pytest
+from fastapi import HTTPException
+from app import app
+from src.api.v1 import job_routes
+from src.models.response_models import OCRResult
+from src.services import job_service
+from src.services.job_service import JobManager
+from src.services.job_store import InMemoryJobStore, SQLiteJobStore
+from src.services.memory_budget import MemoryBudget
+from src.utils.ingest import Upload
+
+
+def test_submitted_job_is_processed_by_workers_and_paged(monkeypatch):
+    manager = JobManager(InMemoryJobStore(), workers=1, max_queued_bytes=1024 * 1024)
+    monkeypatch.setattr(job_routes, "job_manager", manager)
+    release = None
+
+    async def process_upload(upload, reservation=None):
+        if upload.filename != "0.png":
+            await release.wait()  # hold the rest of the job until progress has been checked
+        if upload.filename == "2.png":
+            raise HTTPException(status_code=400, detail="Uploaded file is not a valid image.")
+        return OCRResult(filename=upload.filename, success=True, text=f"page {upload.filename}")
+
+    monkeypatch.setattr(job_service, "process_upload", process_upload)
+
+    async def poll(client, job_id, until, **params):
+        for _ in range(200):
+            body = (await client.get(f"/v1/jobs/{job_id}", params=params)).json()
+            if until(body):
+                return body
+            await asyncio.sleep(0.01)
+        raise AssertionError(body)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        files = [("images", (f"{n}.png", f"image {n}".encode(), "image/png")) for n in range(4)]
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            submitted = await client.post("/v1/jobs", files=files)
+            assert submitted.status_code == 202
+            job_id = submitted.json()["job_id"]
+
+            running = await poll(client, job_id, lambda body: body["completed"] == 1)
+            assert (running["status"], running["total_images"]) == ("running", 4)
+            assert [result["filename"] for result in running["results"]] == ["0.png"]
+
+            release.set()
+            done = await poll(client, job_id, lambda body: body["status"] == "completed", limit=2)
+            page = (await client.get(f"/v1/jobs/{job_id}/results", params={"offset": 2, "limit": 2})).json()
+            await manager.shutdown()
+            return done, page
+
+    done, page = asyncio.run(scenario())
+    assert (done["succeeded"], done["failed"]) == (3, 1)
+    assert [result["index"] for result in done["results"]] == [0, 1]
+    assert page["offset"] == 2 and [result["index"] for result in page["results"]] == [2, 3]
+    assert not page["results"][0]["success"] and page["results"][0]["error"] == "400: Uploaded file is not a valid image."
+    assert manager.queued_bytes == 0
+
+
+def test_restart_fails_the_unfinished_items_of_persisted_jobs(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    before = SQLiteJobStore(path)
+    before.create_job("done", total_images=1)
+    before.add_result("done", 0, {"filename": "a.png", "success": True})
+    before.create_job("cut-short", total_images=3)
+    before.add_result("cut-short", 1, {"filename": "b.png", "success": True})
+
+    manager = JobManager(SQLiteJobStore(path), workers=1, max_queued_bytes=1024)  # the restarted process
+    assert manager.fail_interrupted() == 2
+    job = asyncio.run(manager.get_job("cut-short"))
+    assert (job["status"], job["succeeded"], job["failed"]) == ("completed", 1, 2)
+    results = asyncio.run(manager.get_results("cut-short", 0, 10))
+    assert [result["success"] for result in results] == [False, True, False]
+    assert results[0]["error"] == job_service.INTERRUPTED_ERROR
+    assert manager.fail_interrupted() == 0
+
+
+def test_queued_job_bytes_are_pinned_in_the_memory_budget(monkeypatch):
+    budget = MemoryBudget(1000)
+    manager = JobManager(InMemoryJobStore(), workers=1, max_queued_bytes=900, budget=budget)
+    release = None
+
+    async def process_upload(upload, reservation=None):
+        await release.wait()
+        return OCRResult(filename=upload.filename, success=True)
+
+    monkeypatch.setattr(job_service, "process_upload", process_upload)
+    uploads = [Upload(filename=f"{n}.png", content_type="image/png", contents=b"x" * 300) for n in range(2)]
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        await manager.submit(uploads)
+        pinned = budget.pinned
+        with pytest.raises(HTTPException) as queue_full:
+            await manager.submit(uploads)  # 1200 queued bytes would pass JOB_MAX_QUEUED_BYTES
+        budget.pin(350)  # other work holds memory
+        with pytest.raises(HTTPException) as memory_full:
+            await manager.submit(uploads[:1])
+        budget.unpin(350)
+        release.set()
+        while manager.queued_bytes:
+            await asyncio.sleep(0.01)
+        await manager.shutdown()
+        return pinned, queue_full.value, memory_full.value
+
+    pinned, queue_full, memory_full = asyncio.run(scenario())
+    assert pinned == 600
+    assert queue_full.detail == "Job queue is full. Please retry later."
+    assert memory_full.detail == "Server is at memory capacity. Please retry later."
+    assert budget.in_use == 0 and budget.pinned == 0
+
+
+def test_sqlite_store_calls_run_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingStore(SQLiteJobStore):
+        def get_job(self, job_id):
+            threads.append(threading.current_thread())
+            return super().get_job(job_id)
+
+    manager = JobManager(RecordingStore(str(tmp_path / "jobs.sqlite3")), workers=1, max_queued_bytes=1024)
+    assert asyncio.run(manager.get_job("missing")) is None
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,33 @@
+import pytest
+from src.services.job_store import InMemoryJobStore, SQLiteJobStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryJobStore()
+    return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_job_progress_and_result_paging(store):
+    job = store.create_job("job-1", total_images=3)
+    assert job["status"] == "queued"
+
+    store.add_result("job-1", 2, {"filename": "c.jpg", "success": True, "text": "C"})
+    store.add_result("job-1", 0, {"filename": "a.jpg", "success": False, "error": "File too large."})
+    store.add_result("job-1", 0, {"filename": "a.jpg", "success": True})  # duplicate delivery is ignored
+
+    job = store.get_job("job-1")
+    assert (job["status"], job["completed"], job["succeeded"], job["failed"]) == ("running", 2, 1, 1)
+    assert [r["index"] for r in store.get_results("job-1")] == [0, 2]
+    assert [r["filename"] for r in store.get_results("job-1", offset=1, limit=1)] == ["c.jpg"]
+
+    store.add_result("job-1", 1, {"filename": "b.jpg", "success": True})
+    assert store.get_job("job-1")["status"] == "completed"
+    assert store.get_job("missing") is None
+
+
+def test_purge_expired(store):
+    store.create_job("old", total_images=1)
+    assert store.purge_expired(max_age=-1) == 1
+    assert store.get_job("old") is None
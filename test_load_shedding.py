@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from src.config import settings
+from src.services import vision_client
+from src.services.admission import AdmissionController, expected_vision_calls
+from src.services.work_limiter import WorkUnitLimiter, work_units
+from src.utils.ingest import Upload
+
+
+def _upload(width=1000, height=1000, error=None):
+    return Upload(filename="a.png", content_type="image/png", contents=b"x" * 10, width=width, height=height, error=error)
+
+
+def test_work_units_charge_images_and_megapixels():
+    # 1 MP -> 1 + 1; 12 MP -> 1 + 3 (4 MP blocks); failed upload -> 1
+    assert work_units([_upload(1000, 1000), _upload(4000, 3000), _upload(error="bad")]) == 2 + 4 + 1
+
+
+def test_multi_page_uploads_are_charged_per_page(monkeypatch):
+    tiff = Upload(filename="scan.tif", content_type="image/tiff", contents=b"x" * 10, image_format="TIFF",
+                  width=1000, height=1000, n_frames=200)
+    monkeypatch.setattr(settings, "MULTIPAGE_ENABLED", False)
+    assert work_units([tiff]) == 2 and expected_vision_calls([tiff, _upload()]) == 1
+    monkeypatch.setattr(settings, "MULTIPAGE_ENABLED", True)
+    monkeypatch.setattr(settings, "MULTIPAGE_MAX_PAGES", 20)
+    assert work_units([tiff]) == 20 * 2  # every page it may send to Vision, 1 MP each
+    assert expected_vision_calls([tiff, _upload(), _upload()]) == 20 + 1
+
+
+def test_work_limiter_rejects_with_retry_after():
+    limiter = WorkUnitLimiter("10/minute", "memory://")
+
+    async def scenario():
+        await limiter.charge("client-a", 6)
+        with pytest.raises(HTTPException) as exc:
+            await limiter.charge("client-a", 6)
+        await limiter.charge("client-b", 100)  # other clients unaffected; oversized requests are capped
+        return exc.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert 1 <= int(error.headers["Retry-After"]) <= 60
+
+
+def test_admission_sheds_on_vision_backlog_and_queued_bytes(monkeypatch):
+    controller = AdmissionController(vision_pending_limit=4, queued_bytes_limit=100, max_retry_after=30)
+
+    with controller.admitted(80):
+        with pytest.raises(HTTPException) as exc:
+            controller.acquire(30)
+        assert exc.value.status_code == 503 and "Retry-After" in exc.value.headers
+        controller.acquire(20)
+        controller.release(20)
+    assert controller.admitted_bytes == 0
+    controller.acquire(500)  # an idle instance always admits one request
+    controller.release(500)
+
+    monkeypatch.setattr(vision_client, "pending_calls", lambda: 4)
+    with pytest.raises(HTTPException) as exc:
+        controller.acquire(1)
+    assert exc.value.status_code == 503
+
+    monkeypatch.setattr(vision_client, "pending_calls", lambda: 2)
+    controller.acquire(1, vision_calls=2)
+    controller.release(1)
+    with pytest.raises(HTTPException):
+        controller.acquire(1, vision_calls=3)  # a multi-page upload would take the backlog past the limit
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from src.config import settings
+from src.services.memory_budget import MemoryBudget, MemoryReservation, estimate, upload_cost
+from src.utils.ingest import Upload
+
+
+def _upload(width=100, height=100, size=10):
+    return Upload(filename="a.png", content_type="image/png", contents=b"x" * size, width=width, height=height)
+
+
+def test_estimate_counts_only_concurrently_decoded_images():
+    uploads = [_upload(100, 100), _upload(200, 100), _upload(50, 50)]
+    raw, decoded = estimate(uploads, concurrency=2)
+    assert raw == 2 * 30
+    assert decoded == (200 * 100 + 100 * 100) * 8  # the two largest images at MEMORY_BYTES_PER_PIXEL=8
+
+
+def test_budget_waiters_are_served_in_order():
+    budget = MemoryBudget(100)
+    order = []
+
+    async def worker(name, n_bytes):
+        await budget.acquire(n_bytes, timeout=None)
+        order.append(name)
+
+    async def scenario():
+        await budget.acquire(80, timeout=None)
+        large = asyncio.create_task(worker("large", 60))
+        await asyncio.sleep(0)
+        small = asyncio.create_task(worker("small", 10))  # would fit now, but queues behind "large"
+        await asyncio.sleep(0)
+        assert order == []
+        budget.release(80)
+        await asyncio.gather(large, small)
+
+    asyncio.run(scenario())
+    assert order == ["large", "small"]
+    assert budget.in_use == 70
+
+
+def test_budget_times_out_with_503_and_clamps_oversized_requests():
+    budget = MemoryBudget(100)
+
+    async def scenario():
+        assert await budget.acquire(500, timeout=None) == 100  # larger than the budget: runs alone
+        with pytest.raises(HTTPException) as exc:
+            await budget.acquire(10, timeout=0.01)
+        with pytest.raises(HTTPException):
+            await budget.acquire(10, timeout=0)
+        budget.release(100)
+        return exc.value
+
+    error = asyncio.run(scenario())
+    assert error.status_code == 503 and error.headers["Retry-After"]
+    assert budget.in_use == 0 and not budget._waiters
+
+
+def test_reservation_releases_decoded_part_early():
+    budget = MemoryBudget(1000)
+
+    async def scenario():
+        async with MemoryReservation(budget, raw=100, decoded=400, timeout=None) as reservation:
+            assert budget.in_use == 500
+            reservation.release_decoded()
+            assert budget.in_use == 100
+        assert budget.in_use == 0
+
+    asyncio.run(scenario())
+
+
+def test_pinned_bytes_shrink_the_clamp_so_oversized_requests_still_run():
+    budget = MemoryBudget(100)
+
+    async def scenario():
+        budget.pin(60)  # e.g. queued job uploads, freed only once a worker gets to them
+        with pytest.raises(HTTPException):
+            budget.pin(50)
+        granted = await asyncio.wait_for(budget.acquire(500, timeout=None), 1)
+        budget.release(granted)
+        budget.unpin(60)
+        return granted
+
+    assert asyncio.run(scenario()) == 40
+    assert budget.in_use == 0 and budget.pinned == 0
+
+
+def test_multi_page_uploads_reserve_an_encoded_copy_per_page(monkeypatch):
+    monkeypatch.setattr(settings, "MULTIPAGE_ENABLED", True)
+    tiff = Upload(filename="scan.tif", content_type="image/tiff", contents=b"x" * 1000, image_format="TIFF",
+                  width=100, height=100, n_frames=10)
+    raw, decoded = upload_cost(tiff)
+    assert decoded == 100 * 100 * 8  # frames are decoded one at a time
+    assert raw == 1000 + 10 * 100 * 100 * 8 // 10  # the upload plus every page's encoded copy
+    monkeypatch.setattr(settings, "MULTIPAGE_ENABLED", False)
+    assert upload_cost(tiff) == (2 * 1000, decoded)
@@ -0,0 +1,31 @@
+from src.services.metrics import Counter, Histogram, observe_stage, end_request_timings, server_timing_header, start_request_timings
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test.", ["stage"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="vision")
+    histogram.observe(0.5, stage="vision")
+    histogram.observe(5.0, stage="vision")
+    text = histogram.render()
+    assert 'test_seconds_bucket{stage="vision",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="vision",le="1"} 2' in text
+    assert 'test_seconds_bucket{stage="vision",le="+Inf"} 3' in text
+    assert 'test_seconds_count{stage="vision"} 3' in text
+
+
+def test_counter_function_and_labels():
+    counter = Counter("test_total", "Test.", ["outcome"])
+    counter.inc(outcome="miss")
+    counter.inc(2, outcome="miss")
+    assert 'test_total{outcome="miss"} 3' in counter.render()
+    counter.set_function(lambda: {("hit",): 7})
+    assert 'test_total{outcome="hit"} 7' in counter.render()
+
+
+def test_stage_timings_feed_server_timing():
+    timings, token = start_request_timings()
+    observe_stage("decode", 0.010)
+    observe_stage("decode", 0.005)
+    end_request_timings(token)
+    observe_stage("decode", 1.0)  # outside the request; not collected
+    assert server_timing_header(timings, total=0.02) == "decode;dur=15.0, total;dur=20.0"
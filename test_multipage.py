@@ -0,0 +1,75 @@
+import io
+import pytest
+from PIL import Image, ImageDraw
+from src.config import settings
+from src.services.extractor import select_fields
+from src.services.image_context import ImageContext
+from src.services.ocr_service import _build_result_dict_from_pages
+from src.services.preprocess import preprocess_image
+from src.utils.file_utils import _validate_image_bytes
+from src.utils.ingest import read_header_info
+
+
+@pytest.fixture(autouse=True)
+def multipage_enabled(monkeypatch):
+    monkeypatch.setattr(settings, "MULTIPAGE_ENABLED", True)
+
+
+def _page(bars: int) -> Image.Image:
+    image = Image.new("RGB", (400, 300), "white")
+    draw = ImageDraw.Draw(image)
+    for i in range(bars):
+        draw.rectangle((40 + 30 * i, 40, 55 + 30 * i, 260), fill="black")
+    return image
+
+
+def _gif(frames) -> bytes:
+    output = io.BytesIO()
+    frames[0].save(output, format="GIF", save_all=True, append_images=frames[1:])
+    return output.getvalue()
+
+
+def _repeated_frames(pages: int, repeats: int):
+    """repeats near-identical frames (one stray pixel each, so the GIF encoder keeps them) per page."""
+    frames = []
+    for index in range(pages * repeats):
+        frame = _page(3 * (index // repeats) + 2)
+        frame.putpixel((390, index % 300), (0, 0, 0))
+        frames.append(frame)
+    return frames
+
+
+def test_near_identical_frames_become_one_page():
+    contents = _gif(_repeated_frames(pages=3, repeats=5))
+    image_ctx = preprocess_image(_validate_image_bytes(contents, "image/gif"))
+    assert image_ctx.n_frames == 15
+    assert [page.frames for page in image_ctx.pages] == [list(range(0, 5)), list(range(5, 10)), list(range(10, 15))]
+    assert all(page.processed_bytes for page in image_ctx.pages)
+    assert image_ctx.processed_bytes is None and image_ctx.image is None
+
+
+def test_distinct_page_limit(monkeypatch):
+    monkeypatch.setattr(settings, "MULTIPAGE_MAX_PAGES", 2)
+    contents = _gif(_repeated_frames(pages=3, repeats=1))
+    with pytest.raises(ValueError, match="Too many distinct pages"):
+        preprocess_image(_validate_image_bytes(contents, "image/gif"))
+
+
+def test_tiff_header_counts_pages():
+    output = io.BytesIO()
+    _page(2).save(output, format="TIFF", save_all=True, append_images=[_page(3), _page(4)])
+    assert read_header_info(output.getvalue(), "TIFF") == (400, 300, 3)
+
+
+def test_page_results_are_joined_and_filtered():
+    image_ctx = ImageContext(raw_bytes=b"", mimetype="image/tiff", format="TIFF", width=400, height=300, n_frames=3)
+    layout = {"blocks": {"confidence": [0.9]}, "words": {"text": ["one"]}}
+    pages = [
+        {"index": 0, "frames": [0], "text": "one", "confidence": 0.9, "blank": False, "layout": layout},
+        {"index": 1, "frames": [1], "text": "", "confidence": 0.0, "blank": True, "layout": None},
+        {"index": 2, "frames": [2], "text": "two", "confidence": 0.7, "blank": False, "layout": None},
+    ]
+    result = _build_result_dict_from_pages(pages, image_ctx, start_time=0)
+    assert result["text"] == "one\f\ftwo"
+    assert result["confidence"] == 0.8
+    assert select_fields(result, frozenset({"words"}))["pages"][0]["layout"] == {"words": {"text": ["one"]}}
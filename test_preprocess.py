@@ -0,0 +1,52 @@
+import io
+from PIL import Image, ImageDraw
+from src.services.preprocess import analyze_page, preprocess_image
+from src.utils.file_utils import _validate_image_bytes
+
+
+def _png(image: Image.Image) -> bytes:
+    output = io.BytesIO()
+    image.save(output, format="PNG")
+    return output.getvalue()
+
+
+def _receipt_page(width=3000, height=4000):
+    """A small text-covered receipt in the middle of a large white page."""
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for y in range(1800, 2200, 20):
+        draw.rectangle((1300, y, 1700, y + 8), fill=0)
+    return image
+
+
+def test_blank_page_is_not_encoded():
+    page = Image.new("RGB", (2000, 2800), (250, 250, 248))
+    page.putpixel((10, 10), (0, 0, 0))  # a scanner speck
+    image_ctx = preprocess_image(_validate_image_bytes(_png(page), "image/png"))
+    assert image_ctx.analysis["blank"] is True
+    assert image_ctx.processed_bytes is None and image_ctx.encoding is None
+    assert image_ctx.image is None
+
+
+def test_uniform_margins_are_cropped():
+    analysis = analyze_page(_receipt_page())
+    assert analysis["background"] == 255 and not analysis["blank"]
+    x0, y0, x1, y1 = analysis["ink_box"]
+    assert abs(x0 - 1300) <= 3 and abs(y0 - 1800) <= 3 and abs(x1 - 1701) <= 3 and abs(y1 - 2189) <= 3
+
+    image_ctx = preprocess_image(_validate_image_bytes(_png(_receipt_page()), "image/png"))
+    crop = image_ctx.analysis["crop"]
+    assert crop[0] < 1300 and crop[2] > 1700 and (crop[2] - crop[0]) < 3000 / 2
+    # the cropped region is sent at full resolution instead of the whole page downscaled
+    assert image_ctx.encoding["scale"] == 1.0
+    assert image_ctx.encoding["width"] == crop[2] - crop[0]
+
+
+def test_full_page_text_is_not_cropped():
+    page = Image.new("L", (1200, 1600), 255)
+    draw = ImageDraw.Draw(page)
+    for y in range(20, 1580, 30):
+        draw.rectangle((20, y, 1180, y + 10), fill=0)
+    image_ctx = preprocess_image(_validate_image_bytes(_png(page), "image/png"))
+    assert image_ctx.analysis["crop"] is None
+    assert image_ctx.encoding["width"] == 1200
@@ -0,0 +1,42 @@
+import gzip
+import json
+import pytest
+from starlette.requests import Request
+from src.config import settings
+from src.services.response_encoding import encoded_response, negotiate_encoding, negotiate_media_type
+
+
+def _request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_negotiation_follows_q_values():
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("gzip;q=0.5, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_media_type("text/html, */*") == "application/json"
+
+
+def test_small_bodies_stay_uncompressed_large_ones_are_gzipped(monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_COMPRESSION_MIN_BYTES", 100)
+    small = encoded_response(_request(accept_encoding="gzip"), {"text": "short"})
+    assert "content-encoding" not in small.headers and json.loads(small.body) == {"text": "short"}
+
+    content = {"text": "dense page " * 50, "confidence": 0.9}
+    response = encoded_response(_request(accept_encoding="gzip"), content, 207, {"X-Cache-Status": "mixed"})
+    assert response.status_code == 207
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["x-cache-status"] == "mixed"
+    assert json.loads(gzip.decompress(response.body)) == content
+
+
+def test_msgpack_and_brotli_when_installed(monkeypatch):
+    msgpack = pytest.importorskip("msgpack")
+    brotli = pytest.importorskip("brotli")
+    monkeypatch.setattr(settings, "RESPONSE_COMPRESSION_MIN_BYTES", 0)
+    assert negotiate_encoding("gzip, br") == "br"
+    content = {"text": "page", "layout": None}
+    response = encoded_response(_request(accept="application/msgpack, application/json;q=0.5", accept_encoding="br"), content)
+    assert response.media_type == "application/msgpack"
+    assert msgpack.unpackb(brotli.decompress(response.body)) == content
@@ -0,0 +1,47 @@
+import asyncio
+from src.config import settings
+from src.services import startup, vision_client
+
+
+def test_warm_up_times_each_phase_and_marks_ready(monkeypatch):
+    monkeypatch.setattr(settings, "VISION_BACKEND", "fake")
+    monkeypatch.setattr(settings, "PREPROCESS_EXECUTOR", "thread")
+    monkeypatch.setattr(startup, "_ready", False)
+    monkeypatch.setattr(startup, "_phases", {})
+    monkeypatch.setattr(startup, "_details", {})
+    vision_client.set_backend()
+
+    asyncio.run(startup.warm_up())
+    report = startup.report()
+    assert report["ready"] is True
+    assert {"import_vision", "codecs", "preprocess_workers", "vision_connect"} <= set(report["phases_ms"])
+    assert report["details"]["codecs"] == ["image/gif", "image/jpeg", "image/png"]
+    assert report["details"]["vision_connect"]["channels"] == 0  # the fake backend has no gRPC channel
+    vision_client.set_backend()
+
+
+def test_failed_phase_is_reported_but_not_fatal(monkeypatch):
+    async def broken(timeout):
+        raise RuntimeError("no route to Vision")
+
+    monkeypatch.setattr(startup, "_ready", False)
+    monkeypatch.setattr(startup, "_phases", {})
+    monkeypatch.setattr(startup, "_details", {})
+    monkeypatch.setattr(vision_client, "warm_up", broken)
+
+    asyncio.run(startup.warm_up())
+    assert startup.is_ready()
+    assert startup.report()["details"]["vision_connect"] == {"error": "no route to Vision"}
+
+
+def test_lifespan_shutdown_closes_executors(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app import app
+    from src.services import cpu_pool
+
+    monkeypatch.setattr(settings, "STARTUP_WARMUP_ENABLED", False)
+    with TestClient(app):
+        executor = vision_client.get_executor()
+        process_pool = cpu_pool.get_process_pool()
+    assert vision_client._executor is None and executor._shutdown
+    assert cpu_pool._process_pool is None and process_pool._shutdown_thread
@@ -0,0 +1,71 @@
+from google.cloud import vision
+from src.config import settings
+from src.services.tiling import _reading_order, plan_tiles, stitch, tiled_size
+
+
+def _box(x0, y0, x1, y1):
+    return vision.BoundingPoly(
+        vertices=[vision.Vertex(x=x0, y=y0), vision.Vertex(x=x1, y=y0), vision.Vertex(x=x1, y=y1), vision.Vertex(x=x0, y=y1)]
+    )
+
+
+def _response(words, offset_x=0):
+    """One-block response; words are (text, x0, y0, x1, y1) in page pixels, shifted into tile pixels."""
+    vision_words = [
+        vision.Word(
+            symbols=[vision.Symbol(text=c) for c in text],
+            confidence=0.9,
+            bounding_box=_box(x0 - offset_x, y0, x1 - offset_x, y1),
+        )
+        for text, x0, y0, x1, y1 in words
+    ]
+    block = vision.Block(paragraphs=[vision.Paragraph(words=vision_words)])
+    return vision.AnnotateImageResponse(full_text_annotation=vision.TextAnnotation(pages=[vision.Page(blocks=[block])]))
+
+
+def test_tiles_cover_the_image_and_own_each_point_once(monkeypatch):
+    monkeypatch.setattr(settings, "TILE_SIZE", 1000)
+    monkeypatch.setattr(settings, "TILE_OVERLAP", 100)
+    tiles = plan_tiles(2500, 900)
+    assert [tile["box"] for tile in tiles] == [(0, 0, 1000, 900), (750, 0, 1750, 900), (1500, 0, 2500, 900)]
+    for x in range(0, 2500, 50):
+        owners = [tile for tile in tiles if tile["owns"][0] <= x < tile["owns"][2]]
+        assert len(owners) == 1 and owners[0]["box"][0] <= x < owners[0]["box"][2]
+
+    monkeypatch.setattr(settings, "TILING_MAX_TILES", 4)
+    width, height = tiled_size(5000, 5000)
+    assert width < 5000 and len(plan_tiles(width, height)) <= 4
+
+
+def test_stitch_keeps_overlap_words_once_and_rejoins_lines():
+    # Two tiles side by side: A covers x 0-300, B covers x 200-500; the seam between them is at x=250
+    tiles = [
+        {"box": (0, 0, 300, 100), "owns": (float("-inf"), float("-inf"), 250, float("inf"))},
+        {"box": (200, 0, 500, 100), "owns": (250, float("-inf"), float("inf"), float("inf"))},
+    ]
+    line = [("the", 10, 10, 60, 30), ("quick", 70, 10, 120, 30), ("brown", 130, 10, 180, 30), ("fox", 190, 10, 240, 30),
+            ("jumps", 250, 10, 300, 30), ("over", 310, 10, 360, 30), ("dogs", 370, 10, 420, 30)]
+    second = [("lazy", 10, 40, 60, 60), ("end", 260, 40, 300, 60)]
+    # Each tile sees the words inside it, including those in the overlap; B sees "fox" cut off at its edge
+    response_a = _response([w for w in line + second if w[3] <= 300])
+    response_b = _response([("x", 200, 10, 240, 30)] + [w for w in line + second if w[1] >= 250], offset_x=200)
+
+    stitched = stitch([response_a, response_b], tiles, scale=0.5)
+    assert stitched["text"] == "the quick brown fox jumps over dogs\nlazy end"
+    assert stitched["confidence"] == 0.9
+    words = stitched["layout"]["words"]
+    assert words["text"].count("jumps") == 1
+    assert words["block"] == [0] * 9
+    assert words["x0"][4] == 500  # page pixels mapped back to the original image
+
+
+def test_reading_order_reads_columns_before_rows():
+    def group(name, x0, y0, x1, y1):
+        return {"name": name, "box": (x0, y0, x1, y1)}
+
+    groups = [
+        group("left-2", 0, 200, 400, 300), group("right-1", 500, 100, 900, 180), group("title", 0, 0, 900, 50),
+        group("left-1", 0, 100, 400, 180), group("right-2", 500, 200, 900, 300),
+    ]
+    ordered = [g["name"] for g in _reading_order(groups, gap=20)]
+    assert ordered == ["title", "left-1", "left-2", "right-1", "right-2"]
@@ -0,0 +1,169 @@
+import asyncio
+import pytest
+from google.api_core import exceptions as google_exceptions
+from src.config import settings
+from src.services import vision_client, vision_policy
+from src.services.fake_vision import FakeVisionAsyncClient, FakeVisionClient
+from src.services.vision_policy import CircuitBreaker, CircuitOpenError, call_vision
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fresh_policy(monkeypatch):
+    monkeypatch.setattr(vision_policy, "breaker", CircuitBreaker(failure_threshold=10, reset_timeout=30))
+    monkeypatch.setattr(vision_policy, "latencies", vision_policy.LatencyTracker(min_samples=1))
+    monkeypatch.setattr(settings, "VISION_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(settings, "VISION_RETRY_ATTEMPTS", 3)
+
+
+def _flaky(failures: int, delays=()):
+    """Call factory failing with ServiceUnavailable `failures` times; delays[n] slows attempt n."""
+    state = {"calls": 0}
+
+    async def call(timeout):
+        attempt = state["calls"]
+        state["calls"] += 1
+        if attempt < len(delays):
+            await asyncio.sleep(delays[attempt])
+        if attempt < failures:
+            raise google_exceptions.ServiceUnavailable("unavailable")
+        return f"ok-{attempt}"
+
+    return call, state
+
+
+def test_retries_transient_errors():
+    call, state = _flaky(failures=2)
+    assert asyncio.run(call_vision(call)) == "ok-2"
+    assert state["calls"] == 3
+
+
+def test_gives_up_after_max_attempts_and_does_not_retry_permanent_errors():
+    call, state = _flaky(failures=5)
+    with pytest.raises(google_exceptions.ServiceUnavailable):
+        asyncio.run(call_vision(call))
+    assert state["calls"] == 3
+
+    calls = []
+
+    async def invalid(timeout):
+        calls.append(timeout)
+        raise google_exceptions.InvalidArgument("bad image")
+
+    with pytest.raises(google_exceptions.InvalidArgument):
+        asyncio.run(call_vision(invalid))
+    assert len(calls) == 1
+
+
+def test_per_attempt_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "VISION_CALL_TIMEOUT", 0.05)
+    call, state = _flaky(failures=0, delays=(1.0,))
+    assert asyncio.run(call_vision(call)) == "ok-1"  # first attempt timed out and was retried
+
+
+def test_hedged_request_wins_over_slow_primary(monkeypatch):
+    monkeypatch.setattr(settings, "VISION_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "VISION_HEDGE_MIN_DELAY", 0.05)
+    call, state = _flaky(failures=0, delays=(1.0, 0.0))
+    assert asyncio.run(asyncio.wait_for(call_vision(call), timeout=0.5)) == "ok-1"
+    assert state["calls"] == 2
+
+
+def test_circuit_breaker_opens_fails_fast_and_recovers(monkeypatch):
+    timer = FakeTimer()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, timer=timer)
+    monkeypatch.setattr(vision_policy, "breaker", breaker)
+    monkeypatch.setattr(settings, "VISION_RETRY_ATTEMPTS", 1)
+
+    call, state = _flaky(failures=3)
+    for _ in range(3):
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            asyncio.run(call_vision(call))
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call_vision(call))
+    assert state["calls"] == 3  # failed fast without calling Vision
+
+    timer.now = 31
+    assert breaker.state == "half_open"
+    assert asyncio.run(call_vision(call)) == "ok-3"
+    assert breaker.snapshot()["state"] == "closed"
+
+
+def test_waiting_for_an_in_flight_slot_is_not_timed_as_vision(monkeypatch):
+    monkeypatch.setattr(settings, "VISION_TRANSPORT", "async")
+    monkeypatch.setattr(settings, "VISION_MAX_IN_FLIGHT", 1)
+    monkeypatch.setattr(settings, "VISION_CALL_TIMEOUT", 0.1)
+    backend = FakeVisionAsyncClient(latency_ms=60)
+    vision_client.set_backend(FakeVisionClient(), backend)
+
+    attempts = []
+
+    async def call(timeout):
+        attempts.append(timeout)
+        return await vision_client.annotate_images([b"image"], timeout)
+
+    async def scenario():
+        return await asyncio.gather(*(call_vision(call) for _ in range(3)))  # the last one queues ~0.12s
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        vision_client.set_backend()
+    assert len(results) == 3 and len(attempts) == 3  # no attempt timed out and was retried
+    assert backend.calls == 3
+
+
+def test_backlog_past_the_request_deadline_is_not_a_vision_failure(monkeypatch):
+    monkeypatch.setattr(settings, "VISION_MAX_IN_FLIGHT", 1)
+    monkeypatch.setattr(settings, "VISION_REQUEST_DEADLINE", 0.05)
+    call, state = _flaky(failures=0)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold_slot():
+            async with vision_client.in_flight_slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+        try:
+            with pytest.raises(vision_client.VisionBacklogError):
+                await call_vision(call)
+        finally:
+            release.set()
+            await holder
+
+    asyncio.run(scenario())
+    assert state["calls"] == 0 and vision_policy.breaker.consecutive_failures == 0
+
+
+def test_cancelled_grpc_call_keeps_its_slot_until_the_thread_returns(monkeypatch):
+    monkeypatch.setattr(settings, "VISION_TRANSPORT", "grpc")
+    monkeypatch.setattr(settings, "VISION_MAX_IN_FLIGHT", 1)
+    vision_client.set_backend(FakeVisionClient(latency_ms=200), FakeVisionAsyncClient())
+
+    async def scenario():
+        loser = asyncio.create_task(vision_client.annotate_images([b"image"]))
+        await asyncio.sleep(0.05)
+        loser.cancel()  # e.g. a hedge loser: the blocking RPC keeps running on the executor
+        with pytest.raises(asyncio.CancelledError):
+            await loser
+        still_held = vision_client.pending_calls(), vision_client._get_semaphore(asyncio.get_running_loop()).locked()
+        await asyncio.sleep(0.3)
+        return still_held, vision_client.pending_calls()
+
+    try:
+        still_held, after = asyncio.run(scenario())
+    finally:
+        vision_client.set_backend()
+    assert still_held == (1, True)
+    assert after == 0
@@ -0,0 +1,25 @@
+import logging
+from src.config import settings
+from src.services.logger import SamplingFilter, _shrink
+
+
+def _record(msg):
+    return logging.LogRecord("ocr_service", logging.INFO, __file__, 1, msg, None, None)
+
+
+def test_large_fields_are_summarized():
+    shrunk = _shrink({"text": "x" * (settings.LOG_MAX_FIELD_CHARS + 1), "words": list(range(settings.LOG_MAX_LIST_ITEMS + 1))})
+    assert shrunk["text"]["chars"] == settings.LOG_MAX_FIELD_CHARS + 1
+    assert len(shrunk["text"]["sha256"]) == 16
+    assert shrunk["words"] == {"items": settings.LOG_MAX_LIST_ITEMS + 1}
+    assert _shrink({"filename": "a.png"}) == {"filename": "a.png"}
+
+
+def test_sampling_by_event(monkeypatch):
+    monkeypatch.setattr(settings, "LOG_SAMPLE_RATES", {"cache_hit": 0.0, "response_ready": 0.5})
+    sampler = SamplingFilter()
+    assert not sampler.filter(_record({"event": "cache_hit"}))
+    assert sampler.filter(_record({"event": "processing_error"}))
+    monkeypatch.setattr("src.services.logger.random.random", lambda: 0.1)
+    record = _record({"event": "response_ready"})
+    assert sampler.filter(record) and record.msg["sample_rate"] == 0.5